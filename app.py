@@ -1,19 +1,54 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-import pandas as pd
+import logging
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, g, send_file, abort, Response
 import random
 import json
 from datetime import datetime
+import io
 import os
-import base64 
-import re
+import time
+import threading
+from collections import OrderedDict
+from banco_preguntas import ARCHIVO_EXCEL, BancoPreguntas, cargar_banco, cargar_version
+from calificacion import evaluar_respuesta, indices_de_mascara, mascara_respuesta
+from sesiones import SesionesSQLite, crear_almacen_sesiones
+import cache_reportes
+import candidatos
+import contadores
+import estadisticas_items
+import exportar_reportes
+import imagenes
+import trabajos_pdf
+import metricas
+import seleccion
+from logs import configurar_logging
+
+configurar_logging()
+logger = logging.getLogger('app')
 
 app = Flask(__name__)
+# Con varios workers todos deben compartir SECRET_KEY para leer la cookie de sesión
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24).hex()
 
 # Variables globales
-candidatos_registrados = {}
-candidato_actual = {}
+candidatos.inicializar()  # ← REGISTRO PERSISTENTE EN SQLITE
+trabajos_pdf.inicializar()
+estadisticas_items.inicializar()
+trabajos_pdf.reanudar_pendientes()
+SESIONES = crear_almacen_sesiones()  # ← ESTADO DE CADA EVALUACIÓN POR CÓDIGO
+if isinstance(SESIONES, SesionesSQLite) and not os.environ.get('SECRET_KEY'):
+    # Cada worker firmaría la cookie con su propia clave aleatoria y rechazaría la de los demás
+    logger.error("❌ SESIONES_BACKEND=sqlite requiere SECRET_KEY compartida por todos los workers")
+    raise RuntimeError("SESIONES_BACKEND=sqlite requiere la variable de entorno SECRET_KEY")
 NIVELES = [1, 2, 3, 4, 5]
-PREGUNTAS = []
+BANCO = BancoPreguntas([])  # ← BANCO ACTIVO, se reemplaza entero en cada recarga
+PREGUNTAS = BANCO.preguntas
+# Versiones recientes: las evaluaciones en curso siguen con la versión con la que empezaron
+BANCOS_RECIENTES = OrderedDict()
+MAX_VERSIONES_BANCO = 5
+RECARGA_AUTOMATICA = int(os.environ.get('RECARGA_AUTOMATICA', 0))  # segundos, 0 = desactivada
+_lock_recarga = threading.Lock()
+# Segundos que una petición espera a una recarga en curso antes de pedir que se reintente
+ESPERA_RECARGA = int(os.environ.get('ESPERA_RECARGA', 5))
 TOTAL_PREGUNTAS = 2 # Ajuste de numero de preguntas 
 
 def get_total_preguntas():
@@ -50,352 +85,203 @@ def get_configuracion_evaluacion():
         "puntos_por_nivel": True
     }
 
-try:
-    from PIL import Image
-    import io
-    PILLOW_AVAILABLE = True
-except ImportError:
-    PILLOW_AVAILABLE = False
-    print("⚠️ Pillow no disponible - funcionalidad de imagen limitada")
-
-#  FUNCIÓN PARA PROCESAR IMÁGENES 
-def procesar_imagen_excel(imagen_raw):
-    """Procesa diferentes tipos de imagen del Excel - VERSIÓN MEJORADA PARA EMBEBIDAS"""
-    if imagen_raw is None or str(imagen_raw).strip() in ['nan', 'NaN', '', None, 'None']:
-        return None
-    
+# ✅ MOTOR DE SELECCIÓN DE PREGUNTAS (SELECTOR_PREGUNTAS=niveles|irt)
+SELECTORES = seleccion.crear_selectores(get_configuracion_evaluacion)
+SELECTOR = SELECTORES.get(os.environ.get('SELECTOR_PREGUNTAS', 'niveles'))
+if SELECTOR is None:
+    logger.warning("⚠️ SELECTOR_PREGUNTAS desconocido, usando 'niveles'")
+    SELECTOR = SELECTORES['niveles']
+
+def selector_de_sesion(candidato_actual):
+    """Motor con el que empezó la evaluación (un cambio de configuración no la altera)"""
+    return SELECTORES.get(candidato_actual.get("selector")) or SELECTOR
+
+def recordar_banco(banco):
+    """Guarda la versión entre las recientes sin publicarla como activa"""
+    BANCOS_RECIENTES[banco.version] = banco
+    BANCOS_RECIENTES.move_to_end(banco.version)
+    while len(BANCOS_RECIENTES) > MAX_VERSIONES_BANCO:
+        BANCOS_RECIENTES.popitem(last=False)
+
+def publicar_banco(banco):
+    """Publica un banco ya construido; una sola asignación, ninguna petición lo ve a medias"""
+    global PREGUNTAS, BANCO
+    recordar_banco(banco)
+    BANCO = banco
+    PREGUNTAS = banco.preguntas
+    metricas.PREGUNTAS_CARGADAS.fijar(valor=len(banco))
+
+class BancoNoDisponible(Exception):
+    """La versión del banco de la evaluación no se puede usar ahora
+
+    reintentar=True: hay una recarga en curso que puede publicarla; la evaluación sigue.
+    """
+    def __init__(self, version, reintentar=False):
+        super().__init__(f"Versión {version} del banco no disponible")
+        self.version = version
+        self.reintentar = reintentar
+
+def banco_de_sesion(candidato_actual):
+    """Banco con el que empezó la evaluación; BancoNoDisponible si no se puede recuperar
+
+    Los ids de pregunta son posiciones de fila: en otra versión del banco apuntan a otras
+    preguntas, así que una evaluación ya empezada nunca cambia de versión. Las versiones
+    que no están en memoria se leen de su copia en cache/ (ver cargar_version).
+    """
+    # Sin preguntas mostradas todavía: puede empezar con el banco activo
+    if not candidato_actual.get("preguntas_mostradas"):
+        candidato_actual["version_banco"] = BANCO.version
+        return BANCO
+    
+    version = candidato_actual.get("version_banco")
+    banco = BANCOS_RECIENTES.get(version)
+    if banco is not None:
+        return banco
+    
+    # ✅ Nunca se recompila dentro de la petición: si hay una recarga en curso (puede
+    # estar publicando justo esta versión) se espera un tiempo acotado
+    if not _lock_recarga.acquire(timeout=ESPERA_RECARGA):
+        raise BancoNoDisponible(version, reintentar=True)
     try:
-        # ✅ CASO ESPECIAL 1: Imagen embebida de openpyxl
-        if hasattr(imagen_raw, '__class__'):
-            class_name = str(type(imagen_raw).__name__)
-            if 'Image' in class_name or 'Picture' in class_name:
-                print(f"🖼️ Imagen embebida detectada: {class_name}")
-                try:
-                    # Extraer datos binarios según el tipo
-                    img_data = None
-                    
-                    # Para objetos de openpyxl
-                    if hasattr(imagen_raw, '_data'):
-                        img_data = imagen_raw._data()
-                        print(f"📸 Datos extraídos con _data(): {len(img_data)} bytes")
-                    elif hasattr(imagen_raw, 'data'):
-                        img_data = imagen_raw.data
-                        print(f"📸 Datos extraídos con .data: {len(img_data)} bytes")
-                    elif hasattr(imagen_raw, 'image'):
-                        img_data = imagen_raw.image
-                        print(f"📸 Datos extraídos con .image: {len(img_data)} bytes")
-                    elif hasattr(imagen_raw, 'blob'):
-                        img_data = imagen_raw.blob
-                        print(f"📸 Datos extraídos con .blob: {len(img_data)} bytes")
-                    
-                    if img_data and len(img_data) > 0:
-                        imagen_base64 = base64.b64encode(img_data).decode()
-                        
-                        # Detectar tipo de imagen por magic bytes
-                        if img_data.startswith(b'\x89PNG'):
-                            mime_type = 'png'
-                        elif img_data.startswith(b'\xFF\xD8\xFF'):
-                            mime_type = 'jpeg'
-                        elif img_data.startswith(b'GIF8'):
-                            mime_type = 'gif'
-                        elif img_data.startswith(b'BM'):
-                            mime_type = 'bmp'
-                        else:
-                            mime_type = 'png'  # Default
-                        
-                        result = f"data:image/{mime_type};base64,{imagen_base64}"
-                        print(f"✅ Imagen embebida procesada: {mime_type} ({len(imagen_base64)} chars)")
-                        return result
-                    else:
-                        print(f"⚠️ No se pudieron extraer datos de la imagen embebida")
-                        return None
-                        
-                except Exception as e:
-                    print(f"⚠️ Error procesando imagen embebida: {e}")
-                    return None
-        
-        # ✅ CASO 2: Datos binarios directos (bytes)
-        if isinstance(imagen_raw, bytes):
-            try:
-                if len(imagen_raw) > 100:  # Validar que tenga contenido suficiente
-                    imagen_base64 = base64.b64encode(imagen_raw).decode()
-                    
-                    # Detectar tipo por magic bytes
-                    if imagen_raw.startswith(b'\x89PNG'):
-                        mime_type = 'png'
-                    elif imagen_raw.startswith(b'\xFF\xD8\xFF'):
-                        mime_type = 'jpeg'
-                    elif imagen_raw.startswith(b'GIF8'):
-                        mime_type = 'gif'
-                    else:
-                        mime_type = 'png'
-                    
-                    print(f"✅ Bytes procesados: {mime_type} ({len(imagen_base64)} chars)")
-                    return f"data:image/{mime_type};base64,{imagen_base64}"
-                else:
-                    print(f"⚠️ Datos binarios muy pequeños: {len(imagen_raw)} bytes")
-                    return None
-            except Exception as e:
-                print(f"⚠️ Error procesando bytes: {e}")
-                return None
-        
-        # ✅ CASO 3: String con datos
-        imagen_str = str(imagen_raw).strip()
-        
-        # URL completa con data:image
-        if imagen_str.startswith('data:image'):
-            print(f"✅ Data URL encontrada")
-            return imagen_str
-        
-        # URL externa
-        if imagen_str.startswith(('http://', 'https://')):
-            print(f"✅ URL externa encontrada")
-            return imagen_str
-        
-        # Path de archivo local
-        if os.path.exists(imagen_str):
-            try:
-                ext = os.path.splitext(imagen_str)[1].lower()
-                mime_type = {
-                    '.jpg': 'jpeg', '.jpeg': 'jpeg',
-                    '.png': 'png', '.gif': 'gif',
-                    '.bmp': 'bmp', '.webp': 'webp'
-                }.get(ext, 'jpeg')
-                
-                with open(imagen_str, "rb") as img_file:
-                    img_data = img_file.read()
-                    imagen_base64 = base64.b64encode(img_data).decode()
-                    print(f"✅ Archivo local procesado: {mime_type}")
-                    return f"data:image/{mime_type};base64,{imagen_base64}"
-            except Exception as e:
-                print(f"⚠️ Error leyendo archivo {imagen_str}: {e}")
-                return None
-        
-        # String base64 sin prefijo
-        if len(imagen_str) > 100:
-            try:
-                # Intentar decodificar para verificar si es base64
-                base64.b64decode(imagen_str[:100])
-                print(f"✅ Base64 sin prefijo detectado")
-                return f"data:image/png;base64,{imagen_str}"
-            except:
-                print(f"⚠️ String largo pero no es base64 válido")
-                return None
-        
-        print(f"⚠️ Formato no reconocido: {type(imagen_raw)} - Contenido: {str(imagen_raw)[:50]}...")
-        return None
-        
-    except Exception as e:
-        print(f"⚠️ Error general procesando imagen: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        banco = BANCOS_RECIENTES.get(version) or cargar_version(version)
+        if banco is not None:
+            recordar_banco(banco)
+    finally:
+        _lock_recarga.release()
+    if banco is None:
+        raise BancoNoDisponible(version)
+    return banco
+
+def respuesta_banco_no_disponible(candidato_actual, error):
+    """503 para reintentar si hay recarga en curso; si la versión no existe, cierra la evaluación
+    (se conservan las respuestas dadas)"""
+    codigo = candidato_actual.get("datos_personales", {}).get("codigo")
+    if error.reintentar:
+        logger.info("⏳ Versión %s del banco en recarga, %s debe reintentar", error.version, codigo)
+        respuesta = jsonify({
+            "error": "El banco de preguntas se está actualizando, reintentando...",
+            "reintentar": True
+        })
+        respuesta.headers['Retry-After'] = str(ESPERA_RECARGA)
+        return respuesta, 503
+    
+    logger.warning("⚠️ Evaluación de %s cerrada: versión %s del banco no disponible", codigo, error.version)
+    candidato_actual["evaluacion_completa"] = True
+    return jsonify({
+        "error": "El banco de preguntas cambió durante la evaluación; se cierra con las respuestas dadas",
+        "banco_no_disponible": True
+    }), 409
 
 def cargar_preguntas():
-    """Carga preguntas con soporte mejorado para imágenes embebidas"""
-    global PREGUNTAS
-    try:
-        archivo_excel = 'Evaluación FWS PAN V2.xlsx'
-        print(f"🔍 Buscando archivo: {archivo_excel}")
-        
-        if os.path.exists(archivo_excel):
-            print(f"✅ Archivo encontrado, cargando...")
+    """Construye el banco (snapshot o Excel) y lo publica si cambió de versión"""
+    with _lock_recarga:
+        try:
+            archivo_excel = ARCHIVO_EXCEL
+            logger.debug("🔍 Buscando archivo: %s", archivo_excel)
             
-            # Cargar con pandas
-            df = pd.read_excel(archivo_excel)
-            print(f"📊 Excel cargado: {len(df)} filas")
+            if not os.path.exists(archivo_excel):
+                logger.error("❌ Archivo no encontrado: %s", archivo_excel)
+                return False
             
-            PREGUNTAS.clear()
-            preguntas_cargadas = 0
+            with metricas.CARGA_PREGUNTAS.medir():
+                nuevo = cargar_banco(archivo_excel)
             
-            for index, row in df.iterrows():
-                try:
-                    # ✅ CONVERTIR NIVEL DE TEXTO A NÚMERO
-                    nivel_raw = str(row.get('NIVEL', '')).strip()
-                    
-                    # Extraer número del texto "Nivel X"
-                    if 'Nivel 1' in nivel_raw:
-                        nivel_numerico = 1
-                    elif 'Nivel 2' in nivel_raw:
-                        nivel_numerico = 2
-                    elif 'Nivel 3' in nivel_raw:
-                        nivel_numerico = 3
-                    elif 'Nivel 4' in nivel_raw:
-                        nivel_numerico = 4
-                    elif 'Nivel 5' in nivel_raw:
-                        nivel_numerico = 5
-                    else:
-                        print(f"⚠️ Fila {index+2}: Nivel desconocido '{nivel_raw}', asignando nivel 1")
-                        nivel_numerico = 1
-                    
-                    pregunta_text = str(row.get('PREGUNTA', '')).strip()
-                    if not pregunta_text or pregunta_text == 'nan':
-                        continue
-                    
-                    # ✅ PROCESAR OPCIONES - VERSIÓN CORREGIDA CON LIMPIEZA
-                    opciones = []
-                    respuesta_correcta_texto = None
-                    respuesta_letra_excel = str(row.get('RESPUESTA', '')).strip().upper()
-
-                    # Opciones A, B, C, D
-                    for letra in ['A', 'B', 'C', 'D']:
-                        opcion = str(row.get(letra, '')).strip()
-                        if opcion and opcion != 'nan':
-                            opciones.append(opcion)
-                    
-                    # ✅ LIMPIAR OPCIONES DE ESPACIOS Y CARACTERES RAROS
-                    opciones_limpias = []
-                    for opcion in opciones:
-                        opcion_limpia = opcion.strip().replace('\r', '').replace('\n', '').replace('\t', ' ')
-                        # Normalizar espacios múltiples
-                        opcion_limpia = re.sub(r'\s+', ' ', opcion_limpia).strip()
-                        opciones_limpias.append(opcion_limpia)
-                    
-                    opciones = opciones_limpias
-                    
-                    # ✅ ENCONTRAR RESPUESTA CORRECTA CON OPCIONES LIMPIAS
-                    if respuesta_letra_excel in ['A', 'B', 'C', 'D']:
-                        indice_correcto = ord(respuesta_letra_excel) - ord('A')  # A=0, B=1, C=2, D=3
-                        if 0 <= indice_correcto < len(opciones):
-                            respuesta_correcta_texto = opciones[indice_correcto]
-                            print(f"✅ Respuesta correcta: {respuesta_letra_excel} = '{respuesta_correcta_texto}'")
-                        else:
-                            print(f"⚠️ Índice fuera de rango: {respuesta_letra_excel} para {len(opciones)} opciones")
-                            respuesta_correcta_texto = opciones[0] if opciones else None
-                    else:
-                        print(f"⚠️ Respuesta inválida en Excel: '{respuesta_letra_excel}', usando primera opción")
-                        respuesta_correcta_texto = opciones[0] if opciones else None
-
-                    # ✅ DEBUG ESPECÍFICO PARA FIREWALL
-                    if "firewall" in pregunta_text.lower():
-                        print(f"\n🔥 DEBUG PREGUNTA FIREWALL:")
-                        print(f"   Pregunta: {pregunta_text}")
-                        print(f"   Respuesta letra Excel: '{respuesta_letra_excel}'")
-                        print(f"   Opciones cargadas: {opciones}")
-                        print(f"   Índice calculado: {ord(respuesta_letra_excel) - ord('A') if respuesta_letra_excel in ['A','B','C','D'] else 'INVÁLIDO'}")
-                        print(f"   Respuesta correcta asignada: '{respuesta_correcta_texto}'")
-                        print(f"   ¿Índice en rango?: {0 <= (ord(respuesta_letra_excel) - ord('A')) < len(opciones) if respuesta_letra_excel in ['A','B','C','D'] else False}")
-
-                    if len(opciones) < 2:
-                        print(f"⚠️ Muy pocas opciones ({len(opciones)}), saltando pregunta")
-                        continue
-                    
-                    # Procesar imagen
-                    imagen_procesada = procesar_imagen_excel(row.get('IMAGEN'))
-                    
-                    pregunta_obj = {
-                        "id": len(PREGUNTAS) + 1,
-                        "pregunta": pregunta_text,
-                        "opciones": opciones,
-                        "respuesta_correcta": respuesta_correcta_texto,  # ← TEXTO LIMPIO, no letra
-                        "respuestas_correctas": [respuesta_correcta_texto] if respuesta_correcta_texto else [opciones[0]],
-                        "nivel": nivel_numerico,
-                        "multiple": False,  # Por ahora solo respuestas simples
-                        "imagen": imagen_procesada,
-                        "categoria": str(row.get('CATEGORIA', '')).strip()
-                    }
-                    
-                    PREGUNTAS.append(pregunta_obj)
-                    preguntas_cargadas += 1
-                    
-                    # Debug cada 50 preguntas
-                    if preguntas_cargadas % 50 == 0:
-                        print(f"   📝 Cargadas {preguntas_cargadas} preguntas...")
-                
-                except Exception as e:
-                    print(f"❌ Error procesando fila {index+2}: {e}")
-                    continue
+            if nuevo.version == BANCO.version:
+                logger.info("ℹ️ El banco no cambió (versión %s)", nuevo.version)
+                return True
             
             # ✅ MOSTRAR ESTADÍSTICAS POR NIVEL NUMÉRICO
-            niveles_conteo = {}
-            for p in PREGUNTAS:
-                nivel = p["nivel"]
-                if nivel not in niveles_conteo:
-                    niveles_conteo[nivel] = 0
-                niveles_conteo[nivel] += 1
-            
-            print(f"\n📊 RESUMEN FINAL:")
-            print(f"   ✅ Preguntas cargadas: {len(PREGUNTAS)}")
-            print(f"   📊 Distribución por nivel:")
-            for nivel in sorted(niveles_conteo.keys()):
-                print(f"      Nivel {nivel}: {niveles_conteo[nivel]} preguntas")
+            niveles_conteo = {nivel: len(preguntas) for nivel, preguntas in sorted(nuevo.por_nivel.items())}
+            logger.info("📊 Banco versión %s: %s preguntas | Distribución por nivel: %s",
+                        nuevo.version, len(nuevo), niveles_conteo)
             
             # Verificar que hay preguntas de nivel 1
-            if 1 in niveles_conteo and niveles_conteo[1] > 0:
-                print(f"   ✅ Preguntas de nivel 1 disponibles: {niveles_conteo[1]}")
-            else:
-                print(f"   ❌ NO hay preguntas de nivel 1")
+            if not niveles_conteo.get(1):
+                logger.error("❌ NO hay preguntas de nivel 1")
             
+            publicar_banco(nuevo)
             return True
-            
-        else:
-            print(f"❌ Archivo no encontrado: {archivo_excel}")
+                
+        except Exception as e:
+            logger.exception("❌ Error cargando preguntas: %s", e)
             return False
-            
-    except Exception as e:
-        print(f"❌ Error cargando preguntas: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+
+def vigilar_excel(intervalo):
+    """Hilo que recarga el banco cuando cambia el mtime del Excel"""
+    ultimo_mtime = os.stat(ARCHIVO_EXCEL).st_mtime_ns if os.path.exists(ARCHIVO_EXCEL) else None
+    while True:
+        time.sleep(intervalo)
+        try:
+            mtime = os.stat(ARCHIVO_EXCEL).st_mtime_ns
+        except OSError:
+            continue
+        if mtime != ultimo_mtime:
+            ultimo_mtime = mtime
+            logger.info("🔄 Cambio detectado en %s, recargando banco...", ARCHIVO_EXCEL)
+            cargar_preguntas()
 
 # Cargar preguntas al iniciar - VERSIÓN DEFINITIVA
-print("🔄 Iniciando sistema de evaluación...")
-print("=" * 50)
+logger.info("🔄 Iniciando sistema de evaluación...")
 cargar_preguntas()
-print("=" * 50)
 
 if len(PREGUNTAS) > 0:
-    print(f"✅ Sistema listo - {len(PREGUNTAS)} preguntas cargadas")
+    logger.info("✅ Sistema listo - %s preguntas cargadas", len(PREGUNTAS))
 else:
-    print(f"❌ Sistema no funcionará - 0 preguntas cargadas")
-    print(f"🔧 Verificar archivo 'Evaluación FWS PAN V2.xlsx'")
-
-# ✅ FUNCIÓN PARA EVALUAR RESPUESTAS - VERSIÓN MEJORADA CON LIMPIEZA
-def evaluar_respuesta(pregunta, respuesta_usuario):
-    """Evalúa si la respuesta del usuario es correcta - VERSIÓN MEJORADA"""
-    try:
-        respuesta_correcta = pregunta.get("respuesta_correcta")
-        opciones = pregunta.get("opciones", [])
-        nivel = pregunta.get("nivel", 1)
-        
-        print(f"🔍 DEBUG EVALUACIÓN:")
-        print(f"   Pregunta: {pregunta['pregunta'][:50]}...")
-        print(f"   Respuesta correcta: '{respuesta_correcta}'")
-        print(f"   Respuesta usuario: '{respuesta_usuario}'")
-        print(f"   Opciones: {opciones}")
-        
-        # ✅ LIMPIAR AMBAS RESPUESTAS PARA COMPARACIÓN
-        if respuesta_usuario and respuesta_correcta:
-            # Limpiar respuesta del usuario
-            respuesta_usuario_limpia = respuesta_usuario.strip().replace('\r', '').replace('\n', '').replace('\t', ' ')
-            respuesta_usuario_limpia = re.sub(r'\s+', ' ', respuesta_usuario_limpia).strip()
-            
-            # Limpiar respuesta correcta
-            respuesta_correcta_limpia = respuesta_correcta.strip().replace('\r', '').replace('\n', '').replace('\t', ' ')
-            respuesta_correcta_limpia = re.sub(r'\s+', ' ', respuesta_correcta_limpia).strip()
-            
-            print(f"   Comparación limpia:")
-            print(f"      Usuario limpio: '{respuesta_usuario_limpia}'")
-            print(f"      Correcta limpia: '{respuesta_correcta_limpia}'")
-            
-            # ✅ COMPARAR VERSIONES LIMPIAS (case-insensitive)
-            if respuesta_usuario_limpia.lower() == respuesta_correcta_limpia.lower():
-                puntos = 1.0 * nivel
-                print(f"   ✅ CORRECTA - Puntos: {puntos}")
-                return True, puntos
-            else:
-                print(f"   ❌ INCORRECTA")
-                print(f"      No coinciden después de limpiar")
-                return False, 0.0
-        else:
-            print(f"   ❌ INCORRECTA - Datos faltantes")
-            return False, 0.0
-                
-    except Exception as e:
-        print(f"❌ Error evaluando respuesta: {e}")
-        import traceback
-        traceback.print_exc()
-        return False, 0.0
+    logger.error("❌ Sistema no funcionará - 0 preguntas cargadas. Verificar archivo '%s'", ARCHIVO_EXCEL)
+
+if RECARGA_AUTOMATICA > 0:
+    threading.Thread(target=vigilar_excel, args=(RECARGA_AUTOMATICA,), daemon=True, name='vigilar-excel').start()
+
+# ✅ INSTRUMENTACIÓN: latencia, peticiones en curso y errores por ruta
+@app.before_request
+def iniciar_medicion():
+    g.metricas_ruta = request.url_rule.rule if request.url_rule else 'desconocida'
+    g.metricas_inicio = time.perf_counter()
+    metricas.EN_CURSO.inc(g.metricas_ruta)
+
+@app.after_request
+def registrar_codigo_respuesta(response):
+    g.metricas_codigo = response.status_code
+    return response
+
+@app.teardown_request
+def finalizar_medicion(error=None):
+    ruta = g.pop('metricas_ruta', None)
+    if ruta is None:
+        return
+    codigo = g.pop('metricas_codigo', 500)
+    metricas.EN_CURSO.dec(ruta)
+    metricas.DURACION.observar(time.perf_counter() - g.pop('metricas_inicio'), ruta)
+    metricas.PETICIONES.inc(ruta, request.method, str(codigo))
+    if error is not None or codigo >= 500:
+        metricas.ERRORES.inc(ruta)
+
+@app.route('/metrics')
+def metrics():
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+# ✅ SESIÓN DEL CANDIDATO DE LA PETICIÓN ACTUAL
+def cargar_sesion_candidato():
+    """Estado de evaluación del candidato asociado a la cookie, o {} si no hay"""
+    codigo = session.get('codigo_candidato')
+    if not codigo:
+        return {}
+    
+    estado = SESIONES.obtener(codigo)
+    if estado is None:
+        return {}
+    
+    # Se guarda al final de la petición (ver guardar_sesion_candidato)
+    g.codigo_candidato = codigo
+    g.candidato_actual = estado
+    return estado
+
+@app.after_request
+def guardar_sesion_candidato(response):
+    estado = g.pop('candidato_actual', None)
+    if estado:
+        SESIONES.guardar(g.codigo_candidato, estado)
+    return response
 
 # RUTAS PRINCIPALES
 @app.route('/')
@@ -418,29 +304,55 @@ def admin_authenticate():
 
 @app.route('/admin/dashboard')
 def admin_dashboard():
-    return render_template('admin_dashboard.html', candidatos=list(candidatos_registrados.values()))
+    # La lista se pide paginada por AJAX desde el propio dashboard
+    return render_template('admin_dashboard.html')
+
+def filtros_listado_candidatos():
+    """Paginación y filtros comunes de los listados de candidatos (query string)"""
+    completada = request.args.get('completada')
+    if completada is not None:
+        completada = completada.lower() in ('1', 'true', 'si', 'sí')
+    # ✅ Se acota aquí una sola vez: lo que se devuelve (y las páginas) es lo que se lista
+    pagina, por_pagina = candidatos.limitar_paginacion(
+        request.args.get('pagina', 1, type=int),
+        request.args.get('por_pagina', candidatos.POR_PAGINA_DEFECTO, type=int)
+    )
+    return {
+        "pagina": pagina,
+        "por_pagina": por_pagina,
+        "completada": completada,
+        "email": request.args.get('email') or None,
+        "busqueda": request.args.get('q') or None,
+        "desde": request.args.get('desde') or None,
+        "hasta": request.args.get('hasta') or None
+    }
+
+def pagina_candidatos_json(lista, total, filtros, campos=None):
+    if campos:
+        lista = [{campo: c.get(campo) for campo in campos} for c in lista]
+    return jsonify({
+        "candidatos": lista,
+        "total": total,
+        "pagina": filtros["pagina"],
+        "por_pagina": filtros["por_pagina"],
+        "paginas": (total + filtros["por_pagina"] - 1) // filtros["por_pagina"]
+    })
 
 @app.route('/admin/candidatos')
 def admin_candidatos():
+    filtros = filtros_listado_candidatos()
+    lista, total = candidatos.listar_candidatos(**filtros)
+    
     # Detectar si es petición AJAX
     if (request.headers.get('Accept', '').find('application/json') != -1 or 
         request.args.get('format') == 'json'):
-        
-        candidatos_list = []
-        for candidato in candidatos_registrados.values():
-            candidatos_list.append({
-                "codigo": candidato["codigo"],
-                "nombre_completo": candidato["nombre_completo"],
-                "email": candidato["email"],
-                "telefono": candidato.get("telefono", ""),
-                "cargo": candidato.get("cargo", ""),
-                "evaluacion_completada": candidato.get("evaluacion_completada", False),
-                "url_evaluacion": candidato.get("link_evaluacion", "")
-            })
-        return jsonify(candidatos_list)
+        return pagina_candidatos_json(lista, total, filtros, campos=[
+            "codigo", "nombre_completo", "email", "telefono", "cargo",
+            "evaluacion_completada", "url_evaluacion"
+        ])
     
     # Si es petición normal, devolver HTML
-    return render_template('panel_admin.html', candidatos=list(candidatos_registrados.values()))
+    return render_template('panel_admin.html', candidatos=lista)
 
 @app.route('/admin/registrar_candidato', methods=['POST'])
 def registrar_candidato():
@@ -462,30 +374,70 @@ def registrar_candidato():
     # Generar código único
     import string
     codigo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    while candidatos.existe_candidato(codigo):
+        codigo = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
     
-    candidatos_registrados[codigo] = {
-        "codigo": codigo,
-        "nombre_completo": nombre,
-        "email": email,
-        "telefono": telefono,
-        "cargo": cargo,
-        "fecha_registro": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "evaluacion_completada": False,
-        "link_evaluacion": f"http://localhost:5000/evaluacion/{codigo}",
-        "url_evaluacion": f"http://localhost:5000/evaluacion/{codigo}"  # Para JavaScript
-    }
+    candidato = candidatos.registrar_candidato(
+        codigo, nombre, email, telefono, cargo,
+        link_evaluacion=f"http://localhost:5000/evaluacion/{codigo}"
+    )
     
-    print(f"✅ Candidato registrado: {nombre} - Código: {codigo}")
+    logger.info("✅ Candidato registrado: %s - Código: %s", nombre, codigo)
     
     # Responder según el tipo de petición
     if request.is_json:
         return jsonify({
             "success": True,
-            "candidato": candidatos_registrados[codigo]
+            "candidato": candidato
         })
     else:
         return redirect(url_for('admin_candidatos'))
 
+# ✅ RECARGA DEL BANCO SIN REINICIAR (se construye en segundo plano)
+@app.route('/admin/recargar_preguntas', methods=['POST'])
+def admin_recargar_preguntas():
+    if _lock_recarga.locked():
+        return jsonify({"success": False, "mensaje": "Ya hay una recarga en curso"}), 409
+    threading.Thread(target=cargar_preguntas, daemon=True, name='recarga-banco').start()
+    return jsonify({"success": True, "mensaje": "Recarga iniciada", "version_actual": BANCO.version}), 202
+
+# ✅ ESTADÍSTICAS POR PREGUNTA (p-valor, discriminación, distractores, nivel sospechoso)
+@app.route('/admin/estadisticas_items')
+def admin_estadisticas_items():
+    procesados = estadisticas_items.actualizar()
+    tabla = estadisticas_items.calcular(BANCO.preguntas)
+    if request.args.get('solo_marcadas'):
+        tabla = tabla[tabla["revisar_nivel"] | tabla["baja_discriminacion"]]
+    return jsonify({
+        "resultados_procesados": procesados,
+        "total": len(tabla),
+        "preguntas": estadisticas_items.a_registros(tabla)
+    })
+
+@app.route('/admin/estado_banco')
+def admin_estado_banco():
+    return jsonify({
+        "version": BANCO.version,
+        "total_preguntas": len(BANCO),
+        "versiones_recientes": list(BANCOS_RECIENTES.keys()),
+        "recargando": _lock_recarga.locked()
+    })
+
+# ✅ EXPORTACIÓN MASIVA: ZIP con los reportes de los resultados filtrados (se envía por trozos)
+@app.route('/admin/exportar_reportes')
+def admin_exportar_reportes():
+    filtros = filtros_listado_candidatos()
+    del filtros["pagina"], filtros["por_pagina"]
+    nombre = f"reportes_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.zip"
+    return Response(
+        exportar_reportes.exportar_zip(**filtros),
+        mimetype='application/zip',
+        headers={
+            "Content-Disposition": f'attachment; filename="{nombre}"',
+            "X-Total-Reportes": str(candidatos.contar_resultados(**filtros))
+        }
+    )
+
 # AGREGAR ESTE NUEVO ENDPOINT PARA LOGOUT
 @app.route('/admin/logout')
 def admin_logout():
@@ -493,10 +445,10 @@ def admin_logout():
 
 @app.route('/evaluacion/<codigo>')
 def evaluacion(codigo):
-    if codigo not in candidatos_registrados:
+    candidato = candidatos.obtener_candidato(codigo)
+    if candidato is None:
         return render_template('error.html', mensaje="Código de candidato inválido")
     
-    candidato = candidatos_registrados[codigo]
     if candidato.get("evaluacion_completada", False):
         return render_template('error.html', mensaje="Esta evaluación ya ha sido completada")
     
@@ -504,28 +456,27 @@ def evaluacion(codigo):
 
 @app.route('/iniciar_evaluacion', methods=['POST'])
 def iniciar_evaluacion():
-    global candidato_actual
-    
     data = request.get_json()
     nombre = data.get('nombre') or ""
     documento = data.get('documento') or ""
     email = data.get('email') or ""
     telefono = data.get('telefono') or ""
     
-    print(f"=== INICIAR EVALUACIÓN ===")
-    print(f"Buscando candidato: {documento}")
+    logger.debug("=== INICIAR EVALUACIÓN ===")
+    logger.debug("Buscando candidato: %s", documento)
     
     # Buscar candidato
     candidato_encontrado = None
     codigo_encontrado = None
     
-    if documento and documento in candidatos_registrados:
-        candidato_encontrado = candidatos_registrados[documento]
-        codigo_encontrado = documento
-        print(f"✅ Candidato encontrado: {codigo_encontrado}")
+    if documento:
+        candidato_encontrado = candidatos.obtener_candidato(documento)
+        codigo_encontrado = documento if candidato_encontrado else None
     
     if candidato_encontrado:
-        # ✅ REINICIAR COMPLETAMENTE candidato_actual
+        logger.debug("✅ Candidato encontrado: %s", codigo_encontrado)
+        
+        # ✅ REINICIAR COMPLETAMENTE LA SESIÓN DEL CANDIDATO
         candidato_actual = {
             "datos_personales": {
                 "codigo": codigo_encontrado,
@@ -536,121 +487,94 @@ def iniciar_evaluacion():
             "nivel": 1,
             "puntos": 0,
             "respuestas_correctas_nivel": 0,
+            "contadores": contadores.nuevos(),  # ← TOTALES POR NIVEL, SIN RECORRER RESPUESTAS
+            "selector": SELECTOR.nombre,
+            "version_banco": BANCO.version,  # ← LA EVALUACIÓN SIGUE CON ESTA VERSIÓN
             "preguntas_mostradas": [],
+            "ids_mostrados": set(),  # ← BÚSQUEDA O(1) AL SELECCIONAR
             "evaluacion_completa": False,  # ← ASEGURAR QUE ESTÁ EN FALSE
             "respuestas": []  # ← AGREGAR PARA EVITAR ERRORES
         }
+        SELECTOR.iniciar(candidato_actual)
         
         # ✅ LIMPIAR ESTADO ANTERIOR DEL CANDIDATO
-        if codigo_encontrado in candidatos_registrados:
-            candidatos_registrados[codigo_encontrado]["evaluacion_completada"] = False
+        candidatos.actualizar_candidato(codigo_encontrado, evaluacion_completada=False)
         
-        print(f"✅ Evaluación iniciada para: {candidato_encontrado['nombre_completo']}")
-        print(f"   Estado limpio: preguntas_mostradas={len(candidato_actual['preguntas_mostradas'])}")
-        print(f"   evaluacion_completa={candidato_actual['evaluacion_completa']}")
+        session['codigo_candidato'] = codigo_encontrado
+        g.codigo_candidato = codigo_encontrado
+        g.candidato_actual = candidato_actual
+        
+        logger.info("✅ Evaluación iniciada para: %s (%s)", candidato_encontrado['nombre_completo'], codigo_encontrado)
         
         return jsonify({"mensaje": "Evaluación iniciada correctamente"})
     else:
-        print(f"❌ Candidato no encontrado: {documento}")
+        logger.warning("❌ Candidato no encontrado: %s", documento)
         return jsonify({"error": "Candidato no registrado"})
 
 @app.route('/api/configuracion')
 def api_configuracion():
     """Endpoint para que el frontend obtenga la configuración automáticamente"""
     config = get_configuracion_evaluacion()
+    config["selector"] = SELECTOR.nombre
     return jsonify(config)
 
 @app.route('/obtener_pregunta')
 def obtener_pregunta():
-    print(f"🔍 DEBUG obtener_pregunta:")
-    print(f"   Total PREGUNTAS disponibles: {len(PREGUNTAS)}")
-    print(f"   candidato_actual existe: {bool(candidato_actual)}")
+    candidato_actual = cargar_sesion_candidato()
     
     if not candidato_actual:
         return jsonify({"error": "Evaluación no iniciada"})
     
-    if len(PREGUNTAS) == 0:
+    try:
+        banco = banco_de_sesion(candidato_actual)
+    except BancoNoDisponible as e:
+        return respuesta_banco_no_disponible(candidato_actual, e)
+    logger.debug("🔍 obtener_pregunta: banco %s con %s preguntas", banco.version, len(banco))
+    
+    if len(banco) == 0:
         return jsonify({"error": "No hay preguntas disponibles"})
     
     # Inicializar campos
     if "preguntas_mostradas" not in candidato_actual:
         candidato_actual["preguntas_mostradas"] = []
+    if "ids_mostrados" not in candidato_actual:
+        candidato_actual["ids_mostrados"] = set(candidato_actual["preguntas_mostradas"])
     if "evaluacion_completa" not in candidato_actual:
         candidato_actual["evaluacion_completa"] = False
     
     preguntas_mostradas = candidato_actual["preguntas_mostradas"]
+    ids_mostrados = candidato_actual["ids_mostrados"]
     
     # LÍMITE DE PREGUNTAS AUTOMÁTICO
     if len(preguntas_mostradas) >= TOTAL_PREGUNTAS:
         candidato_actual["evaluacion_completa"] = True
         return jsonify({"error": "Evaluación completada"})
     
-    # ✅ LÓGICA AUTOMÁTICA BASADA EN CONFIGURACIÓN
-    config = get_configuracion_evaluacion()
-    nivel_candidato = candidato_actual.get("nivel", 1)
-
-    # Usar configuración automática para nivel 1
-    if len(preguntas_mostradas) < config["preguntas_nivel_1"]:
-        nivel_busqueda = 1
-        print(f"🎯 FORZANDO NIVEL 1 - Pregunta {len(preguntas_mostradas) + 1}/{config['preguntas_nivel_1']}")
-    else:
-        nivel_busqueda = nivel_candidato
-        print(f"📊 Usando nivel del candidato: {nivel_candidato}")
-        print(f"🔍 DEBUG: Candidato ha avanzado - buscando preguntas nivel {nivel_busqueda}")
-    
-    # FILTRAR PREGUNTAS DISPONIBLES DEL NIVEL EXACTO
-    preguntas_disponibles = [
-        p for p in PREGUNTAS 
-        if p["id"] not in preguntas_mostradas and p["nivel"] == nivel_busqueda
-    ]
-    
-    print(f"📊 Preguntas disponibles nivel {nivel_busqueda}: {len(preguntas_disponibles)}")
-    
-    # DEBUG: Mostrar distribución de niveles en PREGUNTAS
-    if len(preguntas_disponibles) == 0:
-        print(f"❌ NO HAY PREGUNTAS DE NIVEL {nivel_busqueda}")
-        
-        # Mostrar qué niveles SÍ hay disponibles
-        niveles_disponibles = {}
-        for p in PREGUNTAS:
-            if p["id"] not in preguntas_mostradas:
-                nivel = p["nivel"]
-                if nivel not in niveles_disponibles:
-                    niveles_disponibles[nivel] = 0
-                niveles_disponibles[nivel] += 1
-        
-        print(f"   📊 Niveles disponibles: {niveles_disponibles}")
-        
-        # Si es nivel 1 y no hay, es un error crítico
-        if nivel_busqueda == 1:
-            print(f"🚨 ERROR CRÍTICO: No hay preguntas de nivel 1")
-            return jsonify({"error": "No hay preguntas básicas disponibles"})
+    # ✅ SELECCIÓN DELEGADA AL MOTOR CONFIGURADO (niveles o IRT)
+    categoria = request.args.get('categoria') or None
+    try:
+        pregunta_seleccionada = selector_de_sesion(candidato_actual).siguiente(banco, candidato_actual, categoria)
+    except seleccion.SinPreguntas as e:
+        if e.critica:
+            logger.error("🚨 ERROR CRÍTICO: %s", e)
         else:
-            # Para otros niveles, finalizar evaluación
+            # Finalizar evaluación
             candidato_actual["evaluacion_completa"] = True
-            return jsonify({"error": "No hay más preguntas del nivel requerido"})
-    
-    # ✅ SELECCIÓN ALEATORIA SIMPLE
-    pregunta_seleccionada = random.choice(preguntas_disponibles)
-    
-    print(f"📝 PREGUNTA SELECCIONADA:")
-    print(f"   ID: {pregunta_seleccionada['id']}")
-    print(f"   Nivel: {pregunta_seleccionada['nivel']} (Buscado: {nivel_busqueda})")
-    print(f"   Pregunta: {pregunta_seleccionada['pregunta'][:60]}...")
+        return jsonify({"error": str(e)})
     
-    # VERIFICACIÓN DE SEGURIDAD
-    if pregunta_seleccionada["nivel"] != nivel_busqueda:
-        print(f"🚨 ALERTA: Pregunta nivel {pregunta_seleccionada['nivel']} cuando se buscaba nivel {nivel_busqueda}")
-        print(f"   Esto NO debería pasar. Revisar datos del Excel.")
+    logger.debug("📝 PREGUNTA SELECCIONADA: id=%s nivel=%s",
+                 pregunta_seleccionada['id'], pregunta_seleccionada['nivel'])
     
     # ✅ MARCAR PREGUNTA COMO MOSTRADA
     candidato_actual["preguntas_mostradas"].append(pregunta_seleccionada["id"])
+    ids_mostrados.add(pregunta_seleccionada["id"])
     
     return jsonify({
         "id": pregunta_seleccionada["id"],
         "pregunta": pregunta_seleccionada["pregunta"],
         "opciones": pregunta_seleccionada["opciones"],
         "imagen": pregunta_seleccionada.get("imagen"),
+        "imagen_srcset": pregunta_seleccionada.get("imagen_srcset", ""),
         "nivel_pregunta": pregunta_seleccionada["nivel"],
         "nivel_candidato": candidato_actual.get("nivel", 1),
         "pregunta_numero": len(candidato_actual["preguntas_mostradas"]),
@@ -661,27 +585,44 @@ def obtener_pregunta():
 
 @app.route('/responder', methods=['POST'])
 def responder():
-    global candidato_actual
+    candidato_actual = cargar_sesion_candidato()
+    if not candidato_actual:
+        return jsonify({"error": "Evaluación no iniciada"})
     
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Se esperaba un objeto JSON"}), 400
     respuesta_usuario = data.get('respuesta')
     pregunta_id = data.get('pregunta_id')
-    respuestas_seleccionadas = data.get('respuestas_seleccionadas', [])
+    respuestas_seleccionadas = data.get('respuestas_seleccionadas') or []
+    indices_seleccionados = data.get('indices_seleccionados') or []
     
-    print(f"🔍 DEBUG RESPONDER:")
-    print(f"   Pregunta ID: {pregunta_id}")
-    print(f"   Respuesta usuario: {respuesta_usuario}")
+    # ✅ VALIDAR UNA VEZ: lo que sigue (índice por id, máscara, respuesta guardada) da por hecho los tipos
+    if not isinstance(pregunta_id, int) or isinstance(pregunta_id, bool):
+        return jsonify({"error": "pregunta_id debe ser un entero"}), 400
+    if not isinstance(indices_seleccionados, list) or not all(
+            isinstance(indice, int) and not isinstance(indice, bool) for indice in indices_seleccionados):
+        return jsonify({"error": "indices_seleccionados debe ser una lista de enteros"}), 400
+    if not isinstance(respuestas_seleccionadas, list):
+        return jsonify({"error": "respuestas_seleccionadas debe ser una lista"}), 400
     
-    # Buscar la pregunta
-    pregunta = next((p for p in PREGUNTAS if p["id"] == pregunta_id), None)
+    logger.debug("🔍 responder: pregunta %s, respuesta %r", pregunta_id, respuesta_usuario)
+    
+    # Buscar la pregunta en el índice por id (en la versión del banco de la evaluación)
+    try:
+        banco = banco_de_sesion(candidato_actual)
+    except BancoNoDisponible as e:
+        return respuesta_banco_no_disponible(candidato_actual, e)
+    pregunta = banco.obtener(pregunta_id)
     if not pregunta:
         return jsonify({"error": "Pregunta no encontrada"})
     
     # Evaluar respuesta
-    es_correcta, puntos_obtenidos = evaluar_respuesta(pregunta, respuesta_usuario)
+    es_correcta, puntos_obtenidos, credito = evaluar_respuesta(
+        pregunta, respuesta_usuario, indices_seleccionados, respuestas_seleccionadas)
     
     # Actualizar puntos
-    candidato_actual["puntos"] = candidato_actual.get("puntos", 0) + puntos_obtenidos
+    candidato_actual["puntos"] = round(candidato_actual.get("puntos", 0) + puntos_obtenidos, 2)
     
     # ✅ LÓGICA CORREGIDA DE AVANCE DE NIVEL
     config = get_configuracion_evaluacion()
@@ -697,7 +638,11 @@ def responder():
         "pregunta": pregunta["pregunta"],
         "respuesta": respuesta_usuario,
         "respuestas_seleccionadas": respuestas_seleccionadas,
+        # Opciones marcadas por índice: base de las frecuencias de distractores (estadisticas_items.py)
+        "indices_seleccionados": indices_de_mascara(
+            mascara_respuesta(pregunta, respuesta_usuario, indices_seleccionados, respuestas_seleccionadas)),
         "correcta": es_correcta,
+        "credito": credito,  # ← 1.0 correcta, entre 0 y 1 crédito parcial (múltiple)
         "puntos": puntos_obtenidos,
         "nivel_pregunta": pregunta["nivel"],
         "nivel_candidato": nivel_candidato_actual,
@@ -707,79 +652,41 @@ def responder():
     
     candidato_actual["respuestas"].append(nueva_respuesta)
     
-    # ✅ DEBUG DETALLADO NIVEL
-    print(f"\n🔍 DEBUG DETALLADO NIVEL:")
-    print(f"   Config completa: {config}")
-    print(f"   Nivel candidato ANTES: {nivel_candidato_actual}")
-    print(f"   Pregunta actual fue nivel: {pregunta['nivel']}")
-    print(f"   ¿Pregunta fue correcta?: {es_correcta}")
-    print(f"   Puntos obtenidos: {puntos_obtenidos}")
-    
-    # ✅ LÓGICA CORREGIDA - SIN DUPLICACIÓN
-    todas_respuestas = candidato_actual["respuestas"]
-    
-    # Contar respuestas del nivel ACTUAL del candidato
-    respuestas_nivel_actual = [
-        r for r in todas_respuestas 
-        if r.get("nivel_candidato") == nivel_candidato_actual
-    ]
-    
-    # Contar correctas del nivel actual
-    correctas_nivel_actual = len([
-        r for r in respuestas_nivel_actual 
-        if r.get("correcta", False)
-    ])
-    
-    total_preguntas_nivel_actual = len(respuestas_nivel_actual)
-    
-    print(f"   Respuestas del candidato nivel {nivel_candidato_actual}: {len(respuestas_nivel_actual)}")
-    print(f"   De esas, correctas: {correctas_nivel_actual}")
-    print(f"   Configuración requiere {config['preguntas_nivel_1']} preguntas")
-    print(f"   Configuración requiere {config['min_correctas_avance']} correctas")
-    print(f"   ¿Cumple condición?: preguntas={total_preguntas_nivel_actual >= config['preguntas_nivel_1']}, correctas={correctas_nivel_actual >= config['min_correctas_avance']}, no_max={nivel_candidato_actual < 5}")
-    
-    # ✅ CONDICIÓN PARA AVANZAR DE CUALQUIER NIVEL
-    avanzar_nivel = False
-    
-    if (total_preguntas_nivel_actual >= config["preguntas_nivel_1"] and 
-        correctas_nivel_actual >= config["min_correctas_avance"] and 
-        nivel_candidato_actual < 5):
-        
-        # ✅ CUMPLE CONDICIÓN PARA AVANZAR
-        candidato_actual["nivel"] += 1
-        avanzar_nivel = True
-        print(f"🎉 ¡NIVEL UP! {nivel_candidato_actual} → {candidato_actual['nivel']}")
-        print(f"   ✅ Logró {correctas_nivel_actual}/{config['min_correctas_avance']} correctas")
-        print(f"   ✅ Completó {total_preguntas_nivel_actual}/{config['preguntas_nivel_1']} preguntas")
-    elif nivel_candidato_actual >= 5:
-        print(f"🏆 YA EN NIVEL MÁXIMO: {nivel_candidato_actual}")
-    else:
-        print(f"⏳ ESPERANDO EN NIVEL {nivel_candidato_actual}:")
-        print(f"   Preguntas: {total_preguntas_nivel_actual}/{config['preguntas_nivel_1']}")
-        print(f"   Correctas: {correctas_nivel_actual}/{config['min_correctas_avance']}")
+    # ✅ CONTADORES ACUMULADOS DEL NIVEL ACTUAL (O(1), sin recorrer las respuestas)
+    conteos = contadores.de_candidato(candidato_actual)
+    contadores.registrar(conteos, nivel_candidato_actual, es_correcta)
+    correctas_nivel_actual = conteos["correctas"][nivel_candidato_actual]
+    total_preguntas_nivel_actual = conteos["respondidas"][nivel_candidato_actual]
+    
+    logger.debug("🔍 Nivel %s: %s/%s preguntas, %s/%s correctas (pregunta nivel %s, correcta=%s, puntos=%s)",
+                 nivel_candidato_actual, total_preguntas_nivel_actual, config['preguntas_nivel_1'],
+                 correctas_nivel_actual, config['min_correctas_avance'], pregunta['nivel'],
+                 es_correcta, puntos_obtenidos)
+    
+    # ✅ AVANCE DE NIVEL SEGÚN EL MOTOR DE SELECCIÓN
+    selector = selector_de_sesion(candidato_actual)
+    avanzar_nivel = selector.registrar(candidato_actual, pregunta, es_correcta, credito)
     
-    # Verificar si hay más preguntas
+    # Verificar si hay más preguntas (el motor IRT puede terminar antes si ya midió con precisión)
     preguntas_mostradas = len(candidato_actual.get("preguntas_mostradas", []))
-    hay_mas_preguntas = preguntas_mostradas < TOTAL_PREGUNTAS and not candidato_actual.get("evaluacion_completa", False)
+    hay_mas_preguntas = (preguntas_mostradas < TOTAL_PREGUNTAS
+                         and not candidato_actual.get("evaluacion_completa", False)
+                         and not selector.terminado(candidato_actual))
     
     # Actualizar estado si terminó
     if not hay_mas_preguntas:
         candidato_actual["evaluacion_completa"] = True
         codigo = candidato_actual.get("datos_personales", {}).get("codigo")
         
-        if codigo and codigo in candidatos_registrados:
-            candidatos_registrados[codigo]["evaluacion_completada"] = True
-            candidatos_registrados[codigo]["puntos_finales"] = candidato_actual.get("puntos", 0)
-            candidatos_registrados[codigo]["nivel_final"] = candidato_actual.get("nivel", 1)
-            print(f"✅ Evaluación completada para: {codigo}")
-    
-    # Log de debug final
-    print(f"📝 RESULTADO FINAL:")
-    print(f"   Respuesta: '{respuesta_usuario}' | Correcta: {es_correcta}")
-    print(f"   Puntos ganados: {puntos_obtenidos}")
-    print(f"   Nivel actual: {candidato_actual.get('nivel', 1)}")
-    print(f"   ¿Avanzó de nivel?: {avanzar_nivel}")
-    print(f"   Hay más preguntas: {hay_mas_preguntas}")
+        if codigo:
+            candidatos.actualizar_candidato(
+                codigo,
+                evaluacion_completada=True,
+                puntos_finales=candidato_actual.get("puntos", 0),
+                nivel_final=candidato_actual.get("nivel", 1)
+            )
+            candidatos.guardar_resultado(codigo, candidato_actual)
+            logger.info("✅ Evaluación completada para: %s", codigo)
     
     # ✅ RESPUESTA ESPERADA POR EL FRONTEND
     return jsonify({
@@ -795,70 +702,48 @@ def responder():
 
 @app.route('/generar_pdf_final', methods=['POST'])
 def generar_pdf_final():
-    global candidato_actual
+    candidato_actual = cargar_sesion_candidato()
     
     if not candidato_actual:
         return jsonify({"error": "No hay evaluación activa"})
     
     try:
-        # ✅ GENERAR PDF LOCAL
-        from pdf_generator import CandidateReportGenerator
-        generator = CandidateReportGenerator()
-        pdf_path = generator.generate_candidate_report(candidato_actual)
-        
-        # ✅ SUBIR A GOOGLE DRIVE - USANDO TU ARCHIVO EXISTENTE
-        drive_info = None
-        try:
-            from drive_integration import save_pdf_to_drive
-            drive_result = save_pdf_to_drive(pdf_path)
-            if drive_result.get('success'):
-                drive_info = {
-                    'link': drive_result.get('link'),
-                    'name': drive_result.get('file_name')
-                }
-                print(f"☁️ PDF subido a Google Drive: {drive_info['link']}")
-            else:
-                print(f"⚠️ Error subiendo a Google Drive: {drive_result.get('error')}")
-        except Exception as e:
-            print(f"⚠️ Error con Google Drive: {e}")
-        
-        # Calcular estadísticas finales
-        respuestas = candidato_actual.get('respuestas', [])
-        correctas = len([r for r in respuestas if r.get('correcta', False)])
-        total = len(respuestas)
-        porcentaje = (correctas / max(total, 1)) * 100
+        # Estadísticas finales desde los contadores acumulados
+        conteos = contadores.de_candidato(candidato_actual)
+        correctas = conteos["total_correctas"]
+        total = conteos["total_respondidas"]
+        porcentaje = contadores.porcentaje(correctas, total)
         
         # Marcar evaluación como completada
         candidato_actual["evaluacion_completa"] = True
         codigo = candidato_actual.get("datos_personales", {}).get("codigo")
         
-        if codigo and codigo in candidatos_registrados:
-            candidatos_registrados[codigo]["evaluacion_completada"] = True
-            candidatos_registrados[codigo]["puntos_finales"] = candidato_actual.get("puntos", 0)
-            candidatos_registrados[codigo]["nivel_final"] = candidato_actual.get("nivel", 1)
-            if drive_info:
-                candidatos_registrados[codigo]["google_drive_link"] = drive_info['link']
+        candidatos.actualizar_candidato(
+            codigo,
+            evaluacion_completada=True,
+            puntos_finales=candidato_actual.get("puntos", 0),
+            nivel_final=candidato_actual.get("nivel", 1)
+        )
+        candidatos.guardar_resultado(codigo, candidato_actual)
         
-        print(f"✅ PDF generado: {pdf_path}")
+        # ✅ PDF + GOOGLE DRIVE EN SEGUNDO PLANO (el worker no se bloquea)
+        trabajo_id = trabajos_pdf.encolar_reporte(codigo)
         
         return jsonify({
             "success": True,
-            "mensaje": "Evaluación completada y PDF generado",
+            "mensaje": "Evaluación completada, reporte en proceso",
             "correctas": correctas,
             "total": total,
             "porcentaje": round(porcentaje, 1),
             "nivel_final": candidato_actual.get("nivel", 1),
             "puntos": candidato_actual.get("puntos", 0),
-            "pdf_generado": True,
-            "pdf_path": pdf_path,
-            "google_drive_link": drive_info['link'] if drive_info else None,
-            "google_drive_subido": bool(drive_info)
+            "pdf_generado": False,
+            "trabajo_id": trabajo_id,
+            "estado_url": url_for('estado_pdf', trabajo_id=trabajo_id)
         })
         
     except Exception as e:
-        print(f"❌ Error generando PDF: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error encolando PDF: %s", e)
         
         return jsonify({
             "success": False,
@@ -866,24 +751,114 @@ def generar_pdf_final():
             "pdf_generado": False
         })
 
+@app.route('/estado_pdf/<trabajo_id>')
+def estado_pdf(trabajo_id):
+    trabajo = trabajos_pdf.obtener_trabajo(trabajo_id)
+    if trabajo is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    
+    resultado = trabajo["resultado"] or {}
+    return jsonify({
+        "trabajo_id": trabajo_id,
+        "estado": trabajo["estado"],
+        "intentos": trabajo["intentos"],
+        "pdf_generado": trabajo["estado"] == 'completado',
+        "pdf_path": resultado.get("pdf_path"),
+        "google_drive_link": resultado.get("google_drive_link"),
+        "google_drive_subido": resultado.get("google_drive_subido", False),
+        "descarga_url": url_for('descargar_reporte', codigo=trabajo["codigo"]),
+        "error": trabajo["error"] if trabajo["estado"] == 'error' else None
+    })
+
+# ✅ DESCARGA DIRECTA: el PDF sale de la caché o se genera en memoria desde el resultado guardado
+@app.route('/reporte_pdf/<codigo>')
+def descargar_reporte(codigo):
+    resultado = candidatos.obtener_resultado(codigo)
+    if resultado is None:
+        abort(404)
+    
+    generado = cache_reportes.obtener(resultado)
+    if generado is None:
+        return jsonify({"error": "No se pudo generar el reporte"}), 500
+    
+    # ETag = clave de contenido: una re-descarga sin cambios responde 304
+    clave, nombre_archivo, contenido = generado
+    return send_file(io.BytesIO(contenido), mimetype='application/pdf', as_attachment=True,
+                     download_name=nombre_archivo, etag=clave, conditional=True)
+
+# ✅ IMÁGENES DE PREGUNTAS: nombre por contenido => caché inmutable en el navegador
+@app.route('/imagenes/<nombre>')
+def imagen_pregunta(nombre):
+    ruta = imagenes.ruta_imagen(nombre)
+    if ruta is None:
+        abort(404)
+    
+    response = send_file(ruta, etag=nombre.split('.')[0], max_age=365 * 24 * 3600, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/reporte')
 def reporte():
-    return render_template('reporte.html', candidatos=candidatos_registrados.values())
+    lista, _ = candidatos.listar_candidatos(**filtros_listado_candidatos())
+    return render_template('reporte.html', candidatos=lista)
 
 @app.route('/api/candidatos')
 def api_candidatos():
-    return jsonify(candidatos_registrados)
+    filtros = filtros_listado_candidatos()
+    lista, total = candidatos.listar_candidatos(**filtros)
+    return pagina_candidatos_json(lista, total, filtros)
+
+API_PREGUNTAS_LIMITE = 100
+API_PREGUNTAS_LIMITE_MAXIMO = 1000
+
+# Sin fields= solo se devuelve esto: la clave de respuestas (respuesta_correcta, mascara_correcta...)
+# y los campos internos de calificación hay que pedirlos por nombre
+CAMPOS_PUBLICOS_PREGUNTA = ("id", "pregunta", "opciones", "nivel", "multiple", "imagen", "imagen_srcset", "categoria")
+
+def proyectar_pregunta(pregunta, campos):
+    return {campo: pregunta[campo] for campo in campos or CAMPOS_PUBLICOS_PREGUNTA if campo in pregunta}
 
 @app.route('/api/preguntas')
 def api_preguntas():
-    return jsonify(PREGUNTAS)
+    """Preguntas paginadas por cursor (id), con filtros y proyección de campos
+    
+    ?cursor=<último id>&limite=100&nivel=2&categoria=Redes&fields=id,pregunta,opciones
+    Sin fields= van los CAMPOS_PUBLICOS_PREGUNTA (sin la clave de respuestas).
+    ?stream=1 exporta todas las que cumplan los filtros como un array JSON en streaming
+    """
+    banco = BANCO  # referencia fija durante toda la respuesta
+    nivel = request.args.get('nivel', type=int)
+    categoria = request.args.get('categoria') or None
+    campos = [c.strip() for c in request.args.get('fields', '').split(',') if c.strip()]
+    
+    if request.args.get('stream') in ('1', 'true'):
+        preguntas = banco.filtrar(nivel, categoria)
+        
+        def generar():
+            yield '['
+            for i, pregunta in enumerate(preguntas):
+                yield (',' if i else '') + json.dumps(proyectar_pregunta(pregunta, campos), ensure_ascii=False)
+            yield ']'
+        
+        return Response(generar(), mimetype='application/json')
+    
+    cursor = request.args.get('cursor', 0, type=int)
+    limite = min(max(1, request.args.get('limite', API_PREGUNTAS_LIMITE, type=int)), API_PREGUNTAS_LIMITE_MAXIMO)
+    pagina, siguiente_cursor, total = banco.pagina(cursor, limite, nivel, categoria)
+    
+    return jsonify({
+        "preguntas": [proyectar_pregunta(p, campos) for p in pagina],
+        "siguiente_cursor": siguiente_cursor,
+        "total": total
+    })
 
 @app.route('/api/estadisticas')
 def api_estadisticas():
-    global candidatos_registrados
     return jsonify({
-        "total_candidatos": len(candidatos_registrados),
-        "total_preguntas": len(PREGUNTAS),
+        "total_candidatos": candidatos.contar_candidatos(),
+        "total_preguntas": len(BANCO),
+        "version_banco": BANCO.version,
         "niveles_disponibles": NIVELES
     })
 
@@ -898,10 +873,8 @@ def error_interno_servidor(error):
 
 # Ejecutar la aplicación
 if __name__ == '__main__':
-    print("\n🚀 SERVIDOR INICIADO")
-    print("=" * 50)
-    print(f"📊 Configuración actual: {TOTAL_PREGUNTAS} preguntas máximo")
-    print("Admin: http://localhost:5000/admin/login")
-    print("Usuario/Pass: admin / 123456")
-    print("=" * 50)
+    logger.info("🚀 SERVIDOR INICIADO")
+    logger.info("📊 Configuración actual: %s preguntas máximo", TOTAL_PREGUNTAS)
+    logger.info("Admin: http://localhost:5000/admin/login")
+    logger.info("Usuario/Pass: admin / 123456")
     app.run(debug=True, port=5000)
\ No newline at end of file
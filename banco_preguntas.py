@@ -0,0 +1,572 @@
+# Banco de preguntas: lectura del Excel y snapshot compilado
+# El snapshot evita repetir el parseo con pandas/openpyxl en cada arranque
+
+import logging
+import base64
+import bisect
+import glob
+import hashlib
+import itertools
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+import random
+import re
+import zipfile
+
+import imagenes
+import lector_excel
+from logs import configurar_logging_proceso_hijo
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_EXCEL = 'Evaluación FWS PAN V2.xlsx'
+DIRECTORIO_CACHE = 'cache'
+ARCHIVO_SNAPSHOT = os.path.join(DIRECTORIO_CACHE, 'preguntas.snapshot')
+# Copia por versión del banco: una evaluación en curso la recupera aunque el Excel cambie
+PATRON_SNAPSHOT_VERSION = os.path.join(DIRECTORIO_CACHE, 'preguntas-{version}.snapshot')
+SNAPSHOTS_VERSIONES = int(os.environ.get('SNAPSHOTS_VERSIONES', 20))
+PATRON_VERSION = re.compile(r'[0-9a-f]{12}')
+# Subir cuando cambie la forma de los diccionarios de pregunta o lo que se extrae del Excel
+VERSION_SNAPSHOT = 7
+
+#  FUNCIÓN PARA PROCESAR IMÁGENES 
+SIN_IMAGEN = (None, '')
+
+def _guardar_imagen(img_data):
+    """Normaliza y guarda los bytes; devuelve (url, srcset)"""
+    manifiesto = imagenes.guardar_normalizada(img_data)
+    return imagenes.url_imagen(manifiesto["principal"]), imagenes.srcset(manifiesto)
+
+def procesar_imagen_excel(imagen_raw):
+    """Procesa diferentes tipos de imagen del Excel y devuelve (url, srcset)
+    
+    Las imágenes se normalizan y guardan una vez en el almacén por contenido
+    (imagenes.py); la pregunta solo lleva las URLs, no el base64.
+    (None, '') si no hay imagen utilizable.
+    """
+    if imagen_raw is None or str(imagen_raw).strip() in ['nan', 'NaN', '', None, 'None']:
+        return SIN_IMAGEN
+    
+    try:
+        # ✅ CASO ESPECIAL 1: Imagen embebida de openpyxl
+        if hasattr(imagen_raw, '__class__'):
+            class_name = str(type(imagen_raw).__name__)
+            if 'Image' in class_name or 'Picture' in class_name:
+                logger.debug("🖼️ Imagen embebida detectada: %s", class_name)
+                try:
+                    # Extraer datos binarios según el tipo
+                    img_data = None
+                    
+                    # Para objetos de openpyxl
+                    if hasattr(imagen_raw, '_data'):
+                        img_data = imagen_raw._data()
+                    elif hasattr(imagen_raw, 'data'):
+                        img_data = imagen_raw.data
+                    elif hasattr(imagen_raw, 'image'):
+                        img_data = imagen_raw.image
+                    elif hasattr(imagen_raw, 'blob'):
+                        img_data = imagen_raw.blob
+                    
+                    if img_data and len(img_data) > 0:
+                        url, srcset = _guardar_imagen(img_data)
+                        logger.debug("✅ Imagen embebida procesada: %s (%s bytes)", url, len(img_data))
+                        return url, srcset
+                    else:
+                        logger.warning("⚠️ No se pudieron extraer datos de la imagen embebida")
+                        return SIN_IMAGEN
+                        
+                except Exception as e:
+                    logger.warning("⚠️ Error procesando imagen embebida: %s", e)
+                    return SIN_IMAGEN
+        
+        # ✅ CASO 2: Datos binarios directos (bytes)
+        if isinstance(imagen_raw, bytes):
+            if len(imagen_raw) > 100:  # Validar que tenga contenido suficiente
+                url, srcset = _guardar_imagen(imagen_raw)
+                logger.debug("✅ Bytes procesados: %s", url)
+                return url, srcset
+            else:
+                logger.warning("⚠️ Datos binarios muy pequeños: %s bytes", len(imagen_raw))
+                return SIN_IMAGEN
+        
+        # ✅ CASO 3: String con datos
+        imagen_str = str(imagen_raw).strip()
+        
+        # Data URL (p.ej. Excel generado por leer_imagenes.py): extraer los bytes
+        if imagen_str.startswith('data:image'):
+            img_data = base64.b64decode(imagen_str.split(',', 1)[1])
+            logger.debug("✅ Data URL encontrada")
+            return _guardar_imagen(img_data)
+        
+        # URL externa
+        if imagen_str.startswith(('http://', 'https://')):
+            logger.debug("✅ URL externa encontrada")
+            return imagen_str, ''
+        
+        # Path de archivo local
+        if os.path.exists(imagen_str):
+            try:
+                with open(imagen_str, "rb") as img_file:
+                    img_data = img_file.read()
+                logger.debug("✅ Archivo local procesado: %s", imagen_str)
+                return _guardar_imagen(img_data)
+            except Exception as e:
+                logger.warning("⚠️ Error leyendo archivo %s: %s", imagen_str, e)
+                return SIN_IMAGEN
+        
+        # String base64 sin prefijo
+        if len(imagen_str) > 100:
+            try:
+                img_data = base64.b64decode(imagen_str, validate=True)
+                logger.debug("✅ Base64 sin prefijo detectado")
+                return _guardar_imagen(img_data)
+            except:
+                logger.warning("⚠️ String largo pero no es base64 válido")
+                return SIN_IMAGEN
+        
+        logger.warning("⚠️ Formato no reconocido: %s - Contenido: %s...", type(imagen_raw), str(imagen_raw)[:50])
+        return SIN_IMAGEN
+        
+    except Exception as e:
+        logger.exception("⚠️ Error general procesando imagen: %s", e)
+        return SIN_IMAGEN
+
+# Procesos para normalizar imágenes al compilar (1 = en serie)
+IMAGENES_WORKERS = int(os.environ.get('IMAGENES_WORKERS', os.cpu_count() or 1))
+# Con menos imágenes que esto no compensa arrancar el pool
+MINIMO_IMAGENES_PARALELO = 4
+
+def _sin_imagen(imagen_raw):
+    return imagen_raw is None or str(imagen_raw).strip() in ['nan', 'NaN', '', 'None']
+
+def _procesar_en_worker(indice, imagen_raw):
+    return indice, procesar_imagen_excel(imagen_raw)
+
+def procesar_imagenes(filas_imagen, workers=None):
+    """{índice: (url, srcset)} para un iterable de (índice, imagen_raw)
+    
+    Las imágenes se reparten en un pool de procesos. El iterable se consume a medida
+    que hay hueco (como máximo 2 por worker en vuelo): con bancos grandes no se
+    tienen todos los bytes en memoria a la vez.
+    """
+    workers = IMAGENES_WORKERS if workers is None else workers
+    filas = ((i, raw) for i, raw in filas_imagen if not _sin_imagen(raw))
+    
+    # fork: el hijo hereda los módulos ya importados sin volver a ejecutar app.py.
+    # Desde el hilo de recarga es seguro: lo que toca el hijo no comparte locks con
+    # otros hilos del padre (métricas y caché se reinician al hacer fork)
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return {i: procesar_imagen_excel(raw) for i, raw in filas}
+    
+    primeras = []
+    for fila in filas:
+        primeras.append(fila)
+        if len(primeras) >= MINIMO_IMAGENES_PARALELO:
+            break
+    if len(primeras) < MINIMO_IMAGENES_PARALELO:
+        return {i: procesar_imagen_excel(raw) for i, raw in primeras}
+    
+    resultados = {}
+    en_vuelo = set()
+    maximo_en_vuelo = workers * 2
+    contexto = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                             initializer=configurar_logging_proceso_hijo) as pool:
+        for indice, imagen_raw in itertools.chain(primeras, filas):
+            if len(en_vuelo) >= maximo_en_vuelo:
+                listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                resultados.update(futuro.result() for futuro in listos)
+            en_vuelo.add(pool.submit(_procesar_en_worker, indice, imagen_raw))
+        resultados.update(futuro.result() for futuro in wait(en_vuelo).done)
+    
+    logger.debug("🖼️ %s imágenes procesadas con %s procesos", len(resultados), workers)
+    return resultados
+
+# Columnas de opciones y patrón de nivel ("Nivel 3", "nivel3"...)
+LETRAS_OPCIONES = ['A', 'B', 'C', 'D']
+PATRON_NIVEL = re.compile(r'[Nn]ivel\s*([1-5])')
+PATRON_ESPACIOS = re.compile(r'\s+')
+# Una o varias letras separadas por coma o punto y coma
+PATRON_RESPUESTA = re.compile(r'\s*[A-D](?:\s*[,;]\s*[A-D])*\s*')
+
+def normalizar_respuesta(texto):
+    """Clave de comparación de una opción: sin saltos de línea, espacios colapsados, minúsculas"""
+    return PATRON_ESPACIOS.sub(' ', str(texto).replace('\r', '').replace('\n', '')).strip().lower()
+
+def claves_opciones(opciones):
+    """{clave normalizada: índice} de las opciones (si se repite una, gana la primera)"""
+    claves = {}
+    for indice, opcion in enumerate(opciones):
+        claves.setdefault(normalizar_respuesta(opcion), indice)
+    return claves
+
+def leer_preguntas_excel(archivo_excel=ARCHIVO_EXCEL):
+    """Parsea el Excel y devuelve la lista de preguntas (camino lento)
+    
+    Una sola pasada: celdas en streaming y las imágenes embebidas directo del zip,
+    unidas a su fila por el ancla del dibujo.
+    """
+    # pandas solo se importa al compilar: arrancar desde el snapshot no lo necesita
+    import pandas as pd
+    
+    if not zipfile.is_zipfile(archivo_excel):
+        # .xls antiguo: sin imágenes embebidas recuperables
+        df = pd.read_excel(archivo_excel)
+        logger.debug("📊 Excel cargado: %s filas", len(df))
+        return preguntas_desde_dataframe(df)
+    
+    encabezados, filas = lector_excel.leer_filas(archivo_excel)
+    df = pd.DataFrame.from_records(filas, columns=encabezados)
+    logger.debug("📊 Excel cargado: %s filas", len(df))
+    
+    with zipfile.ZipFile(archivo_excel) as zip_xlsx:
+        columna_imagen = encabezados.index('IMAGEN') + 1 if 'IMAGEN' in encabezados else None
+        ancladas = lector_excel.ImagenesAncladas(zip_xlsx, lector_excel.anclas_imagenes(zip_xlsx), columna_imagen)
+        logger.debug("🖼️ Imágenes embebidas ancladas: %s", len(ancladas))
+        return preguntas_desde_dataframe(df, ancladas)
+
+def _columna_texto(df, nombre):
+    """Columna como texto sin NaN ('' si falta la columna o la celda)"""
+    import pandas as pd
+    if nombre not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    columna = df[nombre]
+    return columna.where(columna.notna(), '').astype(str)
+
+def _columna_numerica(df, nombre):
+    """Columna como lista de float, None si falta la columna o la celda no es un número"""
+    import pandas as pd
+    if nombre not in df.columns:
+        return [None] * len(df)
+    valores = pd.to_numeric(df[nombre], errors='coerce')
+    return [None if pd.isna(v) else float(v) for v in valores]
+
+def _limpiar_texto(serie):
+    """Quita saltos de línea/tabuladores y normaliza espacios en toda la columna"""
+    return (serie.str.replace(r'[\r\n]', '', regex=True)
+                 .str.replace(r'\s+', ' ', regex=True)
+                 .str.strip())
+
+def preguntas_desde_dataframe(df, imagenes_ancladas=None):
+    """Construye las preguntas con operaciones por columna (sin iterrows)
+    
+    imagenes_ancladas: imágenes embebidas por fila del Excel; tienen prioridad sobre
+    el valor de la celda IMAGEN (que suele ser solo el texto 'Imagen').
+    """
+    import numpy as np
+    
+    filas_excel = np.arange(len(df)) + 2  # fila 1 = encabezados
+    
+    # ✅ NIVEL: un único patrón sobre toda la columna
+    nivel_raw = _columna_texto(df, 'NIVEL').str.strip()
+    nivel_extraido = nivel_raw.str.extract(PATRON_NIVEL, expand=False)
+    desconocidos = nivel_extraido.isna().to_numpy()
+    if desconocidos.any():
+        logger.warning("⚠️ %s filas con nivel desconocido (asignado nivel 1): filas %s",
+                       int(desconocidos.sum()), filas_excel[desconocidos][:20].tolist())
+    niveles = nivel_extraido.fillna('1').astype(int).to_numpy()
+    
+    # ✅ OPCIONES: limpieza vectorizada y compactación (las vacías se saltan)
+    opciones = np.column_stack([_limpiar_texto(_columna_texto(df, letra)).to_numpy(dtype=object)
+                                for letra in LETRAS_OPCIONES])
+    presentes = opciones != ''
+    num_opciones = presentes.sum(axis=1)
+    # Orden estable que deja las opciones presentes al principio de cada fila
+    orden = np.argsort(~presentes, axis=1, kind='stable')
+    opciones_compactas = np.take_along_axis(opciones, orden, axis=1)
+    # Posición de cada columna dentro de la lista compacta
+    posicion_compacta = np.cumsum(presentes, axis=1) - 1
+    
+    # ✅ RESPUESTA: letras ("B", "A,C", "A; D") -> máscara de bits sobre la lista compacta
+    letras = _columna_texto(df, 'RESPUESTA').str.upper()
+    formato_valido = letras.str.fullmatch(PATRON_RESPUESTA).fillna(False).to_numpy(dtype=bool)
+    marcadas = np.column_stack([letras.str.contains(letra, regex=False).to_numpy(dtype=bool)
+                                for letra in LETRAS_OPCIONES]) & formato_valido[:, None]
+    # Válida si marca al menos una opción y ninguna de las marcadas está vacía
+    respuesta_valida = marcadas.any(axis=1) & ~(marcadas & ~presentes).any(axis=1)
+    bits = np.left_shift(1, np.where(presentes, posicion_compacta, 0))
+    mascara_correcta = np.where(respuesta_valida, np.where(marcadas, bits, 0).sum(axis=1), 1)
+    
+    pregunta_texto = _columna_texto(df, 'PREGUNTA').str.strip().to_numpy(dtype=object)
+    validas = (pregunta_texto != '') & (pregunta_texto != 'nan') & (num_opciones >= 2)
+    
+    invalidas = validas & ~respuesta_valida
+    if invalidas.any():
+        logger.warning("⚠️ %s filas con respuesta inválida o vacía (se usa la primera opción): filas %s",
+                       int(invalidas.sum()), filas_excel[invalidas][:20].tolist())
+    pocas_opciones = (pregunta_texto != '') & (num_opciones < 2)
+    if pocas_opciones.any():
+        logger.warning("⚠️ %s filas con menos de 2 opciones, saltadas: filas %s",
+                       int(pocas_opciones.sum()), filas_excel[pocas_opciones][:20].tolist())
+    
+    categorias = _columna_texto(df, 'CATEGORIA').str.strip().to_numpy(dtype=object)
+    columna_imagen = df['IMAGEN'].to_numpy(dtype=object) if 'IMAGEN' in df.columns else np.full(len(df), None)
+    # Parámetros IRT calibrados (opcionales); sin ellos el selector los deriva del nivel
+    discriminaciones = _columna_numerica(df, 'DISCRIMINACION')
+    dificultades = _columna_numerica(df, 'DIFICULTAD')
+    
+    # Único paso por fila: armar los diccionarios finales
+    indices_validos = np.flatnonzero(validas).tolist()
+    
+    def imagen_de_fila(i):
+        if imagenes_ancladas is not None:
+            embebida = imagenes_ancladas.leer(int(filas_excel[i]))
+            if embebida is not None:
+                return embebida
+        return columna_imagen[i]
+    
+    # ✅ IMÁGENES EN PARALELO: decodificar/recodificar es lo más caro de la carga
+    imagenes_por_fila = procesar_imagenes(((i, imagen_de_fila(i)) for i in indices_validos))
+    
+    preguntas = []
+    for i in indices_validos:
+        imagen_url, imagen_srcset = imagenes_por_fila.get(i, SIN_IMAGEN)
+        opciones_fila = opciones_compactas[i, :num_opciones[i]].tolist()
+        mascara = int(mascara_correcta[i])
+        indices_correctos = [j for j in range(len(opciones_fila)) if mascara >> j & 1]
+        respuestas_correctas = [opciones_fila[j] for j in indices_correctos]
+        preguntas.append({
+            "id": len(preguntas) + 1,
+            "pregunta": pregunta_texto[i],
+            "opciones": opciones_fila,
+            "respuesta_correcta": ", ".join(respuestas_correctas),  # ← TEXTO LIMPIO, no letra
+            "respuestas_correctas": respuestas_correctas,
+            "indice_correcto": indices_correctos[0],
+            "mascara_correcta": mascara,  # ← SE CALIFICA POR BITS DE ÍNDICE DE OPCIÓN
+            "claves_opciones": claves_opciones(opciones_fila),
+            "nivel": int(niveles[i]),
+            "multiple": len(indices_correctos) > 1,
+            "imagen": imagen_url,
+            "imagen_srcset": imagen_srcset,  # ← VERSIONES RESPONSIVE ('' si no hay)
+            "categoria": categorias[i],
+            "discriminacion": discriminaciones[i],
+            "dificultad": dificultades[i]
+        })
+    
+    logger.debug("📝 Preguntas construidas: %s de %s filas", len(preguntas), len(df))
+    return preguntas
+
+class BancoPreguntas:
+    """Preguntas cargadas más los índices por id, nivel y categoría, construidos una sola vez"""
+    
+    # Intentos de muestreo antes de filtrar el nivel completo
+    INTENTOS_MUESTREO = 8
+    
+    def __init__(self, preguntas, version=None):
+        # El banco no se modifica después de construido: las recargas crean uno nuevo
+        self.preguntas = preguntas
+        self.version = version
+        self.por_id = {pregunta["id"]: pregunta for pregunta in preguntas}
+        self.por_nivel = {}
+        self.por_categoria = {}
+        self.por_nivel_categoria = {}
+        # Las listas quedan ordenadas por id (orden de carga): permite paginar con bisect
+        for pregunta in preguntas:
+            self.por_nivel.setdefault(pregunta["nivel"], []).append(pregunta)
+            self.por_categoria.setdefault(pregunta.get("categoria", ""), []).append(pregunta)
+            clave = (pregunta["nivel"], pregunta.get("categoria", ""))
+            self.por_nivel_categoria.setdefault(clave, []).append(pregunta)
+    
+    def __len__(self):
+        return len(self.preguntas)
+    
+    def obtener(self, pregunta_id):
+        """Pregunta por id en O(1), o None si no existe"""
+        return self.por_id.get(pregunta_id)
+    
+    def seleccionar(self, nivel, ids_mostrados, categoria=None):
+        """Pregunta aleatoria del nivel (y categoría) que no esté en ids_mostrados (set)"""
+        if categoria is None:
+            candidatas = self.por_nivel.get(nivel, [])
+        else:
+            candidatas = self.por_nivel_categoria.get((nivel, categoria), [])
+        
+        if not candidatas:
+            return None
+        
+        # ✅ MUESTREO CON RECHAZO: O(1) esperado mientras queden preguntas sin mostrar
+        for _ in range(self.INTENTOS_MUESTREO):
+            pregunta = random.choice(candidatas)
+            if pregunta["id"] not in ids_mostrados:
+                return pregunta
+        
+        # Nivel casi agotado: filtrar solo las preguntas de este nivel
+        restantes = [p for p in candidatas if p["id"] not in ids_mostrados]
+        return random.choice(restantes) if restantes else None
+    
+    def filtrar(self, nivel=None, categoria=None):
+        """Lista (ordenada por id) de las preguntas del nivel y/o categoría, usando los índices"""
+        if nivel is not None and categoria is not None:
+            return self.por_nivel_categoria.get((nivel, categoria), [])
+        if nivel is not None:
+            return self.por_nivel.get(nivel, [])
+        if categoria is not None:
+            return self.por_categoria.get(categoria, [])
+        return self.preguntas
+    
+    def pagina(self, cursor=0, limite=100, nivel=None, categoria=None):
+        """Preguntas con id > cursor; devuelve (página, siguiente_cursor o None, total filtrado)"""
+        preguntas = self.filtrar(nivel, categoria)
+        inicio = bisect.bisect_right(preguntas, cursor, key=lambda p: p["id"])
+        pagina = preguntas[inicio:inicio + limite]
+        siguiente = pagina[-1]["id"] if inicio + limite < len(preguntas) else None
+        return pagina, siguiente, len(preguntas)
+    
+    def disponibles_por_nivel(self, ids_mostrados):
+        """Conteo de preguntas sin mostrar por nivel (solo para diagnóstico)"""
+        return {
+            nivel: len([p for p in preguntas if p["id"] not in ids_mostrados])
+            for nivel, preguntas in self.por_nivel.items()
+        }
+
+def huella_archivo(archivo):
+    """Huella del archivo: mtime y tamaño (rápido) más sha256 del contenido"""
+    stat = os.stat(archivo)
+    sha = hashlib.sha256()
+    with open(archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return {"mtime_ns": stat.st_mtime_ns, "tamaño": stat.st_size, "sha256": sha.hexdigest()}
+
+def leer_snapshot(archivo_excel=ARCHIVO_EXCEL, archivo_snapshot=ARCHIVO_SNAPSHOT):
+    """Devuelve (preguntas, huella) del snapshot si sigue vigente, o None si hay que recompilar"""
+    if not os.path.exists(archivo_snapshot):
+        return None
+    
+    try:
+        with open(archivo_snapshot, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning("⚠️ Snapshot ilegible, se recompilará: %s", e)
+        return None
+    
+    if not isinstance(snapshot, dict) or snapshot.get("version") != VERSION_SNAPSHOT:
+        logger.warning("⚠️ Snapshot de otra versión, se recompilará")
+        return None
+    
+    # Las imágenes viven fuera del snapshot: si se borró el almacén hay que regenerarlas
+    if imagenes.imagenes_faltantes(snapshot["preguntas"]):
+        logger.warning("⚠️ Faltan imágenes del snapshot, se recompilará")
+        return None
+    
+    origen = snapshot.get("origen", {})
+    stat = os.stat(archivo_excel)
+    
+    # ✅ CAMINO RÁPIDO: mismo mtime y tamaño, no hace falta leer el Excel
+    if origen.get("mtime_ns") == stat.st_mtime_ns and origen.get("tamaño") == stat.st_size:
+        return snapshot["preguntas"], origen
+    
+    # El mtime cambió (copia, checkout...): comparar contenido antes de recompilar
+    huella = huella_archivo(archivo_excel)
+    if huella["sha256"] != origen.get("sha256"):
+        return None
+    
+    # Mismo contenido: actualizar la huella para volver al camino rápido
+    try:
+        escribir_snapshot(snapshot["preguntas"], huella, archivo_snapshot)
+    except OSError as e:
+        logger.warning("⚠️ No se pudo actualizar la huella del snapshot: %s", e)
+    return snapshot["preguntas"], huella
+
+def escribir_snapshot(preguntas, huella, archivo_snapshot=ARCHIVO_SNAPSHOT):
+    """Escribe el snapshot de forma atómica (varios workers pueden arrancar a la vez)"""
+    directorio = os.path.dirname(archivo_snapshot)
+    if directorio and not os.path.exists(directorio):
+        os.makedirs(directorio, exist_ok=True)
+    
+    temporal = f"{archivo_snapshot}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        pickle.dump({
+            "version": VERSION_SNAPSHOT,
+            "origen": huella,
+            "preguntas": preguntas
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, archivo_snapshot)
+
+def version_de_huella(huella):
+    """Versión del banco: el hash del Excel, igual en todos los workers"""
+    return huella["sha256"][:12]
+
+def guardar_snapshot_version(preguntas, huella):
+    """Guarda la copia de esta versión (si falta) y borra las más antiguas"""
+    archivo = PATRON_SNAPSHOT_VERSION.format(version=version_de_huella(huella))
+    if os.path.exists(archivo):
+        return
+    escribir_snapshot(preguntas, huella, archivo)
+    
+    copias = []
+    for ruta in glob.glob(PATRON_SNAPSHOT_VERSION.format(version='*')):
+        try:
+            copias.append((os.stat(ruta).st_mtime, ruta))
+        except FileNotFoundError:
+            pass  # otro worker la acaba de borrar
+    for _, ruta in sorted(copias)[:-SNAPSHOTS_VERSIONES]:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+def cargar_version(version):
+    """BancoPreguntas de una versión anterior desde su copia en cache/, o None si no está"""
+    if not isinstance(version, str) or not PATRON_VERSION.fullmatch(version):
+        return None
+    archivo = PATRON_SNAPSHOT_VERSION.format(version=version)
+    try:
+        with open(archivo, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("⚠️ Snapshot de la versión %s ilegible: %s", version, e)
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("version") != VERSION_SNAPSHOT:
+        return None
+    logger.info("⚡ Versión %s del banco cargada desde %s", version, archivo)
+    return BancoPreguntas(snapshot["preguntas"], version=version)
+
+def compilar_snapshot(archivo_excel=ARCHIVO_EXCEL, archivo_snapshot=ARCHIVO_SNAPSHOT):
+    """Parsea el Excel y guarda el snapshot compilado; devuelve (preguntas, huella)"""
+    huella = huella_archivo(archivo_excel)
+    preguntas = leer_preguntas_excel(archivo_excel)
+    escribir_snapshot(preguntas, huella, archivo_snapshot)
+    guardar_snapshot_version(preguntas, huella)
+    logger.info("💾 Snapshot compilado: %s (%s preguntas)", archivo_snapshot, len(preguntas))
+    return preguntas, huella
+
+def cargar_banco(archivo_excel=ARCHIVO_EXCEL, archivo_snapshot=ARCHIVO_SNAPSHOT):
+    """BancoPreguntas desde el snapshot (recompila solo si el Excel cambió)
+    
+    La versión del banco es el hash del Excel: igual en todos los workers.
+    """
+    vigente = leer_snapshot(archivo_excel, archivo_snapshot)
+    if vigente is not None:
+        logger.info("⚡ Preguntas cargadas desde snapshot: %s", archivo_snapshot)
+        preguntas, huella = vigente
+        try:
+            guardar_snapshot_version(preguntas, huella)  # snapshots de antes de haber copias
+        except OSError as e:
+            logger.warning("⚠️ No se pudo guardar la copia de la versión: %s", e)
+    else:
+        logger.info("🔧 Snapshot ausente o desactualizado, compilando desde Excel...")
+        try:
+            preguntas, huella = compilar_snapshot(archivo_excel, archivo_snapshot)
+        except OSError as e:
+            # Sin permisos de escritura en cache/: seguir con el parseo directo
+            logger.warning("⚠️ No se pudo guardar el snapshot: %s", e)
+            huella = huella_archivo(archivo_excel)
+            preguntas = leer_preguntas_excel(archivo_excel)
+    
+    return BancoPreguntas(preguntas, version=version_de_huella(huella))
+
+if __name__ == "__main__":
+    # Paso de compilación: python banco_preguntas.py [archivo.xlsx]
+    import sys
+    from logs import configurar_logging
+    configurar_logging()
+    archivo = sys.argv[1] if len(sys.argv) > 1 else ARCHIVO_EXCEL
+    if not os.path.exists(archivo):
+        logger.error("❌ Archivo no encontrado: %s", archivo)
+        sys.exit(1)
+    compilar_snapshot(archivo)
@@ -0,0 +1,31 @@
+# Conexión SQLite compartida por los almacenes persistentes (sesiones, candidatos...)
+# Una conexión por hilo; WAL permite lectores concurrentes entre procesos
+
+import sqlite3
+import threading
+import os
+
+ARCHIVO_DB = os.environ.get('EVALUACION_DB', os.path.join('datos', 'evaluacion.db'))
+
+_local = threading.local()
+
+def conectar(archivo_db=None):
+    """Conexión SQLite del hilo actual (se crea y configura la primera vez)"""
+    archivo_db = archivo_db or ARCHIVO_DB
+    conexiones = getattr(_local, 'conexiones', None)
+    if conexiones is None:
+        conexiones = _local.conexiones = {}
+    
+    conexion = conexiones.get(archivo_db)
+    if conexion is None:
+        directorio = os.path.dirname(archivo_db)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio, exist_ok=True)
+        
+        conexion = sqlite3.connect(archivo_db, timeout=30, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute("PRAGMA busy_timeout=30000")
+        conexiones[archivo_db] = conexion
+    return conexion
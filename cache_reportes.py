@@ -0,0 +1,196 @@
+# Caché de reportes PDF direccionada por contenido
+# La clave es el sha256 del resultado final (JSON canónico) y de la versión del reporte:
+# el mismo resultado no se vuelve a renderizar ni a subir a Drive.
+#
+#   cache/reportes/<clave>.pdf    el PDF
+#   cache/reportes/<clave>.json   nombre de archivo y enlace de Drive (si ya se subió)
+#
+# Los más recientes se guardan además en memoria (REPORTES_EN_MEMORIA). En disco se
+# borran los menos usados (por mtime) cuando los PDF pasan de REPORTES_EN_DISCO_MB. El
+# directorio solo se recorre al arrancar y al podar: entre medias se lleva la cuenta.
+
+from collections import OrderedDict
+import threading
+import hashlib
+import logging
+import json
+import os
+
+import metricas
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_REPORTES = os.path.join('cache', 'reportes')
+REPORTES_EN_MEMORIA = int(os.environ.get('REPORTES_EN_MEMORIA', 32))
+REPORTES_EN_DISCO_MB = float(os.environ.get('REPORTES_EN_DISCO_MB', 512))
+# Al podar se baja hasta esta fracción del máximo: las escrituras siguientes no vuelven a recorrer
+FRACCION_TRAS_PODAR = 0.9
+
+_memoria = OrderedDict()  # clave -> (nombre_archivo, bytes)
+_lock = threading.Lock()
+_en_disco = {}  # directorio -> bytes de PDF estimados (otros procesos también escriben)
+_lock_disco = threading.Lock()
+
+def _reiniciar_en_hijo():
+    # Un hijo de fork (exportación masiva) no hereda el lock tomado ni la memoria del padre
+    global _lock, _lock_disco
+    _lock = threading.Lock()
+    _lock_disco = threading.Lock()
+    _memoria.clear()
+
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+
+def clave(resultado):
+    """sha256 del resultado y de la versión del generador"""
+    from pdf_generator import VERSION_REPORTE
+    datos = json.dumps(resultado, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(f"{VERSION_REPORTE}\n{datos}".encode('utf-8')).hexdigest()
+
+def _rutas(clave_reporte, directorio):
+    base = os.path.join(directorio, clave_reporte)
+    return f"{base}.pdf", f"{base}.json"
+
+def _escribir(ruta, contenido):
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+def _recordar(clave_reporte, nombre_archivo, contenido):
+    with _lock:
+        _memoria[clave_reporte] = (nombre_archivo, contenido)
+        _memoria.move_to_end(clave_reporte)
+        while len(_memoria) > REPORTES_EN_MEMORIA:
+            _memoria.popitem(last=False)
+
+def _podar(directorio, conservar=None):
+    """Recorre el directorio y borra los reportes usados hace más tiempo si los PDF pasan
+    de REPORTES_EN_DISCO_MB; devuelve los bytes que quedan"""
+    maximo = REPORTES_EN_DISCO_MB * 1024 * 1024
+    reportes = []  # (mtime, tamaño, clave)
+    total = 0
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            if not entrada.name.endswith('.pdf'):
+                continue
+            try:
+                info = entrada.stat()
+            except OSError:
+                continue  # otro proceso lo acaba de borrar
+            reportes.append((info.st_mtime, info.st_size, entrada.name[:-len('.pdf')]))
+            total += info.st_size
+    if total <= maximo:
+        return total
+
+    objetivo = maximo * FRACCION_TRAS_PODAR
+    borrados = 0
+    for _, tamano, clave_reporte in sorted(reportes):
+        if total <= objetivo:
+            break
+        if clave_reporte == conservar:
+            continue
+        # Primero el PDF: sin él el manifiesto ya no cuenta como entrada válida
+        for ruta in _rutas(clave_reporte, directorio):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        total -= tamano
+        borrados += 1
+    logger.info("🧹 Caché de reportes: %s borrados, quedan %.1f MB", borrados, total / (1024 * 1024))
+    return total
+
+def _anotar_escritura(directorio, clave_reporte, tamano):
+    """Suma el PDF escrito a la cuenta; solo se recorre el directorio la primera vez y al pasar del máximo"""
+    with _lock_disco:
+        total = _en_disco.get(directorio)
+        if total is not None:
+            total += tamano
+            if total <= REPORTES_EN_DISCO_MB * 1024 * 1024:
+                _en_disco[directorio] = total
+                return
+        _en_disco[directorio] = _podar(directorio, conservar=clave_reporte)
+
+def leer_manifiesto(clave_reporte, directorio=DIRECTORIO_REPORTES):
+    """{nombre_archivo, google_drive_link} del reporte en caché, o None"""
+    ruta_pdf, ruta_manifiesto = _rutas(clave_reporte, directorio)
+    try:
+        with open(ruta_manifiesto, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifiesto if os.path.exists(ruta_pdf) else None
+
+def _escribir_manifiesto(clave_reporte, manifiesto, directorio):
+    _, ruta_manifiesto = _rutas(clave_reporte, directorio)
+    _escribir(ruta_manifiesto, json.dumps(manifiesto, ensure_ascii=False).encode('utf-8'))
+
+def buscar(clave_reporte, directorio=DIRECTORIO_REPORTES):
+    """(nombre_archivo, bytes) desde memoria o disco, o None si no está"""
+    with _lock:
+        if clave_reporte in _memoria:
+            _memoria.move_to_end(clave_reporte)
+            return _memoria[clave_reporte]
+
+    manifiesto = leer_manifiesto(clave_reporte, directorio)
+    if manifiesto is None:
+        return None
+    ruta_pdf, _ = _rutas(clave_reporte, directorio)
+    try:
+        with open(ruta_pdf, 'rb') as f:
+            contenido = f.read()
+    except OSError:
+        return None
+    try:
+        os.utime(ruta_pdf)  # ✅ usado ahora: lo último que se poda
+    except OSError:
+        pass
+    _recordar(clave_reporte, manifiesto["nombre_archivo"], contenido)
+    return manifiesto["nombre_archivo"], contenido
+
+def guardar(clave_reporte, nombre_archivo, contenido, directorio=DIRECTORIO_REPORTES):
+    _recordar(clave_reporte, nombre_archivo, contenido)
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        ruta_pdf, _ = _rutas(clave_reporte, directorio)
+        _escribir(ruta_pdf, contenido)
+        _escribir_manifiesto(clave_reporte, {"nombre_archivo": nombre_archivo, "google_drive_link": None}, directorio)
+        _anotar_escritura(directorio, clave_reporte, len(contenido))
+    except OSError as e:
+        # Sin permisos de escritura en cache/: queda solo en memoria
+        logger.warning("⚠️ No se pudo guardar el reporte en caché: %s", e)
+
+def obtener(resultado, directorio=DIRECTORIO_REPORTES):
+    """(clave, nombre_archivo, bytes) del reporte del resultado; solo se genera si no está en caché
+
+    Devuelve None si el generador falla.
+    """
+    # La clave se calcula antes de generar: el generador añade los contadores si faltan
+    clave_reporte = clave(resultado)
+    encontrado = buscar(clave_reporte, directorio)
+    if encontrado is not None:
+        logger.debug("♻️ Reporte servido desde caché: %s", clave_reporte[:12])
+        return (clave_reporte, *encontrado)
+
+    from pdf_generator import CandidateReportGenerator
+    with metricas.PDF_RENDER.medir():
+        generado = CandidateReportGenerator().generate_pdf_bytes(resultado)
+    if generado is None:
+        return None
+    guardar(clave_reporte, *generado, directorio=directorio)
+    return (clave_reporte, *generado)
+
+def link_drive(clave_reporte, directorio=DIRECTORIO_REPORTES):
+    """Enlace de Drive de este mismo reporte si ya se subió"""
+    manifiesto = leer_manifiesto(clave_reporte, directorio)
+    return manifiesto.get("google_drive_link") if manifiesto else None
+
+def guardar_link_drive(clave_reporte, link, directorio=DIRECTORIO_REPORTES):
+    manifiesto = leer_manifiesto(clave_reporte, directorio)
+    if manifiesto is None:
+        return
+    manifiesto["google_drive_link"] = link
+    try:
+        _escribir_manifiesto(clave_reporte, manifiesto, directorio)
+    except OSError as e:
+        logger.warning("⚠️ No se pudo guardar el enlace de Drive en caché: %s", e)
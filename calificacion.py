@@ -0,0 +1,65 @@
+# Calificación de respuestas por máscara de bits de opciones
+# bit i = opción i de la pregunta; la máscara correcta se calcula al cargar el banco.
+
+import logging
+
+from banco_preguntas import normalizar_respuesta
+
+logger = logging.getLogger(__name__)
+
+# ✅ FUNCIÓN PARA EVALUAR RESPUESTAS - VERSIÓN MEJORADA CON LIMPIEZA
+def mascara_respuesta(pregunta, respuesta_usuario, indices=None, seleccionadas=None):
+    """Opciones elegidas como máscara de bits (bit i = opción i)
+    
+    Se usan los índices que envía el navegador (enteros, ya validados en /responder); si
+    no vienen, el texto de las opciones seleccionadas buscado por su clave normalizada.
+    """
+    mascara = 0
+    for indice in indices or []:
+        if 0 <= indice < len(pregunta["opciones"]):
+            mascara |= 1 << indice
+    if mascara:
+        return mascara
+    
+    claves = pregunta["claves_opciones"]
+    for texto in seleccionadas or ([respuesta_usuario] if respuesta_usuario else []):
+        indice = claves.get(normalizar_respuesta(texto))
+        if indice is not None:
+            mascara |= 1 << indice
+    return mascara
+
+def indices_de_mascara(mascara):
+    return [indice for indice in range(mascara.bit_length()) if mascara >> indice & 1]
+
+def evaluar_respuesta(pregunta, respuesta_usuario, indices=None, seleccionadas=None):
+    """Evalúa la respuesta comparando máscaras de bits de opciones: (correcta, puntos, crédito)
+    
+    Las claves normalizadas se calculan al cargar el banco. En preguntas múltiples
+    hay crédito parcial: (aciertos - opciones incorrectas marcadas) / correctas, mínimo 0.
+    """
+    try:
+        elegida = mascara_respuesta(pregunta, respuesta_usuario, indices, seleccionadas)
+        correcta = pregunta["mascara_correcta"]
+        nivel = pregunta.get("nivel", 1)
+        logger.debug("🔍 Evaluando pregunta %s: correcta=%s usuario=%s (%r)",
+                     pregunta.get('id'), bin(correcta), bin(elegida), respuesta_usuario)
+        
+        if elegida and elegida == correcta:
+            puntos = 1.0 * nivel
+            logger.debug("   ✅ CORRECTA - Puntos: %s", puntos)
+            return True, puntos, 1.0
+        
+        if pregunta.get("multiple") and elegida:
+            aciertos = (elegida & correcta).bit_count()
+            errores = (elegida & ~correcta).bit_count()
+            credito = max(0, aciertos - errores) / correcta.bit_count()
+            if credito > 0:
+                logger.debug("   ➗ PARCIAL - %s/%s aciertos, %s errores", aciertos, correcta.bit_count(), errores)
+                return False, round(nivel * credito, 2), credito
+        
+        logger.debug("   ❌ INCORRECTA")
+        return False, 0.0, 0.0
+                
+    except Exception as e:
+        logger.exception("❌ Error evaluando respuesta: %s", e)
+        return False, 0.0, 0.0
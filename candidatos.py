@@ -0,0 +1,172 @@
+# Registro persistente de candidatos y resultados en SQLite
+# Compartido entre workers y con índices para el listado paginado del panel admin
+
+from datetime import datetime
+import json
+
+from base_datos import conectar
+import contadores
+
+POR_PAGINA_DEFECTO = 50
+POR_PAGINA_MAXIMO = 500
+
+CAMPOS_CANDIDATO = [
+    "codigo", "nombre_completo", "email", "telefono", "cargo", "fecha_registro",
+    "evaluacion_completada", "link_evaluacion", "puntos_finales", "nivel_final",
+    "google_drive_link"
+]
+
+def inicializar(archivo_db=None):
+    """Crea tablas e índices si no existen"""
+    conexion = conectar(archivo_db)
+    conexion.executescript("""
+        CREATE TABLE IF NOT EXISTS candidatos (
+            codigo TEXT PRIMARY KEY,
+            nombre_completo TEXT NOT NULL,
+            email TEXT NOT NULL,
+            telefono TEXT DEFAULT '',
+            cargo TEXT DEFAULT '',
+            fecha_registro TEXT NOT NULL,
+            evaluacion_completada INTEGER NOT NULL DEFAULT 0,
+            link_evaluacion TEXT DEFAULT '',
+            puntos_finales REAL,
+            nivel_final INTEGER,
+            google_drive_link TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_candidatos_email ON candidatos(email);
+        CREATE INDEX IF NOT EXISTS idx_candidatos_fecha ON candidatos(fecha_registro);
+        CREATE INDEX IF NOT EXISTS idx_candidatos_completada
+            ON candidatos(evaluacion_completada, fecha_registro);
+
+        CREATE TABLE IF NOT EXISTS resultados (
+            codigo TEXT PRIMARY KEY REFERENCES candidatos(codigo),
+            fecha_completada TEXT NOT NULL,
+            nivel_final INTEGER,
+            puntos REAL,
+            datos TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_resultados_fecha ON resultados(fecha_completada);
+    """)
+
+def _a_diccionario(fila):
+    candidato = dict(fila)
+    candidato["evaluacion_completada"] = bool(candidato["evaluacion_completada"])
+    # Alias que espera el JavaScript del panel
+    candidato["url_evaluacion"] = candidato.get("link_evaluacion", "")
+    return candidato
+
+def registrar_candidato(codigo, nombre_completo, email, telefono="", cargo="", link_evaluacion=""):
+    """Inserta un candidato nuevo y lo devuelve como diccionario"""
+    conectar().execute(
+        """INSERT INTO candidatos (codigo, nombre_completo, email, telefono, cargo,
+                                   fecha_registro, evaluacion_completada, link_evaluacion)
+           VALUES (?, ?, ?, ?, ?, ?, 0, ?)""",
+        (codigo, nombre_completo or "", email or "", telefono or "", cargo or "",
+         datetime.now().strftime("%Y-%m-%d %H:%M:%S"), link_evaluacion)
+    )
+    return obtener_candidato(codigo)
+
+def obtener_candidato(codigo):
+    fila = conectar().execute("SELECT * FROM candidatos WHERE codigo = ?", (codigo,)).fetchone()
+    return _a_diccionario(fila) if fila else None
+
+def existe_candidato(codigo):
+    return conectar().execute("SELECT 1 FROM candidatos WHERE codigo = ?", (codigo,)).fetchone() is not None
+
+def actualizar_candidato(codigo, **campos):
+    """Actualiza solo los campos indicados (deben ser columnas de la tabla)"""
+    campos = {k: v for k, v in campos.items() if k in CAMPOS_CANDIDATO and k != "codigo"}
+    if not campos:
+        return
+    if "evaluacion_completada" in campos:
+        campos["evaluacion_completada"] = int(bool(campos["evaluacion_completada"]))
+    asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+    conectar().execute(
+        f"UPDATE candidatos SET {asignaciones} WHERE codigo = ?",
+        (*campos.values(), codigo)
+    )
+
+def _filtros_sql(completada=None, email=None, busqueda=None, desde=None, hasta=None):
+    condiciones = []
+    parametros = []
+    if completada is not None:
+        condiciones.append("evaluacion_completada = ?")
+        parametros.append(int(bool(completada)))
+    if email:
+        condiciones.append("email = ?")
+        parametros.append(email)
+    if busqueda:
+        condiciones.append("(nombre_completo LIKE ? OR email LIKE ? OR codigo = ?)")
+        parametros.extend([f"%{busqueda}%", f"%{busqueda}%", busqueda])
+    if desde:
+        condiciones.append("fecha_registro >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append("fecha_registro <= ?")
+        parametros.append(hasta)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return where, parametros
+
+def limitar_paginacion(pagina, por_pagina):
+    """(pagina, por_pagina) dentro de los límites del listado"""
+    return max(1, int(pagina)), min(max(1, int(por_pagina)), POR_PAGINA_MAXIMO)
+
+def listar_candidatos(pagina=1, por_pagina=POR_PAGINA_DEFECTO, **filtros):
+    """Página de candidatos (más recientes primero) y el total que cumple los filtros"""
+    pagina, por_pagina = limitar_paginacion(pagina, por_pagina)
+    where, parametros = _filtros_sql(**filtros)
+
+    conexion = conectar()
+    total = conexion.execute(f"SELECT COUNT(*) FROM candidatos {where}", parametros).fetchone()[0]
+    filas = conexion.execute(
+        f"SELECT * FROM candidatos {where} ORDER BY fecha_registro DESC, codigo LIMIT ? OFFSET ?",
+        (*parametros, por_pagina, (pagina - 1) * por_pagina)
+    ).fetchall()
+    return [_a_diccionario(fila) for fila in filas], total
+
+def contar_candidatos(**filtros):
+    where, parametros = _filtros_sql(**filtros)
+    return conectar().execute(f"SELECT COUNT(*) FROM candidatos {where}", parametros).fetchone()[0]
+
+# ✅ RESULTADOS FINALES (respuestas completas de cada evaluación)
+def guardar_resultado(codigo, candidato_actual):
+    """Guarda el resultado final de la evaluación (sobrescribe si se repite)"""
+    datos = {
+        "datos_personales": candidato_actual.get("datos_personales", {}),
+        "nivel": candidato_actual.get("nivel", 1),
+        "puntos": candidato_actual.get("puntos", 0),
+        "evaluacion_completa": candidato_actual.get("evaluacion_completa", False),
+        "preguntas_mostradas": candidato_actual.get("preguntas_mostradas", []),
+        "respuestas": candidato_actual.get("respuestas", []),
+        "contadores": contadores.de_candidato(candidato_actual)
+    }
+    conectar().execute(
+        """INSERT OR REPLACE INTO resultados (codigo, fecha_completada, nivel_final, puntos, datos)
+           VALUES (?, ?, ?, ?, ?)""",
+        (codigo, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), datos["nivel"], datos["puntos"],
+         json.dumps(datos, ensure_ascii=False))
+    )
+
+def _filtros_resultados(**filtros):
+    """WHERE sobre resultados con los mismos filtros del listado de candidatos"""
+    where, parametros = _filtros_sql(**filtros)
+    if where:
+        return f"WHERE codigo IN (SELECT codigo FROM candidatos {where})", parametros
+    return "", parametros
+
+def contar_resultados(**filtros):
+    where, parametros = _filtros_resultados(**filtros)
+    return conectar().execute(f"SELECT COUNT(*) FROM resultados {where}", parametros).fetchone()[0]
+
+def iterar_resultados(**filtros):
+    """(codigo, datos JSON sin decodificar) de cada resultado, leídos de uno en uno"""
+    where, parametros = _filtros_resultados(**filtros)
+    cursor = conectar().execute(
+        f"SELECT codigo, datos FROM resultados {where} ORDER BY fecha_completada, codigo", parametros
+    )
+    for fila in cursor:
+        yield fila["codigo"], fila["datos"]
+
+def obtener_resultado(codigo):
+    fila = conectar().execute("SELECT datos FROM resultados WHERE codigo = ?", (codigo,)).fetchone()
+    return json.loads(fila["datos"]) if fila else None
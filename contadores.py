@@ -0,0 +1,42 @@
+# Contadores acumulados de la evaluación (por nivel y totales)
+# Se actualizan en O(1) con cada respuesta: ni responder, ni las estadísticas finales,
+# ni el PDF vuelven a recorrer la lista de respuestas.
+#
+# Listas indexadas por nivel (la posición 0 no se usa) para que sobrevivan tal cual
+# al JSON del resultado guardado.
+
+NIVELES = range(1, 6)
+
+def nuevos():
+    return {
+        "respondidas": [0] * (len(NIVELES) + 1),
+        "correctas": [0] * (len(NIVELES) + 1),
+        "total_respondidas": 0,
+        "total_correctas": 0
+    }
+
+def registrar(contadores, nivel, correcta):
+    """Suma una respuesta dada en `nivel` (el nivel del candidato al responder)"""
+    contadores["respondidas"][nivel] += 1
+    contadores["total_respondidas"] += 1
+    if correcta:
+        contadores["correctas"][nivel] += 1
+        contadores["total_correctas"] += 1
+
+def desde_respuestas(respuestas):
+    """Reconstruye los contadores recorriendo las respuestas (sesiones/resultados antiguos)"""
+    contadores = nuevos()
+    for respuesta in respuestas:
+        nivel = respuesta.get("nivel_candidato", 1)
+        if nivel in NIVELES:
+            registrar(contadores, nivel, respuesta.get("correcta", False))
+    return contadores
+
+def de_candidato(candidato_actual):
+    """Contadores de la sesión/resultado; se crean una sola vez si faltan"""
+    if "contadores" not in candidato_actual:
+        candidato_actual["contadores"] = desde_respuestas(candidato_actual.get("respuestas", []))
+    return candidato_actual["contadores"]
+
+def porcentaje(correctas, total):
+    return (correctas / total) * 100 if total else 0
@@ -2,11 +2,12 @@
 # Usa OAuth con la cuenta del administrador
 
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 import os
+import io
 import json
 from datetime import datetime
 
@@ -47,6 +48,18 @@ def save_pdf_to_drive(pdf_path):
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
+def save_pdf_bytes_to_drive(pdf_bytes, filename):
+    """Sube un PDF generado en memoria, sin archivo temporal"""
+    try:
+        service = get_drive_service()
+        file_metadata = {'name': filename, 'parents': [DRIVE_FOLDER_ID]}
+        media = MediaIoBaseUpload(io.BytesIO(pdf_bytes), mimetype='application/pdf')
+        file = service.files().create(body=file_metadata, media_body=media, fields='id,name,webViewLink').execute()
+        
+        return {'success': True, 'file_name': file.get('name'), 'link': file.get('webViewLink')}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
 def save_session_to_drive(usuario_actual, preguntas_respondidas):
     try:
         service = get_drive_service()
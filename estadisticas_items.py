@@ -0,0 +1,226 @@
+# Estadísticas por pregunta a partir de los resultados guardados
+# p-valor (proporción de acierto), discriminación (correlación punto-biserial con el
+# resto de la prueba) y frecuencia de cada opción; marca las preguntas cuyo nivel en
+# el Excel no coincide con la dificultad observada.
+#
+# Incremental: cada resultado nuevo o modificado se desglosa una vez en respuestas_items
+# (una fila por respuesta). Las estadísticas son sumas sobre esa tabla, así que solo se
+# reprocesan los resultados que cambiaron.
+#
+#   python estadisticas_items.py [--completo] [--csv salida.csv]
+
+import hashlib
+import logging
+import json
+
+from base_datos import conectar
+from banco_preguntas import normalizar_respuesta
+
+logger = logging.getLogger(__name__)
+
+# Opciones por pregunta (columnas A-D del Excel)
+MAX_OPCIONES = 4
+# Por debajo de este número de respuestas las marcas no son fiables
+MIN_RESPUESTAS = 20
+# Correlación punto-biserial por debajo de la cual la pregunta apenas discrimina
+DISCRIMINACION_MINIMA = 0.15
+# Diferencia (en la escala de dificultad) entre lo observado y el nivel del Excel para marcarla
+TOLERANCIA_NIVEL = 1.0
+
+def inicializar(archivo_db=None):
+    conectar(archivo_db).executescript("""
+        CREATE TABLE IF NOT EXISTS respuestas_items (
+            codigo TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            nivel INTEGER,
+            credito REAL NOT NULL,
+            resto REAL,
+            mascara INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_respuestas_items_clave ON respuestas_items(clave);
+        CREATE INDEX IF NOT EXISTS idx_respuestas_items_codigo ON respuestas_items(codigo);
+
+        CREATE TABLE IF NOT EXISTS resultados_procesados (
+            codigo TEXT PRIMARY KEY,
+            fecha_completada TEXT NOT NULL
+        );
+    """)
+
+def clave_pregunta(texto):
+    """Identificador estable de la pregunta: su texto normalizado (los ids cambian al recargar)"""
+    return hashlib.sha1(normalizar_respuesta(texto).encode('utf-8')).hexdigest()
+
+def _desglosar(resultados):
+    """DataFrame de respuestas (una fila por respuesta) de los resultados dados"""
+    import numpy as np
+    import pandas as pd
+
+    codigos, textos, niveles, creditos, mascaras = [], [], [], [], []
+    for codigo, datos in resultados:
+        for r in json.loads(datos).get("respuestas", []):
+            codigos.append(codigo)
+            textos.append(r.get("pregunta", ""))
+            niveles.append(r.get("nivel_pregunta"))
+            # Resultados anteriores al crédito parcial: solo correcta/incorrecta
+            creditos.append(r.get("credito", 1.0 if r.get("correcta") else 0.0))
+            indices = r.get("indices_seleccionados")
+            mascaras.append(sum(1 << i for i in indices) if indices is not None else None)
+
+    df = pd.DataFrame({
+        "codigo": codigos,
+        "clave": [clave_pregunta(t) for t in textos],
+        "nivel": pd.array(niveles, dtype="Int64"),
+        "credito": np.asarray(creditos, dtype=float),
+        "mascara": pd.array(mascaras, dtype="Int64")
+    })
+    # ✅ RESTO DE LA PRUEBA: media del candidato sin contar esta respuesta (vectorizado por grupo)
+    por_candidato = df.groupby("codigo")["credito"]
+    suma, cuenta = por_candidato.transform("sum"), por_candidato.transform("count")
+    df["resto"] = ((suma - df["credito"]) / (cuenta - 1)).where(cuenta > 1)
+    return df
+
+def _a_sqlite(valor):
+    """Escalares de numpy/pandas a tipos que acepta sqlite3 (NA/NaN -> NULL)"""
+    import pandas as pd
+    if pd.isna(valor):
+        return None
+    return valor.item() if hasattr(valor, "item") else valor
+
+def actualizar(completo=False):
+    """Desglosa los resultados nuevos o modificados; devuelve cuántos se procesaron"""
+    conexion = conectar()
+    if completo:
+        conexion.execute("DELETE FROM respuestas_items")
+        conexion.execute("DELETE FROM resultados_procesados")
+
+    pendientes = conexion.execute("""
+        SELECT r.codigo, r.fecha_completada, r.datos FROM resultados r
+        LEFT JOIN resultados_procesados p ON p.codigo = r.codigo
+        WHERE p.fecha_completada IS NULL OR p.fecha_completada <> r.fecha_completada
+    """).fetchall()
+    if not pendientes:
+        return 0
+
+    df = _desglosar([(fila["codigo"], fila["datos"]) for fila in pendientes])
+    columnas = ["codigo", "clave", "nivel", "credito", "resto", "mascara"]
+    filas = [tuple(_a_sqlite(valor) for valor in fila)
+             for fila in df[columnas].astype(object).itertuples(index=False, name=None)]
+    codigos = [(fila["codigo"],) for fila in pendientes]
+
+    # Un resultado repetido reemplaza su aporte anterior: borrar e insertar en la misma transacción
+    conexion.execute("BEGIN")
+    try:
+        conexion.executemany("DELETE FROM respuestas_items WHERE codigo = ?", codigos)
+        conexion.executemany(
+            "INSERT INTO respuestas_items (codigo, clave, nivel, credito, resto, mascara) VALUES (?, ?, ?, ?, ?, ?)",
+            filas
+        )
+        conexion.executemany(
+            "INSERT OR REPLACE INTO resultados_procesados (codigo, fecha_completada) VALUES (?, ?)",
+            [(fila["codigo"], fila["fecha_completada"]) for fila in pendientes]
+        )
+        conexion.execute("COMMIT")
+    except Exception:
+        conexion.execute("ROLLBACK")
+        raise
+
+    logger.info("📈 Estadísticas de ítems: %s resultados procesados (%s respuestas)", len(pendientes), len(filas))
+    return len(pendientes)
+
+def _sumas():
+    """Estadísticos suficientes por pregunta, sumados en SQLite
+
+    Los momentos de la correlación (sxx, sxr, st, stt, sxt) salen solo de las filas con
+    resto: un candidato con una sola respuesta no tiene resto y no debe contar en ninguno.
+    """
+    opciones = ", ".join(
+        f"SUM((mascara >> {i}) & 1) AS opcion_{i}" for i in range(MAX_OPCIONES)
+    )
+    return conectar().execute(f"""
+        SELECT clave, MAX(nivel) AS nivel, COUNT(*) AS n,
+               SUM(credito) AS sx, SUM(CASE WHEN resto IS NOT NULL THEN credito * credito END) AS sxx,
+               COUNT(resto) AS nr, SUM(CASE WHEN resto IS NOT NULL THEN credito END) AS sxr,
+               SUM(resto) AS st, SUM(resto * resto) AS stt, SUM(credito * resto) AS sxt,
+               COUNT(mascara) AS nm, {opciones}
+        FROM respuestas_items GROUP BY clave
+    """).fetchall()
+
+def calcular(preguntas=None, min_respuestas=MIN_RESPUESTAS):
+    """DataFrame con las estadísticas de cada pregunta (unidas al banco actual si se pasa)"""
+    import numpy as np
+    import pandas as pd
+
+    filas = _sumas()
+    columnas = ["clave", "nivel", "n", "sx", "sxx", "nr", "sxr", "st", "stt", "sxt", "nm"] + \
+        [f"opcion_{i}" for i in range(MAX_OPCIONES)]
+    df = pd.DataFrame([tuple(f) for f in filas], columns=columnas).astype(
+        {c: float for c in columnas if c not in ("clave", "nivel")})
+
+    df["p_valor"] = df["sx"] / df["n"]
+    # ✅ DISCRIMINACIÓN: correlación punto-biserial con el resto, desde las sumas
+    nr = df["nr"]
+    covarianza = nr * df["sxt"] - df["sxr"] * df["st"]
+    varianza_x = nr * df["sxx"] - df["sxr"] ** 2
+    varianza_t = nr * df["stt"] - df["st"] ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["discriminacion"] = (covarianza / np.sqrt(varianza_x * varianza_t)).where(
+            (varianza_x > 0) & (varianza_t > 0))
+        for i in range(MAX_OPCIONES):
+            df[f"frecuencia_{chr(65 + i)}"] = (df[f"opcion_{i}"] / df["nm"]).where(df["nm"] > 0)
+
+    # ✅ DIFICULTAD EMPÍRICA (escala b del modelo 2PL, como el selector IRT: b = nivel - 3)
+    p = df["p_valor"].clip(0.01, 0.99)
+    df["dificultad"] = np.log((1 - p) / p)
+    df["nivel_empirico"] = (df["dificultad"].round() + 3).clip(1, 5).astype(int)
+
+    if preguntas is not None:
+        banco = pd.DataFrame({
+            "clave": [clave_pregunta(q["pregunta"]) for q in preguntas],
+            "id": [q["id"] for q in preguntas],
+            "pregunta": [q["pregunta"] for q in preguntas],
+            "nivel_excel": [q["nivel"] for q in preguntas],
+        })
+        df = banco.merge(df, on="clave", how="left")
+        df["n"] = df["n"].fillna(0)
+        df["nivel"] = df.pop("nivel_excel")
+
+    suficientes = df["n"] >= min_respuestas
+    desvio = (df["dificultad"] - (df["nivel"].astype(float) - 3)).abs()
+    df["revisar_nivel"] = suficientes & (desvio > TOLERANCIA_NIVEL)
+    df["baja_discriminacion"] = suficientes & (df["discriminacion"] < DISCRIMINACION_MINIMA)
+
+    return df.drop(columns=["sx", "sxx", "nr", "sxr", "st", "stt", "sxt", "nm"] +
+                   [f"opcion_{i}" for i in range(MAX_OPCIONES)])
+
+def a_registros(df):
+    """Lista de diccionarios serializable a JSON (NaN -> None)"""
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from logs import configurar_logging
+    from banco_preguntas import ARCHIVO_EXCEL, cargar_banco
+
+    configurar_logging()
+    parser = argparse.ArgumentParser(description="Estadísticas por pregunta desde los resultados guardados")
+    parser.add_argument("--completo", action="store_true", help="recalcular desde cero")
+    parser.add_argument("--csv", help="guardar la tabla completa en este archivo")
+    argumentos = parser.parse_args()
+
+    inicializar()
+    actualizar(completo=argumentos.completo)
+    preguntas = cargar_banco(ARCHIVO_EXCEL).preguntas if os.path.exists(ARCHIVO_EXCEL) else None
+    tabla = calcular(preguntas)
+
+    if argumentos.csv:
+        tabla.to_csv(argumentos.csv, index=False)
+        logger.info("💾 Estadísticas guardadas en %s", argumentos.csv)
+
+    marcadas = tabla[tabla["revisar_nivel"] | tabla["baja_discriminacion"]]
+    logger.info("📊 %s preguntas con datos, %s marcadas para revisar", int((tabla["n"] > 0).sum()), len(marcadas))
+    for fila in marcadas.itertuples():
+        logger.warning("⚠️ %s | nivel %s, empírico %s | p=%.2f disc=%s n=%d | %s",
+                       getattr(fila, "id", fila.clave[:8]), fila.nivel, fila.nivel_empirico, fila.p_valor,
+                       "-" if fila.discriminacion != fila.discriminacion else f"{fila.discriminacion:.2f}",
+                       fila.n, str(getattr(fila, "pregunta", ""))[:60])
@@ -0,0 +1,155 @@
+# Exportación masiva de reportes PDF a un único ZIP
+# Los resultados guardados que cumplen los filtros se renderizan en un pool de procesos
+# y cada PDF se escribe en el ZIP en cuanto está listo: el ZIP sale por trozos (a un
+# archivo o a la respuesta HTTP) y en memoria solo están los PDF en vuelo.
+#
+#   python exportar_reportes.py reportes.zip [--completada] [--q texto] [--desde 2025-01-01] [--hasta ...]
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+import logging
+import zipfile
+import json
+import os
+
+import cache_reportes
+import candidatos
+import metricas
+from logs import configurar_logging_proceso_hijo
+
+logger = logging.getLogger(__name__)
+
+REPORTES_WORKERS = int(os.environ.get('REPORTES_WORKERS', os.cpu_count() or 1))
+# Cada cuántos reportes se informa el avance
+PROGRESO_CADA = 25
+
+def _renderizar(codigo, datos):
+    """(codigo, nombre_archivo, bytes del PDF, error) de un resultado guardado"""
+    try:
+        generado = cache_reportes.obtener(json.loads(datos))
+        if not generado:
+            return codigo, None, None, "El generador no produjo el PDF"
+        _, nombre_archivo, contenido = generado
+        return codigo, nombre_archivo, contenido, None
+    except Exception as e:
+        return codigo, None, None, str(e)
+
+def _renderizar_en_worker(codigo, datos):
+    # El tiempo de render medido en el hijo vuelve al padre con el resultado
+    return _renderizar(codigo, datos), metricas.PDF_RENDER.tomar()
+
+def _recoger(futuro):
+    resultado, series = futuro.result()
+    metricas.PDF_RENDER.sumar(series)
+    return resultado
+
+def renderizar_reportes(resultados, workers=None):
+    """Genera (codigo, nombre_archivo, bytes, error) por cada (codigo, datos) en orden de llegada
+
+    Como en procesar_imagenes, el iterable se consume a medida que hay hueco (como
+    máximo 2 por worker en vuelo).
+    """
+    workers = REPORTES_WORKERS if workers is None else workers
+
+    # fork: el hijo hereda los módulos ya importados.
+    # Con spawn/forkserver cada worker volvería a ejecutar app.py; los locks que usa el
+    # render (caché, métricas) se reinician en el hijo con os.register_at_fork.
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for codigo, datos in resultados:
+            yield _renderizar(codigo, datos)
+        return
+
+    en_vuelo = set()
+    maximo_en_vuelo = workers * 2
+    contexto = multiprocessing.get_context('fork')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                             initializer=configurar_logging_proceso_hijo) as pool:
+        for codigo, datos in resultados:
+            if len(en_vuelo) >= maximo_en_vuelo:
+                listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    yield _recoger(futuro)
+            en_vuelo.add(pool.submit(_renderizar_en_worker, codigo, datos))
+        for futuro in wait(en_vuelo).done:
+            yield _recoger(futuro)
+
+class _SalidaZip:
+    """Destino sin seek para ZipFile: guarda lo escrito hasta que se recoge"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def recoger(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+def _informar_progreso(hechos, total):
+    if hechos % PROGRESO_CADA == 0 or hechos == total:
+        logger.info("📦 Exportación de reportes: %s/%s", hechos, total)
+
+def exportar_zip(workers=None, progreso=_informar_progreso, **filtros):
+    """Trozos de bytes de un ZIP con los reportes de los resultados que cumplen los filtros
+
+    Los filtros son los del listado de candidatos (completada, email, busqueda, desde,
+    hasta). Los reportes que fallan se listan en errores.txt dentro del propio ZIP.
+    progreso(hechos, total) se llama tras cada reporte.
+    """
+    total = candidatos.contar_resultados(**filtros)
+    salida = _SalidaZip()
+    errores = []
+    hechos = 0
+
+    # Los PDF ya van comprimidos: guardarlos tal cual en el ZIP
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+        for codigo, nombre, contenido, error in renderizar_reportes(candidatos.iterar_resultados(**filtros), workers):
+            hechos += 1
+            if error:
+                logger.warning("⚠️ Reporte de %s no generado: %s", codigo, error)
+                errores.append(f"{codigo}: {error}")
+            else:
+                archivo_zip.writestr(nombre, contenido)
+            if progreso:
+                progreso(hechos, total)
+            yield salida.recoger()
+
+        if errores:
+            archivo_zip.writestr("errores.txt", "\n".join(errores) + "\n")
+    yield salida.recoger()
+
+    logger.info("✅ Exportación terminada: %s reportes, %s errores", hechos - len(errores), len(errores))
+
+if __name__ == "__main__":
+    import argparse
+    from logs import configurar_logging
+
+    configurar_logging()
+    parser = argparse.ArgumentParser(description="Exporta a un ZIP los reportes PDF de los resultados guardados")
+    parser.add_argument("salida", help="archivo ZIP a crear")
+    parser.add_argument("--completada", action="store_true", help="solo evaluaciones completadas")
+    parser.add_argument("--email")
+    parser.add_argument("--q", dest="busqueda", help="nombre, email o código")
+    parser.add_argument("--desde", help="fecha de registro mínima (YYYY-MM-DD)")
+    parser.add_argument("--hasta", help="fecha de registro máxima (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help=f"procesos (por defecto {REPORTES_WORKERS})")
+    argumentos = parser.parse_args()
+
+    candidatos.inicializar()
+    with open(argumentos.salida, 'wb') as archivo:
+        for trozo in exportar_zip(
+            workers=argumentos.workers,
+            completada=True if argumentos.completada else None,
+            email=argumentos.email,
+            busqueda=argumentos.busqueda,
+            desde=argumentos.desde,
+            hasta=argumentos.hasta
+        ):
+            archivo.write(trozo)
+    logger.info("💾 ZIP guardado en %s", argumentos.salida)
@@ -0,0 +1,173 @@
+# Almacén de imágenes de preguntas direccionado por contenido
+# Cada imagen se guarda una vez como <sha256>.<ext> y se sirve con caché inmutable
+# Al ingerirlas se normalizan con Pillow (WebP, tamaño máximo, versiones responsive)
+
+from io import BytesIO
+import hashlib
+import logging
+import json
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_IMAGENES = os.path.join('cache', 'imagenes')
+PREFIJO_URL = '/imagenes/'
+PATRON_NOMBRE = re.compile(r'^[0-9a-f]{64}\.(png|jpeg|gif|bmp|webp)$')
+
+# ✅ NORMALIZACIÓN: la pregunta se muestra a máx. ~800px de ancho (x2 para pantallas retina)
+ANCHO_MAXIMO = 1600
+ALTO_MAXIMO = 1600
+ANCHOS_RESPONSIVE = (480, 960)
+CALIDAD_WEBP = 80
+# Subir cuando cambien los parámetros de arriba: invalida los manifiestos guardados
+VERSION_NORMALIZACION = 1
+
+def detectar_tipo(img_data):
+    """Extensión de la imagen según sus magic bytes"""
+    if img_data.startswith(b'\x89PNG'):
+        return 'png'
+    elif img_data.startswith(b'\xFF\xD8\xFF'):
+        return 'jpeg'
+    elif img_data.startswith(b'GIF8'):
+        return 'gif'
+    elif img_data.startswith(b'BM'):
+        return 'bmp'
+    elif img_data[:4] == b'RIFF' and img_data[8:12] == b'WEBP':
+        return 'webp'
+    return 'png'  # Default
+
+def guardar_imagen(img_data, directorio=DIRECTORIO_IMAGENES):
+    """Guarda los bytes (si no existen ya) y devuelve el nombre por contenido"""
+    nombre = f"{hashlib.sha256(img_data).hexdigest()}.{detectar_tipo(img_data)}"
+    ruta = os.path.join(directorio, nombre)
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(img_data)
+        os.replace(temporal, ruta)
+    return nombre
+
+def _leer_manifiesto(ruta, directorio):
+    try:
+        with open(ruta, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return None
+    nombres = [manifiesto.get("principal")] + [v["nombre"] for v in manifiesto.get("variantes", [])]
+    if manifiesto.get("version") != VERSION_NORMALIZACION or not all(
+            n and os.path.exists(os.path.join(directorio, n)) for n in nombres):
+        return None
+    return manifiesto
+
+def _escribir_manifiesto(ruta, manifiesto):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f)
+    os.replace(temporal, ruta)
+
+def _codificar(img):
+    """WebP si Pillow lo soporta; si no, PNG optimizado"""
+    from PIL import features
+    salida = BytesIO()
+    if features.check('webp'):
+        img.save(salida, 'WEBP', quality=CALIDAD_WEBP, method=4)
+    else:
+        img.save(salida, 'PNG', optimize=True)
+    return salida.getvalue()
+
+def _normalizar(img_data, directorio):
+    """Reescala/recodifica con Pillow y guarda principal + variantes; devuelve el manifiesto"""
+    from PIL import Image, ImageOps
+    
+    with Image.open(BytesIO(img_data)) as original:
+        if getattr(original, 'is_animated', False):
+            # GIF animado: recodificar perdería la animación
+            return {"principal": guardar_imagen(img_data, directorio), "ancho": original.width, "variantes": []}
+        img = ImageOps.exif_transpose(original)
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+    
+    redimensionada = img.width > ANCHO_MAXIMO or img.height > ALTO_MAXIMO
+    if redimensionada:
+        img.thumbnail((ANCHO_MAXIMO, ALTO_MAXIMO), Image.LANCZOS)
+    
+    principal = _codificar(img)
+    if not redimensionada and len(principal) >= len(img_data):
+        # Ya venía optimizada: recodificar solo la agrandaría
+        principal = img_data
+    
+    variantes = []
+    for ancho in ANCHOS_RESPONSIVE:
+        if ancho >= img.width:
+            continue
+        alto = max(1, round(img.height * ancho / img.width))
+        variante = _codificar(img.resize((ancho, alto), Image.LANCZOS))
+        variantes.append({"ancho": ancho, "nombre": guardar_imagen(variante, directorio)})
+    
+    return {"principal": guardar_imagen(principal, directorio), "ancho": img.width, "variantes": variantes}
+
+def guardar_normalizada(img_data, directorio=DIRECTORIO_IMAGENES):
+    """Normaliza la imagen (una sola vez por contenido) y devuelve su manifiesto
+    
+    {"principal": nombre, "ancho": px, "variantes": [{"ancho": px, "nombre": nombre}, ...]}
+    Si Pillow no está o no puede abrirla, se guarda tal cual sin variantes.
+    """
+    # Manifiesto por sha256 del original: las recargas no vuelven a decodificar nada
+    clave = hashlib.sha256(img_data).hexdigest()
+    ruta_manifiesto = os.path.join(directorio, 'normalizadas', f"{clave}.json")
+    manifiesto = _leer_manifiesto(ruta_manifiesto, directorio)
+    if manifiesto is not None:
+        return manifiesto
+    
+    try:
+        manifiesto = _normalizar(img_data, directorio)
+    except ImportError:
+        return {"principal": guardar_imagen(img_data, directorio), "ancho": None, "variantes": []}
+    except Exception as e:
+        logger.warning("⚠️ No se pudo normalizar la imagen (%s bytes), se guarda original: %s", len(img_data), e)
+        manifiesto = {"principal": guardar_imagen(img_data, directorio), "ancho": None, "variantes": []}
+    
+    manifiesto["version"] = VERSION_NORMALIZACION
+    logger.debug("🖼️ Imagen normalizada: %s bytes -> %s (%s variantes)",
+                 len(img_data), manifiesto["principal"], len(manifiesto["variantes"]))
+    try:
+        _escribir_manifiesto(ruta_manifiesto, manifiesto)
+    except OSError as e:
+        logger.warning("⚠️ No se pudo guardar el manifiesto de la imagen: %s", e)
+    return manifiesto
+
+def srcset(manifiesto):
+    """Atributo srcset para <img> ('' si no hay variantes)"""
+    if not manifiesto["variantes"] or not manifiesto.get("ancho"):
+        return ''
+    candidatos = [f"{url_imagen(v['nombre'])} {v['ancho']}w" for v in manifiesto["variantes"]]
+    candidatos.append(f"{url_imagen(manifiesto['principal'])} {manifiesto['ancho']}w")
+    return ", ".join(candidatos)
+
+def url_imagen(nombre):
+    return f"{PREFIJO_URL}{nombre}"
+
+def nombre_valido(nombre):
+    return bool(PATRON_NOMBRE.match(nombre))
+
+def ruta_imagen(nombre, directorio=DIRECTORIO_IMAGENES):
+    """Ruta absoluta de una imagen del almacén, o None si el nombre no es válido o no existe"""
+    if not nombre_valido(nombre):
+        return None
+    ruta = os.path.abspath(os.path.join(directorio, nombre))
+    return ruta if os.path.exists(ruta) else None
+
+def imagenes_faltantes(preguntas, directorio=DIRECTORIO_IMAGENES):
+    """URLs locales de las preguntas (imagen y variantes del srcset) cuyo archivo ya no está en el almacén"""
+    urls = []
+    for p in preguntas:
+        if p.get("imagen"):
+            urls.append(p["imagen"])
+        urls.extend(candidato.split(' ', 1)[0] for candidato in filter(None, p.get("imagen_srcset", "").split(', ')))
+    return [
+        url for url in urls
+        if url.startswith(PREFIJO_URL)
+        and not os.path.exists(os.path.join(directorio, url[len(PREFIJO_URL):]))
+    ]
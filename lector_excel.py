@@ -0,0 +1,127 @@
+# Lectura del Excel en una sola pasada
+# Celdas con openpyxl en modo read-only (streaming) e imágenes directo del zip del .xlsx,
+# ubicadas por el ancla de su dibujo (fila, columna). Sin cargar el libro completo ni
+# parsear el archivo dos veces.
+
+import posixpath
+import logging
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+}
+ATRIBUTO_RID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+ATRIBUTO_EMBED = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed'
+TIPO_DRAWING = '/drawing'
+
+def _ruta_rels(ruta):
+    """xl/worksheets/sheet1.xml -> xl/worksheets/_rels/sheet1.xml.rels"""
+    directorio, nombre = posixpath.split(ruta)
+    return posixpath.join(directorio, '_rels', nombre + '.rels')
+
+def _leer_rels(zip_xlsx, ruta):
+    """{rId: (tipo, ruta absoluta dentro del zip)} de las relaciones de una parte"""
+    try:
+        raiz = ET.fromstring(zip_xlsx.read(_ruta_rels(ruta)))
+    except KeyError:
+        return {}
+    base = posixpath.dirname(ruta)
+    rels = {}
+    for rel in raiz.findall('rel:Relationship', NS):
+        destino = rel.get('Target', '')
+        if rel.get('TargetMode') == 'External':
+            continue
+        if destino.startswith('/'):
+            destino = destino.lstrip('/')
+        else:
+            destino = posixpath.normpath(posixpath.join(base, destino))
+        rels[rel.get('Id')] = (rel.get('Type', ''), destino)
+    return rels
+
+def _primera_hoja(zip_xlsx):
+    """Ruta de la primera hoja del libro (la misma que lee pd.read_excel por defecto)"""
+    libro = ET.fromstring(zip_xlsx.read('xl/workbook.xml'))
+    hoja = libro.find('main:sheets/main:sheet', NS)
+    if hoja is None:
+        return None
+    return _leer_rels(zip_xlsx, 'xl/workbook.xml').get(hoja.get(ATRIBUTO_RID), (None, None))[1]
+
+def anclas_imagenes(zip_xlsx):
+    """{(fila, columna): miembro del zip} de las imágenes de la primera hoja (base 1)
+
+    Solo se leen los XML de relaciones y del dibujo; los bytes se leen después, bajo demanda.
+    """
+    hoja = _primera_hoja(zip_xlsx)
+    if not hoja:
+        return {}
+
+    anclas = {}
+    for tipo, dibujo in _leer_rels(zip_xlsx, hoja).values():
+        if not tipo.endswith(TIPO_DRAWING):
+            continue
+        rels_dibujo = _leer_rels(zip_xlsx, dibujo)
+        raiz = ET.fromstring(zip_xlsx.read(dibujo))
+        for ancla in list(raiz):
+            desde = ancla.find('xdr:from', NS)
+            blip = ancla.find('.//a:blip', NS)
+            if desde is None or blip is None:
+                continue
+            miembro = rels_dibujo.get(blip.get(ATRIBUTO_EMBED), (None, None))[1]
+            if not miembro:
+                continue
+            fila = int(desde.findtext('xdr:row', '0', NS)) + 1
+            columna = int(desde.findtext('xdr:col', '0', NS)) + 1
+            anclas[(fila, columna)] = miembro
+    return anclas
+
+class ImagenesAncladas:
+    """Imágenes de la hoja indexadas por fila; los bytes se leen del zip al pedirlos"""
+
+    def __init__(self, zip_xlsx, anclas, columna_preferida=None):
+        self._zip = zip_xlsx
+        self.por_fila = {}
+        # Si una fila tiene varias imágenes gana la anclada en la columna IMAGEN
+        for (fila, columna), miembro in sorted(anclas.items()):
+            if fila not in self.por_fila or columna == columna_preferida:
+                self.por_fila[fila] = miembro
+
+    def __len__(self):
+        return len(self.por_fila)
+
+    def leer(self, fila):
+        miembro = self.por_fila.get(fila)
+        return self._zip.read(miembro) if miembro else None
+
+def leer_filas(archivo):
+    """(encabezados, filas) de la primera hoja en modo read-only
+
+    La fila i de la lista corresponde a la fila i + 2 del Excel (la 1 son los encabezados).
+    """
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        filas = hoja.iter_rows(values_only=True)
+        encabezados = next(filas, ())
+        encabezados = [str(valor).strip() if valor is not None else f'Unnamed: {i}'
+                       for i, valor in enumerate(encabezados)]
+        ancho = len(encabezados)
+        datos = []
+        for fila in filas:
+            fila = tuple(fila[:ancho])
+            if len(fila) < ancho:
+                fila += (None,) * (ancho - len(fila))
+            datos.append(fila)
+    finally:
+        libro.close()
+
+    # Como pandas: sin filas vacías al final
+    while datos and all(valor is None for valor in datos[-1]):
+        datos.pop()
+    return encabezados, datos
@@ -1,9 +1,11 @@
 # CREAR leer_imagenes_reales.py
 import pandas as pd
-from openpyxl import load_workbook
+import zipfile
 import base64
 import os
 
+from lector_excel import anclas_imagenes
+
 def extraer_imagenes_reales():
     """Extrae las imágenes REALES del Excel, ignorando el texto 'Imagen'"""
     
@@ -17,75 +19,63 @@ def extraer_imagenes_reales():
         return
     
     try:
-        # 1. Cargar con openpyxl para acceder a imágenes
-        wb = load_workbook(archivo)
-        ws = wb.active
-        
-        print(f"📊 Archivo: {archivo}")
-        print(f"   Hojas: {wb.sheetnames}")
-        print(f"   Hoja activa: {ws.title}")
-        print(f"   Dimensiones: {ws.max_row} x {ws.max_column}")
-        
-        # 2. Mapear imágenes por posición
-        imagenes_por_posicion = {}
-        
-        if hasattr(ws, '_images') and ws._images:
-            print(f"\n🖼️ IMÁGENES ENCONTRADAS: {len(ws._images)}")
+        # 1. Leer las anclas de los dibujos directo del zip (sin cargar el libro completo)
+        with zipfile.ZipFile(archivo) as zip_xlsx:
+            anclas = anclas_imagenes(zip_xlsx)
+            
+            print(f"📊 Archivo: {archivo}")
+            
+            # 2. Mapear imágenes por posición
+            imagenes_por_posicion = {}
+            
+            if not anclas:
+                print(f"\n❌ NO SE ENCONTRARON IMÁGENES")
+                return {}
             
-            for i, img in enumerate(ws._images):
+            print(f"\n🖼️ IMÁGENES ENCONTRADAS: {len(anclas)}")
+            
+            for i, ((fila, columna), miembro) in enumerate(sorted(anclas.items())):
                 try:
-                    # Obtener posición de la imagen
-                    if hasattr(img.anchor, '_from'):
-                        fila = img.anchor._from.row + 1  # Convertir a base 1
-                        columna = img.anchor._from.col + 1
+                    print(f"\n   📸 Imagen {i+1}:")
+                    print(f"      Posición: Fila {fila}, Columna {columna}")
+                    print(f"      Archivo: {miembro}")
+                    
+                    # Extraer datos de la imagen
+                    img_data = zip_xlsx.read(miembro)
+                    
+                    if img_data and len(img_data) > 100:
+                        # Convertir a base64
+                        imagen_base64 = base64.b64encode(img_data).decode()
                         
-                        print(f"\n   📸 Imagen {i+1}:")
-                        print(f"      Posición: Fila {fila}, Columna {columna}")
-                        print(f"      Tipo: {type(img)}")
+                        # Detectar tipo de imagen
+                        if img_data.startswith(b'\x89PNG'):
+                            mime_type = 'png'
+                        elif img_data.startswith(b'\xFF\xD8\xFF'):
+                            mime_type = 'jpeg'
+                        elif img_data.startswith(b'GIF8'):
+                            mime_type = 'gif'
+                        else:
+                            mime_type = 'png'
                         
-                        # Extraer datos de la imagen
-                        img_data = None
-                        if hasattr(img, '_data'):
-                            img_data = img._data()
-                        elif hasattr(img, 'data'):
-                            img_data = img.data
+                        data_url = f"data:image/{mime_type};base64,{imagen_base64}"
+                        
+                        # Guardar por posición
+                        key = f"{fila}-{columna}"
+                        imagenes_por_posicion[key] = {
+                            'fila': fila,
+                            'columna': columna,
+                            'data_url': data_url,
+                            'tamaño': len(img_data),
+                            'tipo': mime_type
+                        }
+                        
+                        print(f"      ✅ Extraída: {mime_type} ({len(img_data):,} bytes)")
+                        print(f"      Base64: {len(imagen_base64)} caracteres")
+                    else:
+                        print(f"      ❌ Sin datos válidos")
                         
-                        if img_data and len(img_data) > 100:
-                            # Convertir a base64
-                            imagen_base64 = base64.b64encode(img_data).decode()
-                            
-                            # Detectar tipo de imagen
-                            if img_data.startswith(b'\x89PNG'):
-                                mime_type = 'png'
-                            elif img_data.startswith(b'\xFF\xD8\xFF'):
-                                mime_type = 'jpeg'
-                            elif img_data.startswith(b'GIF8'):
-                                mime_type = 'gif'
-                            else:
-                                mime_type = 'png'
-                            
-                            data_url = f"data:image/{mime_type};base64,{imagen_base64}"
-                            
-                            # Guardar por posición
-                            key = f"{fila}-{columna}"
-                            imagenes_por_posicion[key] = {
-                                'fila': fila,
-                                'columna': columna,
-                                'data_url': data_url,
-                                'tamaño': len(img_data),
-                                'tipo': mime_type
-                            }
-                            
-                            print(f"      ✅ Extraída: {mime_type} ({len(img_data):,} bytes)")
-                            print(f"      Base64: {len(imagen_base64)} caracteres")
-                        else:
-                            print(f"      ❌ Sin datos válidos")
-                            
                 except Exception as e:
                     print(f"      ❌ Error procesando imagen {i+1}: {e}")
-        else:
-            print(f"\n❌ NO SE ENCONTRARON IMÁGENES")
-            return {}
         
         print(f"\n📊 RESUMEN:")
         print(f"   Total imágenes extraídas: {len(imagenes_por_posicion)}")
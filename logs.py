@@ -0,0 +1,48 @@
+# Configuración de logging del sistema de evaluación
+# Los mensajes se encolan y un hilo aparte los escribe: la petición no espera a stdout
+#
+#   LOG_LEVEL=INFO                                     nivel general
+#   LOG_MODULOS="banco_preguntas=DEBUG,app=WARNING"    niveles por módulo
+
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import atexit
+import queue
+import os
+
+FORMATO = '%(asctime)s %(levelname)-7s [%(name)s] %(message)s'
+
+_listener = None
+
+def configurar_logging(nivel=None, modulos=None):
+    """Instala el QueueHandler en el logger raíz (idempotente)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    nivel = (nivel or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    modulos = modulos if modulos is not None else os.environ.get('LOG_MODULOS', '')
+
+    cola = queue.SimpleQueue()
+    salida = logging.StreamHandler()
+    salida.setFormatter(logging.Formatter(FORMATO))
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    raiz = logging.getLogger()
+    raiz.handlers = [QueueHandler(cola)]
+    raiz.setLevel(nivel)
+
+    for par in modulos.split(','):
+        if '=' not in par:
+            continue
+        modulo, nivel_modulo = par.split('=', 1)
+        logging.getLogger(modulo.strip()).setLevel(nivel_modulo.strip().upper())
+
+def configurar_logging_proceso_hijo():
+    """Inicializador de pools de procesos: la cola heredada no tiene listener en el hijo,
+    así que se escribe directo a stderr"""
+    salida = logging.StreamHandler()
+    salida.setFormatter(logging.Formatter(FORMATO))
+    logging.getLogger().handlers = [salida]
@@ -0,0 +1,145 @@
+# Métricas de latencia y throughput en formato de texto de Prometheus
+# Contadores en memoria con un lock por métrica: baratos para dejarlos siempre activos.
+# Son por proceso; con varios workers cada uno expone las suyas. Los hijos de los pools
+# de fork empiezan de cero y devuelven lo medido al padre (tomar/sumar).
+
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+import os
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metricas = []
+
+def _formatear_etiquetas(nombres, valores, extra=""):
+    partes = [f'{nombre}="{valor}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def inc(self, *valores_etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def exportar(self):
+        with self._lock:
+            valores = dict(self._valores)
+        return [
+            f"{self.nombre}{_formatear_etiquetas(self.etiquetas, clave)} {valor}"
+            for clave, valor in sorted(valores.items())
+        ]
+
+class Medidor(Contador):
+    """Valor que sube y baja (p.ej. peticiones en curso)"""
+    tipo = "gauge"
+
+    def dec(self, *valores_etiquetas, cantidad=1):
+        self.inc(*valores_etiquetas, cantidad=-cantidad)
+
+    def fijar(self, *valores_etiquetas, valor):
+        with self._lock:
+            self._valores[valores_etiquetas] = valor
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        self._series = {}  # etiquetas -> [conteos por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def observar(self, valor, *valores_etiquetas):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [0] * (len(self.buckets) + 2)
+            serie[indice] += 1
+            serie[-1] += valor
+
+    @contextmanager
+    def medir(self, *valores_etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, *valores_etiquetas)
+
+    def tomar(self):
+        """Series observadas desde la última toma (y las deja a cero)"""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def sumar(self, series):
+        """Añade series tomadas en otro proceso"""
+        with self._lock:
+            for clave, serie in series.items():
+                actual = self._series.get(clave)
+                if actual is None:
+                    self._series[clave] = list(serie)
+                else:
+                    self._series[clave] = [a + b for a, b in zip(actual, serie)]
+
+    def exportar(self):
+        with self._lock:
+            series = {clave: list(serie) for clave, serie in self._series.items()}
+        lineas = []
+        for clave, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ("+Inf",), serie[:-1]):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.etiquetas, clave, f'le="{limite}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {serie[-1]}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {acumulado}")
+        return lineas
+
+def _reiniciar_en_hijo():
+    # Un hijo de fork lanzado desde un hilo (petición, recarga) puede heredar un lock tomado
+    # por otro hilo del padre; los valores heredados ya los expone el padre
+    for metrica in _metricas:
+        metrica._lock = threading.Lock()
+        if isinstance(metrica, Histograma):
+            metrica._series = {}
+        else:
+            metrica._valores = {}
+
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+
+def exportar():
+    """Todas las métricas registradas en formato de exposición de Prometheus"""
+    lineas = []
+    for metrica in _metricas:
+        lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+        lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+        lineas.extend(metrica.exportar())
+    return "\n".join(lineas) + "\n"
+
+# ✅ MÉTRICAS DEL SISTEMA DE EVALUACIÓN
+PETICIONES = Contador("evaluacion_http_peticiones_total", "Peticiones HTTP atendidas", ("ruta", "metodo", "codigo"))
+ERRORES = Contador("evaluacion_http_errores_total", "Peticiones con excepción o respuesta 5xx", ("ruta",))
+EN_CURSO = Medidor("evaluacion_http_en_curso", "Peticiones HTTP en curso", ("ruta",))
+DURACION = Histograma("evaluacion_http_duracion_segundos", "Latencia de las peticiones HTTP", ("ruta",))
+PDF_RENDER = Histograma("evaluacion_pdf_render_segundos", "Tiempo de generación del reporte PDF")
+DRIVE_SUBIDA = Histograma("evaluacion_drive_subida_segundos", "Tiempo de subida del PDF a Google Drive")
+CARGA_PREGUNTAS = Histograma("evaluacion_carga_preguntas_segundos", "Tiempo de carga del banco de preguntas")
+PREGUNTAS_CARGADAS = Medidor("evaluacion_preguntas_cargadas", "Preguntas en el banco activo")
@@ -1,392 +1,405 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, LongTable, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
 from reportlab.lib.colors import HexColor
 from reportlab.lib import colors
+from xml.sax.saxutils import escape
 from datetime import datetime
+import threading
+import logging
+import io
 import os
 
+import contadores
+
+logger = logging.getLogger(__name__)
+
 # OBTENER TOTAL DE PREGUNTAS
 def get_total_preguntas():
     """Función local para obtener total de preguntas"""
     return 2 #Ajuste de numero de preguntas
 
+# ✅ DISEÑO DEL REPORTE
+# El contenido se arma con flowables de Platypus (párrafos y tablas) y SimpleDocTemplate
+# lo pagina: las tablas largas se parten entre páginas repitiendo su encabezado y el
+# texto de preguntas y respuestas se ajusta a la celda en lugar de recortarse.
+# Estilos y colores se crean una sola vez al importar el módulo.
+ANCHO_PAGINA, ALTO_PAGINA = letter
+MARGEN = 50
+ANCHO_UTIL = ANCHO_PAGINA - 2 * MARGEN
+# Subir cuando cambie el contenido o el diseño del reporte: invalida cache/reportes
+VERSION_REPORTE = 2
+
+AZUL = HexColor('#2E86C1')
+NEGRO = HexColor('#000000')
+GRIS_ENCABEZADO = HexColor('#34495e')
+GRIS_PIE = HexColor('#666666')
+GRIS_BORDE = HexColor('#bdc3c7')
+VERDE = HexColor('#27ae60')
+NARANJA = HexColor('#f39c12')
+NARANJA_OSCURO = HexColor('#e67e22')
+ROJO = HexColor('#e74c3c')
+GRIS_NO_EVALUADO = HexColor('#95a5a6')
+FONDO_RECOMENDACION = HexColor('#E3F2FD')
+FONDO_ENCABEZADO = HexColor('#ECF0F1')
+
+TITULO = "REPORTE DE EVALUACIÓN DE CANDIDATO"
+
+ESTILO_TITULO = ParagraphStyle('titulo', fontName='Helvetica-Bold', fontSize=16, leading=20,
+                               alignment=TA_CENTER, textColor=AZUL, spaceAfter=8)
+ESTILO_SUBTITULO = ParagraphStyle('subtitulo', fontName='Helvetica', fontSize=10, leading=12)
+ESTILO_SECCION = ParagraphStyle('seccion', fontName='Helvetica-Bold', fontSize=14, leading=17,
+                                textColor=AZUL, spaceBefore=14, spaceAfter=6)
+ESTILO_CELDA = ParagraphStyle('celda', fontName='Helvetica', fontSize=7, leading=8.5)
+# Relleno horizontal por defecto de las celdas de Table
+RELLENO_CELDA = 6
+ESTILO_RECOMENDACION = ParagraphStyle('recomendacion', fontName='Helvetica-Bold', fontSize=11,
+                                      leading=14, spaceAfter=4)
+ESTILO_DETALLE = ParagraphStyle('detalle', fontName='Helvetica', fontSize=9, leading=12)
+
+# Tablas de dos columnas (etiqueta | valor)
+ANCHOS_ETIQUETA_VALOR = (150, 250)
+ESTILO_ETIQUETA_VALOR = [
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, NEGRO),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 1),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+]
+
+ETIQUETAS_INFO = (
+    "Nombre Completo:",
+    "Código de Candidato:",
+    "Email:",
+    "Teléfono:",
+    "Fecha de Evaluación:",
+    "Estado de Evaluación:"
+)
+ETIQUETAS_ESTADISTICAS = (
+    "Preguntas Respondidas:",
+    "Respuestas Correctas:",
+    "Respuestas Incorrectas:",
+    "Porcentaje de Aciertos:",
+    "Puntuación Total:",
+    "Nivel Final Alcanzado:",
+    "RESULTADO FINAL:"
+)
+
+# Tablas con encabezado (niveles y respuestas)
+def _estilo_con_encabezado(tamano):
+    return [
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), tamano),
+        ('TEXTCOLOR', (0, 0), (-1, 0), GRIS_ENCABEZADO),
+        ('BACKGROUND', (0, 0), (-1, 0), FONDO_ENCABEZADO),
+        ('LINEBELOW', (0, 0), (-1, 0), 1, GRIS_ENCABEZADO),
+        ('LINEBELOW', (0, 1), (-1, -1), 0.25, GRIS_BORDE),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEADING', (0, 1), (-1, -1), tamano + 1.5),
+        ('TOPPADDING', (0, 0), (-1, -1), 2),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+    ]
+
+ENCABEZADOS_NIVELES = ("NIVEL", "DESCRIPCIÓN", "PREGUNTAS", "CORRECTAS", "% ACIERTO", "ESTADO")
+ANCHOS_NIVELES = (40, 170, 70, 70, 70, 92)
+ESTILO_NIVELES = _estilo_con_encabezado(9)
+NIVELES_DESCRIPCIONES = {
+    1: "Conocimientos Básicos",
+    2: "Conocimientos Intermedios",
+    3: "Conocimientos Avanzados",
+    4: "Conocimientos Especializados",
+    5: "Conocimientos de Experto"
+}
+
+ENCABEZADOS_RESPUESTAS = ("#", "PREGUNTA", "RESPUESTA DADA", "CORRECTA", "NIVEL", "PUNTOS")
+ANCHOS_RESPUESTAS = (25, 235, 130, 47, 35, 40)
+ESTILO_RESPUESTAS = _estilo_con_encabezado(7)
+
+def _dibujar_pie_fijo(c):
+    """Parte del pie igual para todos los candidatos"""
+    c.setStrokeColor(AZUL)
+    c.setLineWidth(0.5)
+    c.line(MARGEN, 42, ANCHO_PAGINA - MARGEN, 42)
+    c.setFont("Helvetica", 8)
+    c.setFillColor(GRIS_PIE)
+    c.drawRightString(ANCHO_PAGINA - MARGEN, 30, "Sistema de Evaluación de Candidatos - Confidencial")
+
+def nombre_reporte(candidato_actual):
+    datos_personales = candidato_actual.get('datos_personales', {})
+    nombre = datos_personales.get('nombre', 'Candidato')
+    codigo = datos_personales.get('codigo', 'N/A')
+    fecha = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return f"reporte_{nombre.replace(' ', '_')}_{codigo}_{fecha}.pdf"
+
+def guardar_reporte(nombre_archivo, contenido, directorio=None):
+    """Escribe el PDF en disco (reportes/ por defecto) y devuelve la ruta
+
+    Se escribe a un temporal único y se renombra: otro proceso nunca ve un PDF a medias.
+    """
+    directorio = directorio or os.path.join(os.getcwd(), "reportes")
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre_archivo)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+    logger.info("✅ PDF generado exitosamente: %s", ruta)
+    return ruta
+
+def _tabla_etiqueta_valor(filas, estilo_extra=()):
+    tabla = Table([list(fila) for fila in filas], colWidths=ANCHOS_ETIQUETA_VALOR, hAlign='LEFT')
+    tabla.setStyle(TableStyle(ESTILO_ETIQUETA_VALOR + list(estilo_extra)))
+    return tabla
+
+def _celda(texto, ancho):
+    """Texto libre partido en líneas que caben en la columna
+
+    simpleSplit mide las palabras una sola vez; un Paragraph por celda se vuelve a
+    maquetar en cada intento de partir la tabla.
+    """
+    lineas = simpleSplit(str(texto or ''), 'Helvetica', ESTILO_CELDA.fontSize, ancho - 2 * RELLENO_CELDA)
+    return "\n".join(lineas)
+
 class CandidateReportGenerator:
-    def generate_candidate_report(self, candidato_actual):
+    def generate_pdf_bytes(self, candidato_actual):
+        """(nombre_archivo, bytes) del reporte generado en memoria, o None si falla"""
         try:
-            # Datos del candidato
-            datos_personales = candidato_actual.get('datos_personales', {})
-            nombre = datos_personales.get('nombre', 'Candidato')
-            codigo = datos_personales.get('codigo', 'N/A')
-            email = datos_personales.get('email', '')
-            telefono = datos_personales.get('telefono', 'N/A')
-            
-            # Generar nombre del archivo
-            fecha = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"reporte_{nombre.replace(' ', '_')}_{codigo}_{fecha}.pdf"
-            filepath = os.path.join(os.getcwd(), "reportes")
-            
-            # Crear directorio si no existe
-            if not os.path.exists(filepath):
-                os.makedirs(filepath)
-            
-            full_path = os.path.join(filepath, filename)
-            
-            # Crear el PDF
-            c = canvas.Canvas(full_path, pagesize=letter)
-            width, height = letter
-
-            # ✅ EXTRAER ESTADÍSTICAS REALES DEL CANDIDATO
-            respuestas = candidato_actual.get('respuestas', [])
-            total_respondidas = len(respuestas)
-            correctas_totales = len([r for r in respuestas if r.get('correcta', False)])
-            incorrectas_totales = total_respondidas - correctas_totales
-            
-            # Porcentaje de acierto real
-            porcentaje_acierto = (correctas_totales / max(total_respondidas, 1)) * 100 if total_respondidas > 0 else 0
-            
-            # Estadísticas por nivel
-            stats_por_nivel = {}
-            for i in range(1, 6):  # Niveles 1-5
-                respuestas_nivel = [r for r in respuestas if r.get('nivel_candidato') == i]
-                correctas_nivel = len([r for r in respuestas_nivel if r.get('correcta', False)])
-                stats_por_nivel[i] = {
-                    'total': len(respuestas_nivel),
-                    'correctas': correctas_nivel,
-                    'porcentaje': (correctas_nivel / max(len(respuestas_nivel), 1)) * 100 if respuestas_nivel else 0
-                }
-            
-            nivel_maximo = candidato_actual.get('nivel', 1)
-            puntos_totales = candidato_actual.get('puntos', 0)
-            evaluacion_completa = candidato_actual.get('evaluacion_completa', False)
-
-            # TÍTULO PRINCIPAL
-            c.setFont("Helvetica-Bold", 16)
-            c.setFillColor(HexColor('#2E86C1'))
-            title = "REPORTE DE EVALUACIÓN DE CANDIDATO"
-            title_width = c.stringWidth(title, "Helvetica-Bold", 16)
-            c.drawString((width - title_width) / 2, height - 50, title)
-
-            # SUBTÍTULO
-            c.setFont("Helvetica", 10)
-            c.setFillColor(HexColor('#000000'))
-            y_pos = height - 75
-            c.drawString(50, y_pos, "Sistema de Evaluación de Candidatos - Evaluación Técnica de Firewall PAN")
-            y_pos -= 12
-            c.drawString(50, y_pos, "Desarrollado para Procesos de Selección de Personal")
-            y_pos -= 12
-            c.drawString(50, y_pos, f"Fecha de generación: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-
-            # INFORMACIÓN DEL CANDIDATO (TÍTULO)
-            y_pos -= 30
-            c.setFont("Helvetica-Bold", 14)
-            c.setFillColor(HexColor('#2E86C1'))
-            c.drawString(50, y_pos, "INFORMACIÓN DEL CANDIDATO")
-
-            # TABLA DE INFORMACIÓN DEL CANDIDATO
-            y_pos -= 25
-            c.setFillColor(HexColor('#000000'))
-            c.setFont("Helvetica", 10)
-
-            # Líneas de la tabla
-            table_y = y_pos
-            row_height = 15
-            col1_x = 50
-            col2_x = 200
-            table_width = 450
-
-            # Encabezados y datos
-            info_data = [
-                ("Nombre Completo:", nombre),
-                ("Código de Candidato:", codigo),
-                ("Email:", email),
-                ("Teléfono:", telefono),
-                ("Fecha de Evaluación:", datetime.now().strftime("%d/%m/%Y")),
-                ("Estado de Evaluación:", "COMPLETADA" if evaluacion_completa else "PARCIAL")
-            ]
+            buffer = io.BytesIO()
+            generado = datetime.now()
+            documento = SimpleDocTemplate(
+                buffer, pagesize=letter,
+                leftMargin=MARGEN, rightMargin=MARGEN, topMargin=30, bottomMargin=50,
+                title=TITULO, author="Sistema de Evaluación de Candidatos"
+            )
 
-            # Dibujar tabla con bordes
-            for i, (label, value) in enumerate(info_data):
-                y = table_y - (i * row_height)
-                # Bordes de la tabla
-                c.rect(col1_x, y - 12, 150, row_height, stroke=1, fill=0)
-                c.rect(col2_x, y - 12, 250, row_height, stroke=1, fill=0)
-                # Texto
-                c.drawString(col1_x + 5, y - 5, label)
-                c.drawString(col2_x + 5, y - 5, str(value))
-
-            # ✅ ESTADÍSTICAS GENERALES (TÍTULO)
-            y_pos -= 140
-            c.setFont("Helvetica-Bold", 14)
-            c.setFillColor(HexColor('#2E86C1'))
-            c.drawString(50, y_pos, "ESTADÍSTICAS GENERALES")
-
-            # TABLA DE ESTADÍSTICAS GENERALES
-            y_pos -= 25
-            c.setFillColor(HexColor('#000000'))
-            c.setFont("Helvetica", 10)
-
-            # ✅ USAR CONFIGURACIÓN AUTOMÁTICA
-            total_maximo = get_total_preguntas()  # ← USAR FUNCIÓN AUTOMÁTICA
-
-            # Determinar estado de aprobación
-            if nivel_maximo >= 5:
-                estado = "✓ APROBADO"
-                color_estado = HexColor('#27ae60')
-            elif nivel_maximo >= 3:
-                estado = "⚠ PARCIAL"
-                color_estado = HexColor('#f39c12')
-            else:
-                estado = "✗ NO APROBADO"
-                color_estado = HexColor('#e74c3c')
-
-            estadisticas_data = [
-                ("Preguntas Respondidas:", f"{total_respondidas} de {total_maximo}"),  # ← AUTOMÁTICO
-                ("Respuestas Correctas:", f"{correctas_totales}/{total_respondidas}"),
-                ("Respuestas Incorrectas:", f"{incorrectas_totales}/{total_respondidas}"),
-                ("Porcentaje de Aciertos:", f"{porcentaje_acierto:.1f}%"),
-                ("Puntuación Total:", f"{puntos_totales} puntos"),
-                ("Nivel Final Alcanzado:", f"Nivel {nivel_maximo}"),
-                ("RESULTADO FINAL:", estado)
-            ]
+            def pie_de_pagina(c, doc):
+                _dibujar_pie_fijo(c)
+                c.setFont("Helvetica", 8)
+                c.setFillColor(GRIS_PIE)
+                c.drawString(MARGEN, 30, f"Reporte generado el {generado.strftime('%d/%m/%Y a las %H:%M')} - "
+                                         f"Total preguntas configuradas: {get_total_preguntas()}")
+                c.drawCentredString(ANCHO_PAGINA / 2, 18, f"Página {doc.page}")
 
-            table_y = y_pos
-            for i, (label, value) in enumerate(estadisticas_data):
-                y = table_y - (i * row_height)
-                # Bordes
-                c.rect(col1_x, y - 12, 150, row_height, stroke=1, fill=0)
-                c.rect(col2_x, y - 12, 250, row_height, stroke=1, fill=0)
-                
-                # Texto
-                c.setFillColor(HexColor('#000000'))
-                c.drawString(col1_x + 5, y - 5, label)
-                
-                # Color especial para el resultado final
-                if label == "RESULTADO FINAL:":
-                    c.setFillColor(color_estado)
-                    c.setFont("Helvetica-Bold", 10)
-                elif "Correctas" in label:
-                    c.setFillColor(HexColor('#27ae60'))
-                elif "Incorrectas" in label:
-                    c.setFillColor(HexColor('#e74c3c'))
-                
-                c.drawString(col2_x + 5, y - 5, str(value))
-                c.setFillColor(HexColor('#000000'))
-                c.setFont("Helvetica", 10)
-
-            # ✅ ANÁLISIS DETALLADO POR NIVELES (TÍTULO)
-            y_pos -= 140
-            c.setFont("Helvetica-Bold", 14)
-            c.setFillColor(HexColor('#2E86C1'))
-            c.drawString(50, y_pos, "DESEMPEÑO POR NIVELES DE DIFICULTAD")
-
-            # ENCABEZADOS DE TABLA
-            y_pos -= 25
-            c.setFont("Helvetica-Bold", 9)
-            c.setFillColor(HexColor('#34495e'))
-            
-            # Encabezados
-            headers = ["NIVEL", "DESCRIPCIÓN", "PREGUNTAS", "CORRECTAS", "% ACIERTO", "ESTADO"]
-            col_widths = [40, 200, 80, 70, 70, 80]
-            col_positions = [50, 90, 290, 370, 440, 510]
-            
-            # Dibujar encabezados
-            for i, (header, pos) in enumerate(zip(headers, col_positions)):
-                c.drawString(pos, y_pos, header)
-            
-            # Línea separadora
-            y_pos -= 5
-            c.line(50, y_pos, 590, y_pos)
-            y_pos -= 10
+            documento.build(self._contenido(candidato_actual, generado),
+                            onFirstPage=pie_de_pagina, onLaterPages=pie_de_pagina)
+            logger.debug("✅ PDF generado en memoria: %s bytes, %s páginas", buffer.tell(), documento.page)
+            return nombre_reporte(candidato_actual), buffer.getvalue()
+        except Exception as e:
+            logger.exception("❌ Error generando PDF: %s", e)
+            return None
 
-            # DATOS POR NIVEL
-            c.setFont("Helvetica", 9)
-            
-            niveles_descripciones = {
-                1: "Conocimientos Básicos",
-                2: "Conocimientos Intermedios", 
-                3: "Conocimientos Avanzados",
-                4: "Conocimientos Especializados",
-                5: "Conocimientos de Experto"
-            }
-            
-            for nivel in range(1, 6):
-                stats = stats_por_nivel[nivel]
-                
-                # Determinar estado del nivel
-                if stats['total'] == 0:
-                    estado_nivel = "NO EVALUADO"
-                    color_nivel = HexColor('#95a5a6')
-                elif nivel <= nivel_maximo:
-                    if stats['correctas'] >= 2:  # Requisito de 2 correctas
-                        estado_nivel = "✓ APROBADO"
-                        color_nivel = HexColor('#27ae60')
-                    else:
-                        estado_nivel = "✗ NO APROBADO"
-                        color_nivel = HexColor('#e74c3c')
-                else:
-                    estado_nivel = "NO ALCANZADO"
-                    color_nivel = HexColor('#f39c12')
-                
-                # Datos del nivel
-                nivel_data = [
-                    str(nivel),
-                    niveles_descripciones[nivel],
-                    f"{stats['total']}" if stats['total'] > 0 else "0",
-                    f"{stats['correctas']}/{stats['total']}" if stats['total'] > 0 else "0/0",
-                    f"{stats['porcentaje']:.1f}%" if stats['total'] > 0 else "0%",
-                    estado_nivel
-                ]
-                
-                # Dibujar fila
-                for i, (data, pos) in enumerate(zip(nivel_data, col_positions)):
-                    if i == 5:  # Columna de estado
-                        c.setFillColor(color_nivel)
-                        if "APROBADO" in estado_nivel:
-                            c.setFont("Helvetica-Bold", 8)
-                    else:
-                        c.setFillColor(HexColor('#000000'))
-                        c.setFont("Helvetica", 9)
-                    
-                    c.drawString(pos, y_pos, data)
-                
-                y_pos -= 15
-
-            # ✅ DETALLE DE TODAS LAS RESPUESTAS
-            y_pos -= 30
-            c.setFont("Helvetica-Bold", 14)
-            c.setFillColor(HexColor('#2E86C1'))
-            c.drawString(50, y_pos, "DETALLE DE RESPUESTAS")
-
-            # ENCABEZADOS DE TABLA DE RESPUESTAS
-            y_pos -= 25
-            c.setFont("Helvetica-Bold", 8)
-            c.setFillColor(HexColor('#34495e'))
-            
-            resp_headers = ["#", "PREGUNTA", "RESPUESTA DADA", "CORRECTA", "NIVEL", "PUNTOS"]
-            resp_positions = [50, 80, 300, 420, 480, 520]
-            
-            for header, pos in zip(resp_headers, resp_positions):
-                c.drawString(pos, y_pos, header)
-            
-            # Línea separadora
-            y_pos -= 5
-            c.line(50, y_pos, 550, y_pos)
-            y_pos -= 10
+    def generate_candidate_report(self, candidato_actual, directorio=None):
+        """Genera el reporte y lo guarda en disco (reportes/ por defecto); devuelve la ruta o None"""
+        generado = self.generate_pdf_bytes(candidato_actual)
+        if generado is None:
+            return None
+        try:
+            return guardar_reporte(*generado, directorio=directorio)
+        except OSError as e:
+            logger.exception("❌ Error guardando PDF: %s", e)
+            return None
 
-            # DATOS DE RESPUESTAS
-            c.setFont("Helvetica", 7)
-            
-            for i, resp in enumerate(respuestas, 1):
-                if y_pos < 100:  # Nueva página si no hay espacio
-                    c.showPage()
-                    y_pos = height - 50
-                    c.setFont("Helvetica", 7)
-                
-                # Preparar datos
-                pregunta_corta = resp.get('pregunta', '')[:35] + '...' if len(resp.get('pregunta', '')) > 35 else resp.get('pregunta', '')
-                respuesta_corta = resp.get('respuesta', '')[:20] + '...' if len(resp.get('respuesta', '')) > 20 else resp.get('respuesta', '')
-                es_correcta = resp.get('correcta', False)
-                nivel_candidato = resp.get('nivel_candidato', 1)
-                puntos = resp.get('puntos', 0)
-                
-                # Datos de la fila
-                resp_data = [
-                    str(i),
-                    pregunta_corta,
-                    respuesta_corta,
-                    "✓" if es_correcta else "✗",
-                    f"N{nivel_candidato}",
-                    f"{puntos:.1f}"
-                ]
-                
-                # Dibujar fila
-                for j, (data, pos) in enumerate(zip(resp_data, resp_positions)):
-                    if j == 3:  # Columna correcta
-                        c.setFillColor(HexColor('#27ae60') if es_correcta else HexColor('#e74c3c'))
-                    else:
-                        c.setFillColor(HexColor('#000000'))
-                    
-                    c.drawString(pos, y_pos, data)
-                
-                y_pos -= 12
-            
-            # RECOMENDACIÓN PARA RECURSOS HUMANOS (nueva página si es necesario)
-            if y_pos < 200:
-                c.showPage()
-                y_pos = height - 50
-
-            y_pos -= 30
-            c.setFont("Helvetica-Bold", 14)
-            c.setFillColor(HexColor('#2E86C1'))
-            c.drawString(50, y_pos, "RECOMENDACIÓN PARA RECURSOS HUMANOS")
-
-            # CAJA DE RECOMENDACIÓN
-            y_pos -= 30
-            box_height = 100
-            c.setFillColor(HexColor('#E3F2FD'))
-            c.rect(50, y_pos - box_height, 500, box_height, fill=1, stroke=1)
-
-            # ✅ RECOMENDACIÓN BASADA EN ESTADÍSTICAS REALES
-            c.setFont("Helvetica-Bold", 11)
+    def _contenido(self, candidato_actual, generado):
+        """Lista de flowables del reporte"""
+        # Datos del candidato
+        datos_personales = candidato_actual.get('datos_personales', {})
+        nombre = datos_personales.get('nombre', 'Candidato')
+        codigo = datos_personales.get('codigo', 'N/A')
+        email = datos_personales.get('email', '')
+        telefono = datos_personales.get('telefono', 'N/A')
+
+        # ✅ EXTRAER ESTADÍSTICAS REALES DEL CANDIDATO
+        respuestas = candidato_actual.get('respuestas', [])
+        # Contadores acumulados durante la evaluación (se reconstruyen si el resultado es antiguo)
+        conteos = contadores.de_candidato(candidato_actual)
+        total_respondidas = conteos['total_respondidas']
+        correctas_totales = conteos['total_correctas']
+        incorrectas_totales = total_respondidas - correctas_totales
+        
+        # Porcentaje de acierto real
+        porcentaje_acierto = contadores.porcentaje(correctas_totales, total_respondidas)
+        
+        nivel_maximo = candidato_actual.get('nivel', 1)
+        puntos_totales = candidato_actual.get('puntos', 0)
+        evaluacion_completa = candidato_actual.get('evaluacion_completa', False)
+
+        # TÍTULO Y SUBTÍTULO
+        contenido = [
+            Paragraph(TITULO, ESTILO_TITULO),
+            Paragraph("Sistema de Evaluación de Candidatos - Evaluación Técnica de Firewall PAN", ESTILO_SUBTITULO),
+            Paragraph("Desarrollado para Procesos de Selección de Personal", ESTILO_SUBTITULO),
+            Paragraph(f"Fecha de generación: {generado.strftime('%d/%m/%Y %H:%M')}", ESTILO_SUBTITULO),
+        ]
+
+        # INFORMACIÓN DEL CANDIDATO
+        info_data = [
+            nombre,
+            codigo,
+            email,
+            telefono,
+            generado.strftime("%d/%m/%Y"),
+            "COMPLETADA" if evaluacion_completa else "PARCIAL"
+        ]
+        contenido += [
+            Paragraph("INFORMACIÓN DEL CANDIDATO", ESTILO_SECCION),
+            _tabla_etiqueta_valor(zip(ETIQUETAS_INFO, map(str, info_data)))
+        ]
+
+        # ✅ ESTADÍSTICAS GENERALES
+        total_maximo = get_total_preguntas()  # ← USAR FUNCIÓN AUTOMÁTICA
+
+        # Determinar estado de aprobación
+        if nivel_maximo >= 5:
+            estado = "✓ APROBADO"
+            color_estado = VERDE
+        elif nivel_maximo >= 3:
+            estado = "⚠ PARCIAL"
+            color_estado = NARANJA
+        else:
+            estado = "✗ NO APROBADO"
+            color_estado = ROJO
+
+        estadisticas_data = [
+            f"{total_respondidas} de {total_maximo}",  # ← AUTOMÁTICO
+            f"{correctas_totales}/{total_respondidas}",
+            f"{incorrectas_totales}/{total_respondidas}",
+            f"{porcentaje_acierto:.1f}%",
+            f"{round(puntos_totales, 2):g} puntos",
+            f"Nivel {nivel_maximo}",
+            estado
+        ]
+        contenido += [
+            Paragraph("ESTADÍSTICAS GENERALES", ESTILO_SECCION),
+            _tabla_etiqueta_valor(zip(ETIQUETAS_ESTADISTICAS, estadisticas_data), [
+                ('TEXTCOLOR', (1, 1), (1, 1), VERDE),
+                ('TEXTCOLOR', (1, 2), (1, 2), ROJO),
+                ('TEXTCOLOR', (1, 6), (1, 6), color_estado),
+                ('FONTNAME', (1, 6), (1, 6), 'Helvetica-Bold'),
+            ])
+        ]
+
+        # ✅ ANÁLISIS DETALLADO POR NIVELES
+        filas_niveles = [list(ENCABEZADOS_NIVELES)]
+        estilo_niveles = list(ESTILO_NIVELES)
+        for fila, nivel in enumerate(contadores.NIVELES, 1):
+            total = conteos['respondidas'][nivel]
+            correctas = conteos['correctas'][nivel]
             
-            if nivel_maximo >= 5 and porcentaje_acierto >= 80:
-                c.setFillColor(HexColor('#27ae60'))
-                recomendacion = "CANDIDATO ALTAMENTE RECOMENDADO"
-                detalle1 = f"Excelente desempeño: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)"
-                detalle2 = f"Alcanzó el nivel máximo ({nivel_maximo}/5) con sólidos conocimientos técnicos."
-                detalle3 = "Se recomienda su contratación inmediata para posiciones técnicas especializadas."
-                detalle4 = f"Puntuación total: {puntos_totales} puntos - Candidato excepcional."
-            elif nivel_maximo >= 4 and porcentaje_acierto >= 60:
-                c.setFillColor(HexColor('#f39c12'))
-                recomendacion = "CANDIDATO RECOMENDADO CON RESERVAS"
-                detalle1 = f"Buen desempeño: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)"
-                detalle2 = f"Alcanzó nivel {nivel_maximo}/5, requiere capacitación adicional en temas avanzados."
-                detalle3 = "Apto para posiciones junior con mentoría técnica."
-                detalle4 = f"Puntuación total: {puntos_totales} puntos - Potencial de crecimiento."
-            elif nivel_maximo >= 3 and porcentaje_acierto >= 40:
-                c.setFillColor(HexColor('#e67e22'))
-                recomendacion = "CANDIDATO ACEPTABLE"
-                detalle1 = f"Desempeño regular: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)"
-                detalle2 = f"Conocimientos básicos-intermedios (nivel {nivel_maximo}/5)."
-                detalle3 = "Requiere capacitación extensiva antes de asignación técnica."
-                detalle4 = f"Puntuación total: {puntos_totales} puntos - Considerar según necesidades."
+            # Determinar estado del nivel
+            if total == 0:
+                estado_nivel = "NO EVALUADO"
+                color_nivel = GRIS_NO_EVALUADO
+            elif nivel <= nivel_maximo:
+                if correctas >= 2:  # Requisito de 2 correctas
+                    estado_nivel = "✓ APROBADO"
+                    color_nivel = VERDE
+                else:
+                    estado_nivel = "✗ NO APROBADO"
+                    color_nivel = ROJO
             else:
-                c.setFillColor(HexColor('#e74c3c'))
-                recomendacion = "CANDIDATO NO RECOMENDADO"
-                detalle1 = f"Desempeño insuficiente: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)"
-                detalle2 = f"No alcanzó conocimientos mínimos requeridos (nivel {nivel_maximo}/5)."
-                detalle3 = "Se sugiere buscar candidatos con mayor preparación técnica."
-                detalle4 = f"Puntuación total: {puntos_totales} puntos - No cumple estándares mínimos."
-
-            c.drawString(60, y_pos - 20, recomendacion)
-            c.setFont("Helvetica", 9)
-            c.setFillColor(HexColor('#000000'))
-            c.drawString(60, y_pos - 35, detalle1)
-            c.drawString(60, y_pos - 48, detalle2)
-            c.drawString(60, y_pos - 61, detalle3)
-            c.drawString(60, y_pos - 74, detalle4)
-            c.drawString(60, y_pos - 87, "Este reporte fue generado automáticamente por el Sistema de Evaluación.")
-
-            # PIE DE PÁGINA
-            c.setFont("Helvetica", 8)
-            c.setFillColor(HexColor('#666666'))
-            c.drawString(50, 30, f"Reporte generado el {datetime.now().strftime('%d/%m/%Y a las %H:%M')} - Confidencial")
-            c.drawString(400, 30, f"Total preguntas configuradas: {total_maximo}")
-
-            c.save()
-            
-            print(f"✅ PDF generado exitosamente: {full_path}")
-            print(f"📊 Estadísticas incluidas: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)")
-            print(f"🎯 Nivel alcanzado: {nivel_maximo}/5")
-            print(f"💯 Puntuación total: {puntos_totales} puntos")
+                estado_nivel = "NO ALCANZADO"
+                color_nivel = NARANJA
             
-            return full_path
+            filas_niveles.append([
+                str(nivel),
+                NIVELES_DESCRIPCIONES[nivel],
+                str(total),
+                f"{correctas}/{total}",
+                f"{contadores.porcentaje(correctas, total):.1f}%" if total > 0 else "0%",
+                estado_nivel
+            ])
+            estilo_niveles.append(('TEXTCOLOR', (5, fila), (5, fila), color_nivel))
+            if "APROBADO" in estado_nivel:
+                estilo_niveles.append(('FONTNAME', (5, fila), (5, fila), 'Helvetica-Bold'))
+
+        tabla_niveles = Table(filas_niveles, colWidths=ANCHOS_NIVELES, repeatRows=1, hAlign='LEFT')
+        tabla_niveles.setStyle(TableStyle(estilo_niveles))
+        contenido += [Paragraph("DESEMPEÑO POR NIVELES DE DIFICULTAD", ESTILO_SECCION), tabla_niveles]
+
+        # ✅ DETALLE DE TODAS LAS RESPUESTAS
+        # LongTable: al partirse entre páginas no vuelve a medir las filas ya colocadas
+        filas_respuestas = [list(ENCABEZADOS_RESPUESTAS)]
+        estilo_respuestas = list(ESTILO_RESPUESTAS)
+        for i, resp in enumerate(respuestas, 1):
+            es_correcta = resp.get('correcta', False)
+            # Crédito parcial en preguntas de respuesta múltiple
+            es_parcial = not es_correcta and 0 < resp.get('credito', 0) < 1
             
-        except Exception as e:
-            print(f"❌ Error generando PDF: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
\ No newline at end of file
+            filas_respuestas.append([
+                str(i),
+                _celda(resp.get('pregunta'), ANCHOS_RESPUESTAS[1]),
+                _celda(resp.get('respuesta'), ANCHOS_RESPUESTAS[2]),
+                "✓" if es_correcta else (f"{resp['credito']:.0%}" if es_parcial else "✗"),
+                f"N{resp.get('nivel_candidato', 1)}",
+                f"{resp.get('puntos', 0):.1f}"
+            ])
+            estilo_respuestas.append(('TEXTCOLOR', (3, i), (3, i),
+                                      VERDE if es_correcta else (NARANJA if es_parcial else ROJO)))
+
+        tabla_respuestas = LongTable(filas_respuestas, colWidths=ANCHOS_RESPUESTAS, repeatRows=1, hAlign='LEFT')
+        tabla_respuestas.setStyle(TableStyle(estilo_respuestas))
+        contenido += [Paragraph("DETALLE DE RESPUESTAS", ESTILO_SECCION), tabla_respuestas]
+
+        # ✅ RECOMENDACIÓN BASADA EN ESTADÍSTICAS REALES
+        if nivel_maximo >= 5 and porcentaje_acierto >= 80:
+            color_recomendacion = VERDE
+            recomendacion = "CANDIDATO ALTAMENTE RECOMENDADO"
+            detalles = [
+                f"Excelente desempeño: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)",
+                f"Alcanzó el nivel máximo ({nivel_maximo}/5) con sólidos conocimientos técnicos.",
+                "Se recomienda su contratación inmediata para posiciones técnicas especializadas.",
+                f"Puntuación total: {puntos_totales} puntos - Candidato excepcional."
+            ]
+        elif nivel_maximo >= 4 and porcentaje_acierto >= 60:
+            color_recomendacion = NARANJA
+            recomendacion = "CANDIDATO RECOMENDADO CON RESERVAS"
+            detalles = [
+                f"Buen desempeño: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)",
+                f"Alcanzó nivel {nivel_maximo}/5, requiere capacitación adicional en temas avanzados.",
+                "Apto para posiciones junior con mentoría técnica.",
+                f"Puntuación total: {puntos_totales} puntos - Potencial de crecimiento."
+            ]
+        elif nivel_maximo >= 3 and porcentaje_acierto >= 40:
+            color_recomendacion = NARANJA_OSCURO
+            recomendacion = "CANDIDATO ACEPTABLE"
+            detalles = [
+                f"Desempeño regular: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)",
+                f"Conocimientos básicos-intermedios (nivel {nivel_maximo}/5).",
+                "Requiere capacitación extensiva antes de asignación técnica.",
+                f"Puntuación total: {puntos_totales} puntos - Considerar según necesidades."
+            ]
+        else:
+            color_recomendacion = ROJO
+            recomendacion = "CANDIDATO NO RECOMENDADO"
+            detalles = [
+                f"Desempeño insuficiente: {correctas_totales}/{total_respondidas} correctas ({porcentaje_acierto:.1f}%)",
+                f"No alcanzó conocimientos mínimos requeridos (nivel {nivel_maximo}/5).",
+                "Se sugiere buscar candidatos con mayor preparación técnica.",
+                f"Puntuación total: {puntos_totales} puntos - No cumple estándares mínimos."
+            ]
+        detalles.append("Este reporte fue generado automáticamente por el Sistema de Evaluación.")
+
+        # CAJA DE RECOMENDACIÓN (una celda con fondo); el título no se separa de la caja
+        caja = Table([[
+            [Paragraph(recomendacion, ParagraphStyle('recomendacion_color', ESTILO_RECOMENDACION,
+                                                     textColor=color_recomendacion))] +
+            [Paragraph(escape(detalle), ESTILO_DETALLE) for detalle in detalles]
+        ]], colWidths=[500], hAlign='LEFT')
+        caja.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), FONDO_RECOMENDACION),
+            ('BOX', (0, 0), (-1, -1), 1, NEGRO),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        contenido.append(KeepTogether([Paragraph("RECOMENDACIÓN PARA RECURSOS HUMANOS", ESTILO_SECCION), caja]))
+
+        logger.debug("📊 %s/%s correctas (%.1f%%) | 🎯 Nivel %s/5 | 💯 %s puntos",
+                     correctas_totales, total_respondidas, porcentaje_acierto, nivel_maximo, puntos_totales)
+        return contenido
@@ -0,0 +1,234 @@
+# Motores de selección de preguntas
+#
+#   SELECTOR_PREGUNTAS=niveles   (defecto) nivel 1 forzado al inicio y luego el nivel del candidato
+#   SELECTOR_PREGUNTAS=irt       test adaptativo (CAT) con teoría de respuesta al ítem (2PL)
+#
+# Todos implementan la misma interfaz:
+#   iniciar(candidato_actual)                              estado inicial en la sesión
+#   siguiente(banco, candidato_actual, categoria)          pregunta elegida (o SinPreguntas)
+#   registrar(candidato_actual, pregunta, correcta, credito) -> True si el candidato sube de nivel
+#   terminado(candidato_actual)                            True si ya no hacen falta más preguntas
+
+from weakref import WeakKeyDictionary
+import threading
+import logging
+import random
+import math
+import os
+
+import contadores
+
+logger = logging.getLogger(__name__)
+
+class SinPreguntas(Exception):
+    """No queda ninguna pregunta elegible; critica=True si la evaluación no puede ni empezar"""
+    def __init__(self, mensaje, critica=False):
+        super().__init__(mensaje)
+        self.critica = critica
+
+class SelectorNiveles:
+    """Selección original: N preguntas de nivel 1 y después al azar dentro del nivel del candidato"""
+    nombre = 'niveles'
+
+    def __init__(self, configuracion):
+        # configuracion: función que devuelve get_configuracion_evaluacion()
+        self.configuracion = configuracion
+
+    def iniciar(self, candidato_actual):
+        pass
+
+    def siguiente(self, banco, candidato_actual, categoria=None):
+        config = self.configuracion()
+        mostradas = len(candidato_actual["preguntas_mostradas"])
+        ids_mostrados = candidato_actual["ids_mostrados"]
+
+        if mostradas < config["preguntas_nivel_1"]:
+            nivel_busqueda = 1
+            logger.debug("🎯 FORZANDO NIVEL 1 - Pregunta %s/%s", mostradas + 1, config['preguntas_nivel_1'])
+        else:
+            nivel_busqueda = candidato_actual.get("nivel", 1)
+            logger.debug("📊 Usando nivel del candidato: %s", nivel_busqueda)
+
+        pregunta = banco.seleccionar(nivel_busqueda, ids_mostrados, categoria)
+        if pregunta is None:
+            logger.warning("❌ NO HAY PREGUNTAS DE NIVEL %s | Niveles disponibles: %s",
+                           nivel_busqueda, banco.disponibles_por_nivel(ids_mostrados))
+            if nivel_busqueda == 1:
+                raise SinPreguntas("No hay preguntas básicas disponibles", critica=True)
+            raise SinPreguntas("No hay más preguntas del nivel requerido")
+
+        if pregunta["nivel"] != nivel_busqueda:
+            logger.error("🚨 ALERTA: Pregunta nivel %s cuando se buscaba nivel %s. Revisar datos del Excel.",
+                         pregunta['nivel'], nivel_busqueda)
+        return pregunta
+
+    def registrar(self, candidato_actual, pregunta, correcta, credito):
+        config = self.configuracion()
+        nivel = candidato_actual.get("nivel", 1)
+        conteos = contadores.de_candidato(candidato_actual)
+
+        if (conteos["respondidas"][nivel] >= config["preguntas_nivel_1"] and
+                conteos["correctas"][nivel] >= config["min_correctas_avance"] and
+                nivel < config["niveles_maximos"]):
+            candidato_actual["nivel"] = nivel + 1
+            logger.debug("🎉 ¡NIVEL UP! %s → %s", nivel, candidato_actual['nivel'])
+            return True
+        if nivel >= config["niveles_maximos"]:
+            logger.debug("🏆 YA EN NIVEL MÁXIMO: %s", nivel)
+        return False
+
+    def terminado(self, candidato_actual):
+        return False
+
+class SelectorIRT:
+    """Test adaptativo con el modelo logístico de 2 parámetros
+
+    P(correcta | θ) = 1 / (1 + exp(-a (θ - b)))      información I(θ) = a² P (1 - P)
+
+    Parámetros por pregunta: 'discriminacion' (a) y 'dificultad' (b) si vienen en el banco;
+    si no, a = 1 y b = nivel - 3 (niveles 1..5 -> -2..2).
+    Para cada punto de una rejilla de θ se precalcula (una vez por banco) el orden de las
+    preguntas por información: elegir la siguiente es recorrer esa fila saltando las ya
+    mostradas. θ se estima por EAP sobre la misma rejilla con prior normal estándar.
+    """
+    nombre = 'irt'
+
+    THETA_MIN = -4.0
+    THETA_MAX = 4.0
+    PASO_THETA = 0.1
+    # Fracción de la información de la mejor pregunta para entrar en el sorteo
+    TOLERANCIA_INFORMACION = 0.95
+
+    def __init__(self, error_objetivo=None, minimo_preguntas=None, aleatoriedad=None):
+        # Se termina cuando el error estándar de θ baja de error_objetivo
+        self.error_objetivo = error_objetivo if error_objetivo is not None else float(os.environ.get('IRT_ERROR_OBJETIVO', 0.4))
+        self.minimo_preguntas = minimo_preguntas if minimo_preguntas is not None else int(os.environ.get('IRT_MINIMO_PREGUNTAS', 5))
+        # Se elige al azar entre hasta k preguntas casi tan informativas como la mejor:
+        # limita la sobreexposición (con parámetros por nivel hay muchos empates)
+        self.aleatoriedad = aleatoriedad if aleatoriedad is not None else int(os.environ.get('IRT_ALEATORIEDAD', 10))
+        self.puntos = round((self.THETA_MAX - self.THETA_MIN) / self.PASO_THETA) + 1
+        self._tablas = WeakKeyDictionary()  # banco -> {categoria: tabla}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parametros(pregunta):
+        a = pregunta.get("discriminacion") or 1.0
+        b = pregunta.get("dificultad")
+        if b is None:
+            b = pregunta.get("nivel", 3) - 3
+        return a, b
+
+    def _rejilla(self):
+        import numpy as np
+        return np.linspace(self.THETA_MIN, self.THETA_MAX, self.puntos)
+
+    def _tabla(self, banco, categoria):
+        """(ids, orden, informacion) de las preguntas del banco/categoría
+
+        orden[g] = columnas por información descendente en θ_g; informacion[g] = esos valores.
+        """
+        tablas = self._tablas.get(banco)
+        if tablas is not None and categoria in tablas:
+            return tablas[categoria]
+
+        with self._lock:
+            tablas = self._tablas.setdefault(banco, {})
+            if categoria not in tablas:
+                import numpy as np
+                preguntas = banco.filtrar(categoria=categoria)
+                ids = np.array([p["id"] for p in preguntas], dtype=np.int64)
+                parametros = [self.parametros(p) for p in preguntas]
+                a = np.array([a for a, _ in parametros], dtype=float)
+                b = np.array([b for _, b in parametros], dtype=float)
+                theta = self._rejilla()[:, None]
+                p = 1.0 / (1.0 + np.exp(-a * (theta - b)))
+                informacion = a ** 2 * p * (1.0 - p)
+                orden = np.argsort(-informacion, axis=1, kind='stable').astype(np.int32)
+                informacion = np.take_along_axis(informacion, orden, axis=1).astype(np.float32)
+                tablas[categoria] = (ids, orden, informacion)
+                logger.debug("🧮 Tabla de información IRT: banco %s, categoría %s, %s preguntas",
+                             banco.version, categoria, len(ids))
+            return tablas[categoria]
+
+    def iniciar(self, candidato_actual):
+        # Log-posterior sobre la rejilla, empezando por el prior normal estándar
+        rejilla = [self.THETA_MIN + i * self.PASO_THETA for i in range(self.puntos)]
+        candidato_actual["irt"] = {
+            "log_posterior": [-0.5 * t * t for t in rejilla],
+            "theta": 0.0,
+            "error": 1.0
+        }
+        # ✅ El nivel parte del prior (θ = 0 -> nivel 3): subir de nivel es subir desde ahí
+        candidato_actual["nivel"] = self.nivel_desde_theta(0.0)
+
+    def _estado(self, candidato_actual):
+        if "irt" not in candidato_actual:
+            self.iniciar(candidato_actual)
+        return candidato_actual["irt"]
+
+    def siguiente(self, banco, candidato_actual, categoria=None):
+        estado = self._estado(candidato_actual)
+        ids, orden, informacion = self._tabla(banco, categoria)
+        fila = round((estado["theta"] - self.THETA_MIN) / self.PASO_THETA)
+        fila = min(max(fila, 0), self.puntos - 1)
+
+        ids_mostrados = candidato_actual["ids_mostrados"]
+        candidatas = []
+        umbral = None
+        # Como mucho se recorren las ya mostradas + k posiciones de la fila
+        for columna, info in zip(orden[fila], informacion[fila]):
+            pregunta_id = int(ids[columna])
+            if pregunta_id in ids_mostrados:
+                continue
+            if umbral is None:
+                umbral = info * self.TOLERANCIA_INFORMACION
+            elif info < umbral:
+                break
+            candidatas.append(pregunta_id)
+            if len(candidatas) >= self.aleatoriedad:
+                break
+        if not candidatas:
+            raise SinPreguntas("No hay más preguntas disponibles", critica=not ids_mostrados)
+
+        pregunta = banco.obtener(random.choice(candidatas))
+        logger.debug("🧠 CAT: θ=%.2f ± %.2f -> pregunta %s (nivel %s)",
+                     estado['theta'], estado['error'], pregunta['id'], pregunta['nivel'])
+        return pregunta
+
+    def registrar(self, candidato_actual, pregunta, correcta, credito):
+        import numpy as np
+        estado = self._estado(candidato_actual)
+        a, b = self.parametros(pregunta)
+        # Respuesta como fracción (crédito parcial en preguntas múltiples)
+        x = 1.0 if correcta else credito
+
+        rejilla = self._rejilla()
+        p = np.clip(1.0 / (1.0 + np.exp(-a * (rejilla - b))), 1e-9, 1 - 1e-9)
+        log_posterior = np.asarray(estado["log_posterior"]) + x * np.log(p) + (1.0 - x) * np.log1p(-p)
+
+        pesos = np.exp(log_posterior - log_posterior.max())
+        pesos /= pesos.sum()
+        theta = float((pesos * rejilla).sum())
+        error = float(math.sqrt((pesos * (rejilla - theta) ** 2).sum()))
+        estado.update(log_posterior=log_posterior.tolist(), theta=theta, error=error)
+
+        nivel_anterior = candidato_actual.get("nivel", 1)
+        candidato_actual["nivel"] = self.nivel_desde_theta(theta)
+        logger.debug("🧠 CAT: θ=%.2f ± %.2f -> nivel %s", theta, error, candidato_actual['nivel'])
+        return candidato_actual["nivel"] > nivel_anterior
+
+    @staticmethod
+    def nivel_desde_theta(theta):
+        return int(min(max(round(theta + 3), 1), 5))
+
+    def terminado(self, candidato_actual):
+        estado = self._estado(candidato_actual)
+        respondidas = contadores.de_candidato(candidato_actual)["total_respondidas"]
+        return respondidas >= self.minimo_preguntas and estado["error"] < self.error_objetivo
+
+def crear_selectores(configuracion):
+    """{nombre: selector} con todos los motores disponibles"""
+    return {
+        SelectorNiveles.nombre: SelectorNiveles(configuracion),
+        SelectorIRT.nombre: SelectorIRT()
+    }
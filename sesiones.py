@@ -0,0 +1,106 @@
+# Almacén de sesiones de evaluación por código de candidato
+# Memoria (LRU + TTL) para un solo proceso; SQLite para varios workers
+
+from collections import OrderedDict
+import logging
+import pickle
+import threading
+import time
+import os
+
+from base_datos import conectar
+
+logger = logging.getLogger(__name__)
+
+MAX_SESIONES = int(os.environ.get('SESIONES_MAX', 5000))
+TTL_SESION = int(os.environ.get('SESIONES_TTL', 6 * 3600))  # segundos
+
+class SesionesMemoria:
+    """Sesiones en memoria del proceso, con expulsión LRU y expiración por TTL"""
+    
+    def __init__(self, max_sesiones=MAX_SESIONES, ttl=TTL_SESION):
+        self.max_sesiones = max_sesiones
+        self.ttl = ttl
+        self._sesiones = OrderedDict()  # codigo -> (estado, ultimo_acceso)
+        self._lock = threading.Lock()
+    
+    def obtener(self, codigo):
+        with self._lock:
+            entrada = self._sesiones.get(codigo)
+            if entrada is None:
+                return None
+            estado, ultimo_acceso = entrada
+            if time.time() - ultimo_acceso > self.ttl:
+                del self._sesiones[codigo]
+                return None
+            self._sesiones[codigo] = (estado, time.time())
+            self._sesiones.move_to_end(codigo)
+            return estado
+    
+    def guardar(self, codigo, estado):
+        with self._lock:
+            self._sesiones[codigo] = (estado, time.time())
+            self._sesiones.move_to_end(codigo)
+            while len(self._sesiones) > self.max_sesiones:
+                codigo_antiguo, _ = self._sesiones.popitem(last=False)
+                logger.debug("♻️ Sesión expulsada por LRU: %s", codigo_antiguo)
+    
+    def eliminar(self, codigo):
+        with self._lock:
+            self._sesiones.pop(codigo, None)
+    
+    def __len__(self):
+        return len(self._sesiones)
+
+class SesionesSQLite:
+    """Sesiones en SQLite, compartidas entre procesos (gunicorn con varios workers)"""
+    
+    def __init__(self, archivo_db=None, ttl=TTL_SESION):
+        self.archivo_db = archivo_db
+        self.ttl = ttl
+        conectar(self.archivo_db).execute("""
+            CREATE TABLE IF NOT EXISTS sesiones (
+                codigo TEXT PRIMARY KEY,
+                estado BLOB NOT NULL,
+                actualizado REAL NOT NULL
+            )
+        """)
+        conectar(self.archivo_db).execute(
+            "CREATE INDEX IF NOT EXISTS idx_sesiones_actualizado ON sesiones(actualizado)"
+        )
+    
+    def obtener(self, codigo):
+        fila = conectar(self.archivo_db).execute(
+            "SELECT estado, actualizado FROM sesiones WHERE codigo = ?", (codigo,)
+        ).fetchone()
+        if fila is None:
+            return None
+        if time.time() - fila["actualizado"] > self.ttl:
+            self.eliminar(codigo)
+            return None
+        return pickle.loads(fila["estado"])
+    
+    def guardar(self, codigo, estado):
+        conexion = conectar(self.archivo_db)
+        ahora = time.time()
+        conexion.execute(
+            "INSERT OR REPLACE INTO sesiones (codigo, estado, actualizado) VALUES (?, ?, ?)",
+            (codigo, pickle.dumps(estado, protocol=pickle.HIGHEST_PROTOCOL), ahora)
+        )
+        # Limpieza de sesiones expiradas (barata gracias al índice)
+        conexion.execute("DELETE FROM sesiones WHERE actualizado < ?", (ahora - self.ttl,))
+    
+    def eliminar(self, codigo):
+        conectar(self.archivo_db).execute("DELETE FROM sesiones WHERE codigo = ?", (codigo,))
+    
+    def __len__(self):
+        return conectar(self.archivo_db).execute("SELECT COUNT(*) FROM sesiones").fetchone()[0]
+
+def crear_almacen_sesiones():
+    """Elige el almacén según SESIONES_BACKEND ('memoria' por defecto o 'sqlite')"""
+    backend = os.environ.get('SESIONES_BACKEND', 'memoria').lower()
+    if backend == 'sqlite':
+        logger.info("🗄️ Sesiones en SQLite")
+        return SesionesSQLite()
+    logger.info("🧠 Sesiones en memoria (máx %s, TTL %ss)", MAX_SESIONES, TTL_SESION)
+    return SesionesMemoria()
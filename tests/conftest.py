@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base_datos
+
+@pytest.fixture
+def base_temporal(tmp_path, monkeypatch):
+    """Base SQLite vacía por test (la conexión es por hilo y por archivo)"""
+    archivo = str(tmp_path / "evaluacion.db")
+    monkeypatch.setattr(base_datos, "ARCHIVO_DB", archivo)
+    yield archivo
+    conexion = base_datos._local.conexiones.pop(archivo, None)
+    if conexion is not None:
+        conexion.close()
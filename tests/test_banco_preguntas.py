@@ -0,0 +1,61 @@
+import os
+
+import banco_preguntas
+
+def _huella(n):
+    return {"mtime_ns": n, "tamaño": n, "sha256": f"{n:012x}" + "0" * 52}
+
+def test_cada_version_se_recupera_de_su_copia(tmp_path, monkeypatch):
+    monkeypatch.setattr(banco_preguntas, "PATRON_SNAPSHOT_VERSION", str(tmp_path / "preguntas-{version}.snapshot"))
+    monkeypatch.setattr(banco_preguntas, "SNAPSHOTS_VERSIONES", 2)
+
+    for n in (1, 2, 3):
+        preguntas = [{"id": i, "nivel": 1, "pregunta": f"v{n} p{i}"} for i in range(n)]
+        banco_preguntas.guardar_snapshot_version(preguntas, _huella(n))
+        os.utime(tmp_path / f"preguntas-{n:012x}.snapshot", (n, n))
+
+    # Solo quedan las 2 más recientes
+    assert banco_preguntas.cargar_version(f"{1:012x}") is None
+    banco = banco_preguntas.cargar_version(f"{3:012x}")
+    assert banco.version == f"{3:012x}"
+    assert banco.obtener(2)["pregunta"] == "v3 p2"
+
+def test_version_con_formato_invalido(tmp_path, monkeypatch):
+    monkeypatch.setattr(banco_preguntas, "PATRON_SNAPSHOT_VERSION", str(tmp_path / "preguntas-{version}.snapshot"))
+    assert banco_preguntas.cargar_version("../evaluacion") is None
+    assert banco_preguntas.cargar_version(None) is None
+
+def _df(filas):
+    import pandas as pd
+    columnas = ["PREGUNTA", "NIVEL", "A", "B", "C", "D", "RESPUESTA"]
+    return pd.DataFrame(filas, columns=columnas)
+
+def test_respuesta_tras_opcion_vacia_apunta_a_su_columna():
+    # Con B vacía, "C" es la segunda opción de la lista compacta (antes calificaba D)
+    preguntas = banco_preguntas.preguntas_desde_dataframe(_df([
+        ["¿Puerto?", "Nivel 2", "22", None, "443", "80", "C"],
+    ]))
+    assert preguntas[0]["opciones"] == ["22", "443", "80"]
+    assert preguntas[0]["mascara_correcta"] == 0b010
+    assert preguntas[0]["respuestas_correctas"] == ["443"]
+    assert preguntas[0]["nivel"] == 2
+
+def test_respuesta_con_varias_letras():
+    preguntas = banco_preguntas.preguntas_desde_dataframe(_df([
+        ["P1", "Nivel 1", "a", "b", "c", "d", "a, c"],
+        ["P2", "nivel3", "a", "b", "c", "d", "B;D"],
+    ]))
+    assert [p["mascara_correcta"] for p in preguntas] == [0b0101, 0b1010]
+    assert [p["multiple"] for p in preguntas] == [True, True]
+    assert preguntas[1]["nivel"] == 3
+
+def test_respuesta_invalida_usa_la_primera_opcion():
+    preguntas = banco_preguntas.preguntas_desde_dataframe(_df([
+        ["P1", "Nivel 1", "a", "b", "c", "d", "E"],
+        ["P2", "Nivel 1", "a", None, "c", "d", "B"],  # marca una opción vacía
+        ["P3", "Nivel 1", "a", "b", "c", "d", None],
+        ["P4", "Nivel 1", "a", None, None, None, "A"],  # menos de 2 opciones: se salta
+    ]))
+    assert [p["pregunta"] for p in preguntas] == ["P1", "P2", "P3"]
+    assert [p["id"] for p in preguntas] == [1, 2, 3]
+    assert all(p["mascara_correcta"] == 1 and p["indice_correcto"] == 0 for p in preguntas)
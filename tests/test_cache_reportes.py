@@ -0,0 +1,41 @@
+import os
+
+import cache_reportes
+
+def _guardar(directorio, clave_reporte, mtime):
+    cache_reportes.guardar(clave_reporte, f"{clave_reporte}.pdf", b"x" * 1024, directorio=str(directorio))
+    os.utime(directorio / f"{clave_reporte}.pdf", (mtime, mtime))
+
+def test_poda_los_reportes_usados_hace_mas_tiempo(tmp_path, monkeypatch):
+    # Caben 4 PDF de 1 KB; al podar se baja al 90 % (3 PDF)
+    monkeypatch.setattr(cache_reportes, "REPORTES_EN_DISCO_MB", 4 / 1024)
+    for i, clave_reporte in enumerate(["a", "b", "c", "d"]):
+        _guardar(tmp_path, clave_reporte, 1000 + i)
+
+    # Leer "a" desde disco lo marca como recién usado
+    cache_reportes._memoria.clear()
+    assert cache_reportes.buscar("a", directorio=str(tmp_path)) is not None
+
+    _guardar(tmp_path, "e", 2000)
+
+    assert sorted(os.listdir(tmp_path)) == ["a.json", "a.pdf", "d.json", "d.pdf", "e.json", "e.pdf"]
+
+def test_conserva_el_reporte_recien_escrito(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_reportes, "REPORTES_EN_DISCO_MB", 0)
+    cache_reportes.guardar("a", "a.pdf", b"x" * 1024, directorio=str(tmp_path))
+    cache_reportes.guardar("b", "b.pdf", b"x" * 1024, directorio=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "b.pdf"]
+
+def test_el_directorio_solo_se_recorre_al_pasar_del_maximo(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_reportes, "REPORTES_EN_DISCO_MB", 10 / 1024)
+    recorridos = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda ruta: recorridos.append(ruta) or scandir(ruta))
+
+    for i in range(10):
+        _guardar(tmp_path, f"r{i}", 1000 + i)
+    assert len(recorridos) == 1  # la cuenta inicial
+
+    _guardar(tmp_path, "r10", 2000)
+    assert len(recorridos) == 2
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".pdf")]) == 9
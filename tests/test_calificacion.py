@@ -0,0 +1,42 @@
+import pytest
+
+from banco_preguntas import claves_opciones
+from calificacion import evaluar_respuesta, indices_de_mascara, mascara_respuesta
+
+def _pregunta(correctas, nivel=2):
+    opciones = ["Opción A", "Opción B", "Opción C", "Opción D"]
+    mascara = sum(1 << i for i in correctas)
+    return {
+        "id": 1, "nivel": nivel, "opciones": opciones, "claves_opciones": claves_opciones(opciones),
+        "mascara_correcta": mascara, "multiple": len(correctas) > 1
+    }
+
+def test_mascara_por_indices_y_por_texto():
+    pregunta = _pregunta([0])
+    assert mascara_respuesta(pregunta, None, [2, 0, 9]) == 0b101  # fuera de rango se ignora
+    assert mascara_respuesta(pregunta, None, [], ["  opción   c\n", "Opción A"]) == 0b101
+    assert mascara_respuesta(pregunta, "OPCIÓN D") == 0b1000
+    assert indices_de_mascara(0b1010) == [1, 3]
+
+def test_coincidencia_exacta():
+    assert evaluar_respuesta(_pregunta([0, 2]), None, [2, 0]) == (True, 2.0, 1.0)
+    assert evaluar_respuesta(_pregunta([1]), None, [1]) == (True, 2.0, 1.0)
+
+def test_credito_parcial():
+    correcta, puntos, credito = evaluar_respuesta(_pregunta([0, 1, 2]), None, [0, 1])
+    assert not correcta
+    assert credito == pytest.approx(2 / 3)
+    assert puntos == round(2 * 2 / 3, 2)
+
+def test_opcion_incorrecta_de_mas_resta_credito():
+    # 2 aciertos - 1 error sobre 3 correctas
+    _, _, credito = evaluar_respuesta(_pregunta([0, 1, 2]), None, [0, 1, 3])
+    assert credito == pytest.approx(1 / 3)
+    # Tantos errores como aciertos: sin crédito
+    assert evaluar_respuesta(_pregunta([0, 1]), None, [0, 3]) == (False, 0.0, 0.0)
+
+def test_pregunta_unica_con_varios_indices_es_incorrecta():
+    assert evaluar_respuesta(_pregunta([1]), None, [1, 2]) == (False, 0.0, 0.0)
+
+def test_sin_seleccion():
+    assert evaluar_respuesta(_pregunta([0]), None, [], []) == (False, 0.0, 0.0)
@@ -0,0 +1,27 @@
+import pytest
+
+import candidatos
+
+@pytest.mark.parametrize("pagina, por_pagina, esperado", [
+    (0, 0, (1, 1)),
+    (-3, -10, (1, 1)),
+    (2, 100000, (2, candidatos.POR_PAGINA_MAXIMO)),
+    (5, 20, (5, 20)),
+])
+def test_limitar_paginacion(pagina, por_pagina, esperado):
+    assert candidatos.limitar_paginacion(pagina, por_pagina) == esperado
+
+def test_listar_candidatos_acota_la_pagina(base_temporal):
+    candidatos.inicializar()
+    for i in range(3):
+        candidatos.registrar_candidato(f"C{i}", f"Candidato {i}", f"c{i}@x.com")
+
+    lista, total = candidatos.listar_candidatos(pagina=0, por_pagina=0)
+    assert total == 3
+    assert len(lista) == 1
+
+def test_registrar_candidato_sin_nombre_ni_email(base_temporal):
+    candidatos.inicializar()
+    candidato = candidatos.registrar_candidato("C1", None, None)
+    assert candidato["nombre_completo"] == ""
+    assert candidato["email"] == ""
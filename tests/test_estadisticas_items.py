@@ -0,0 +1,44 @@
+import random
+
+import numpy as np
+import pytest
+
+import candidatos
+import estadisticas_items
+
+PREGUNTAS = [f"Pregunta {i}" for i in range(4)]
+
+def _guardar(codigo, creditos):
+    respuestas = [
+        {"pregunta": texto, "nivel_pregunta": 1 + i, "credito": credito, "correcta": credito == 1.0}
+        for i, (texto, credito) in enumerate(creditos)
+    ]
+    candidatos.guardar_resultado(codigo, {"respuestas": respuestas})
+
+def test_discriminacion_ignora_candidatos_con_una_sola_respuesta(base_temporal):
+    candidatos.inicializar()
+    estadisticas_items.inicializar()
+
+    aleatorio = random.Random(7)
+    filas = []  # (pregunta, credito, resto) esperadas
+    for c in range(40):
+        creditos = [(texto, float(aleatorio.random() < 0.2 + 0.6 * c / 40)) for texto in PREGUNTAS]
+        _guardar(f"C{c}", creditos)
+        total = sum(credito for _, credito in creditos)
+        filas += [(texto, credito, (total - credito) / (len(creditos) - 1)) for texto, credito in creditos]
+    # Candidatos con una única respuesta: sin resto, solo cuentan para el p-valor
+    for c in range(15):
+        _guardar(f"U{c}", [(PREGUNTAS[0], float(c % 3 == 0))])
+
+    estadisticas_items.actualizar()
+    tabla = estadisticas_items.calcular(min_respuestas=1).set_index("clave")
+
+    for texto in PREGUNTAS:
+        x = np.array([credito for t, credito, _ in filas if t == texto])
+        resto = np.array([r for t, _, r in filas if t == texto])
+        esperada = np.corrcoef(x, resto)[0, 1]
+        obtenida = tabla.loc[estadisticas_items.clave_pregunta(texto), "discriminacion"]
+        assert obtenida == pytest.approx(esperada, abs=1e-9)
+
+    fila_p0 = tabla.loc[estadisticas_items.clave_pregunta(PREGUNTAS[0])]
+    assert fila_p0["n"] == 55
@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+import pytest
+
+import metricas
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="sin fork")
+
+def _observar_en_hijo(valor):
+    metricas.PDF_RENDER.observar(valor)
+    return metricas.PDF_RENDER.tomar()
+
+def test_hijo_de_fork_no_hereda_el_lock_tomado_y_devuelve_lo_medido():
+    histograma = metricas.PDF_RENDER
+    histograma.observar(0.2)
+    antes = histograma.tomar()
+
+    tomado, soltar = threading.Event(), threading.Event()
+
+    def retener_lock():
+        with histograma._lock:
+            tomado.set()
+            soltar.wait()
+
+    hilo = threading.Thread(target=retener_lock)
+    hilo.start()
+    tomado.wait()
+    try:
+        contexto = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            series = pool.submit(_observar_en_hijo, 0.3).result(timeout=10)
+    finally:
+        soltar.set()
+        hilo.join()
+
+    # El hijo solo devuelve lo que midió él
+    assert series[()][-1] == pytest.approx(0.3)
+    assert sum(series[()][:-1]) == 1
+
+    histograma.sumar(antes)
+    histograma.sumar(series)
+    assert histograma.tomar()[()][-1] == pytest.approx(0.5)
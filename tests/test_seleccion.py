@@ -0,0 +1,28 @@
+from seleccion import SelectorIRT
+
+def _candidato():
+    return {"nivel": 1, "preguntas_mostradas": [], "ids_mostrados": set(), "respuestas": []}
+
+def test_irt_empieza_en_el_nivel_del_prior():
+    selector = SelectorIRT()
+    candidato = _candidato()
+    selector.iniciar(candidato)
+    assert candidato["nivel"] == selector.nivel_desde_theta(0.0) == 3
+
+def test_irt_solo_avanza_al_subir_desde_el_prior():
+    selector = SelectorIRT()
+    candidato = _candidato()
+    selector.iniciar(candidato)
+
+    # Un fallo en una pregunta fácil no es subir de nivel
+    assert not selector.registrar(candidato, {"nivel": 1}, False, 0.0)
+    assert candidato["nivel"] <= 3
+
+    avances = []
+    for _ in range(6):
+        nivel_anterior = candidato["nivel"]
+        avanzo = selector.registrar(candidato, {"nivel": 5}, True, 1.0)
+        avances.append(avanzo)
+        assert avanzo == (candidato["nivel"] > nivel_anterior)
+    assert candidato["nivel"] > 3
+    assert any(avances)
@@ -0,0 +1,171 @@
+# Cola de trabajos para generar y subir los reportes PDF fuera de la petición
+# Tabla persistente en SQLite + pool local de hilos con límite de concurrencia
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import json
+import time
+import uuid
+import os
+
+from base_datos import conectar
+import cache_reportes
+import candidatos
+import metricas
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 2))
+PDF_MAX_INTENTOS = int(os.environ.get('PDF_MAX_INTENTOS', 3))
+# Guardar también en reportes/ los PDF que sí se subieron a Drive (se pueden
+# volver a generar desde el resultado guardado con /reporte_pdf/<codigo>)
+PDF_GUARDAR_DISCO = os.environ.get('PDF_GUARDAR_DISCO', '0') == '1'
+PDF_ESPERA_REINTENTO = 5  # segundos, se duplica en cada intento
+# Trabajos 'en_proceso' sin actualizar en este tiempo se consideran abandonados
+PDF_TRABAJO_ABANDONADO = 10 * 60
+
+_executor = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix='pdf')
+
+def inicializar(archivo_db=None):
+    conectar(archivo_db).executescript("""
+        CREATE TABLE IF NOT EXISTS trabajos_pdf (
+            id TEXT PRIMARY KEY,
+            codigo TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            resultado TEXT,
+            error TEXT,
+            creado REAL NOT NULL,
+            actualizado REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_trabajos_pdf_estado ON trabajos_pdf(estado, actualizado);
+        CREATE INDEX IF NOT EXISTS idx_trabajos_pdf_codigo ON trabajos_pdf(codigo);
+    """)
+
+def _a_diccionario(fila):
+    trabajo = dict(fila)
+    trabajo["resultado"] = json.loads(trabajo["resultado"]) if trabajo["resultado"] else None
+    return trabajo
+
+def obtener_trabajo(trabajo_id):
+    fila = conectar().execute("SELECT * FROM trabajos_pdf WHERE id = ?", (trabajo_id,)).fetchone()
+    return _a_diccionario(fila) if fila else None
+
+def encolar_reporte(codigo):
+    """Crea (o reutiliza) el trabajo de reporte del candidato y devuelve su id"""
+    conexion = conectar()
+    activo = conexion.execute(
+        "SELECT id FROM trabajos_pdf WHERE codigo = ? AND estado IN ('pendiente', 'en_proceso')",
+        (codigo,)
+    ).fetchone()
+    if activo:
+        return activo["id"]
+
+    trabajo_id = uuid.uuid4().hex
+    ahora = time.time()
+    conexion.execute(
+        "INSERT INTO trabajos_pdf (id, codigo, estado, creado, actualizado) VALUES (?, ?, 'pendiente', ?, ?)",
+        (trabajo_id, codigo, ahora, ahora)
+    )
+    _executor.submit(_ejecutar, trabajo_id)
+    logger.debug("📥 Reporte encolado: %s (trabajo %s)", codigo, trabajo_id)
+    return trabajo_id
+
+def _reclamar(trabajo_id):
+    """Pasa el trabajo a 'en_proceso' solo si sigue pendiente (un único worker lo toma)"""
+    cursor = conectar().execute(
+        """UPDATE trabajos_pdf SET estado = 'en_proceso', intentos = intentos + 1, actualizado = ?
+           WHERE id = ? AND estado = 'pendiente'""",
+        (time.time(), trabajo_id)
+    )
+    return cursor.rowcount == 1
+
+def _actualizar(trabajo_id, estado, resultado=None, error=None):
+    conectar().execute(
+        "UPDATE trabajos_pdf SET estado = ?, resultado = ?, error = ?, actualizado = ? WHERE id = ?",
+        (estado, json.dumps(resultado, ensure_ascii=False) if resultado else None, error, time.time(), trabajo_id)
+    )
+
+def _generar_y_subir(codigo):
+    """Genera el PDF en memoria desde el resultado guardado y lo sube a Google Drive
+
+    Si el resultado no cambió desde el último reporte se reutilizan el PDF y el enlace
+    de Drive de la caché.
+    """
+    resultado = candidatos.obtener_resultado(codigo)
+    if resultado is None:
+        raise ValueError(f"No hay resultado guardado para {codigo}")
+
+    from pdf_generator import guardar_reporte
+    generado = cache_reportes.obtener(resultado)
+    if not generado:
+        raise RuntimeError("El generador no produjo el PDF")
+    clave, nombre_archivo, contenido = generado
+
+    # La subida a Drive es opcional: si falla, el reporte queda en disco
+    drive_link = cache_reportes.link_drive(clave)
+    if drive_link:
+        logger.info("♻️ Reporte sin cambios, ya estaba en Google Drive: %s", drive_link)
+    else:
+        try:
+            from drive_integration import save_pdf_bytes_to_drive
+            with metricas.DRIVE_SUBIDA.medir():
+                drive_result = save_pdf_bytes_to_drive(contenido, nombre_archivo)
+            if drive_result.get('success'):
+                drive_link = drive_result.get('link')
+                logger.info("☁️ PDF subido a Google Drive: %s", drive_link)
+                cache_reportes.guardar_link_drive(clave, drive_link)
+            else:
+                logger.warning("⚠️ Error subiendo a Google Drive: %s", drive_result.get('error'))
+        except Exception as e:
+            logger.warning("⚠️ Error con Google Drive: %s", e)
+    if drive_link:
+        candidatos.actualizar_candidato(codigo, google_drive_link=drive_link)
+
+    # Copia local solo si se pide o si no quedó en Drive
+    pdf_path = None
+    if PDF_GUARDAR_DISCO or not drive_link:
+        pdf_path = guardar_reporte(nombre_archivo, contenido)
+
+    return {
+        "pdf_path": pdf_path,
+        "nombre_archivo": nombre_archivo,
+        "google_drive_link": drive_link,
+        "google_drive_subido": bool(drive_link)
+    }
+
+def _ejecutar(trabajo_id):
+    if not _reclamar(trabajo_id):
+        return
+
+    trabajo = obtener_trabajo(trabajo_id)
+    try:
+        resultado = _generar_y_subir(trabajo["codigo"])
+        _actualizar(trabajo_id, 'completado', resultado=resultado)
+        logger.info("✅ Trabajo PDF completado: %s", trabajo_id)
+    except Exception as e:
+        if trabajo["intentos"] < PDF_MAX_INTENTOS:
+            espera = PDF_ESPERA_REINTENTO * 2 ** (trabajo["intentos"] - 1)
+            logger.warning("⚠️ Trabajo PDF %s falló (intento %s), reintento en %ss: %s", trabajo_id, trabajo['intentos'], espera, e)
+            _actualizar(trabajo_id, 'pendiente', error=str(e))
+            temporizador = threading.Timer(espera, _executor.submit, args=(_ejecutar, trabajo_id))
+            temporizador.daemon = True
+            temporizador.start()
+        else:
+            logger.error("❌ Trabajo PDF %s agotó sus %s intentos: %s", trabajo_id, PDF_MAX_INTENTOS, e)
+            _actualizar(trabajo_id, 'error', error=str(e))
+
+def reanudar_pendientes():
+    """Reencola trabajos pendientes o abandonados (p.ej. tras reiniciar el proceso)"""
+    conexion = conectar()
+    conexion.execute(
+        "UPDATE trabajos_pdf SET estado = 'pendiente' WHERE estado = 'en_proceso' AND actualizado < ?",
+        (time.time() - PDF_TRABAJO_ABANDONADO,)
+    )
+    pendientes = conexion.execute("SELECT id FROM trabajos_pdf WHERE estado = 'pendiente'").fetchall()
+    for fila in pendientes:
+        _executor.submit(_ejecutar, fila["id"])
+    if pendientes:
+        logger.info("🔁 Trabajos PDF reanudados: %s", len(pendientes))
+    return len(pendientes)